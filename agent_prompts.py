@@ -0,0 +1,221 @@
+import json
+import os
+
+# 在静态前缀末尾附加cache_control断点（Anthropic/Bedrock经LiteLLM透传；其他模型会忽略该字段）
+PROMPT_CACHE_CONTROL = os.environ.get('AGENT_PROMPT_CACHE_CONTROL', '1') == '1'
+
+def serialize_context(data):
+    """
+    序列化注入提示词的上下文数据
+    固定键顺序和格式，保证同一份数据每次得到逐字节相同的文本，上游的前缀缓存才能命中
+    """
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, indent=2)
+
+def build_static_prefix(system_prompt, sections):
+    """
+    构建每次请求都放在最前面的静态消息：系统提示 + 一条包含全部背景资料的用户消息
+
+    Args:
+        system_prompt (str): 已填充占位符的系统提示
+        sections (list): [(标题, 数据)]，数据按serialize_context序列化
+
+    Returns:
+        tuple: 消息列表，agent创建后只构建一次，之后每轮原样复用
+    """
+    context = "以下是相关信息：\n\n" + "\n\n".join(
+        f"{title}：\n{serialize_context(data)}" for title, data in sections
+    )
+    if PROMPT_CACHE_CONTROL:
+        # 断点之前的全部内容（系统提示 + 背景资料）作为一个整体被缓存
+        context_content = [{"type": "text", "text": context, "cache_control": {"type": "ephemeral"}}]
+    else:
+        context_content = context
+    return (
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": context_content},
+    )
+
+def extract_usage(response):
+    """
+    从chat.completions响应中提取本轮token用量
+
+    Returns:
+        dict: input_tokens、cached_input_tokens（命中前缀缓存）、uncached_input_tokens、
+              cache_creation_input_tokens（本轮写入缓存）、output_tokens；响应不含用量时各项为0
+    """
+    usage = getattr(response, 'usage', None)
+    input_tokens = getattr(usage, 'prompt_tokens', None) or 0
+    output_tokens = getattr(usage, 'completion_tokens', None) or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = getattr(details, 'cached_tokens', None) or 0
+    # LiteLLM把Anthropic的cache_creation_input_tokens放在usage顶层
+    cache_creation_tokens = getattr(usage, 'cache_creation_input_tokens', None) or 0
+    return {
+        'input_tokens': input_tokens,
+        'cached_input_tokens': cached_tokens,
+        'uncached_input_tokens': max(input_tokens - cached_tokens, 0),
+        'cache_creation_input_tokens': cache_creation_tokens,
+        'output_tokens': output_tokens
+    }
+
+def summarize_usage(turns):
+    """汇总多轮的token用量，并计算缓存命中比例"""
+    totals = {key: 0 for key in ('input_tokens', 'cached_input_tokens', 'uncached_input_tokens',
+                                 'cache_creation_input_tokens', 'output_tokens')}
+    for turn in turns:
+        for key in totals:
+            totals[key] += turn.get(key, 0)
+    totals['turns'] = len(turns)
+    totals['cached_ratio'] = round(totals['cached_input_tokens'] / totals['input_tokens'], 4) if totals['input_tokens'] else 0.0
+    return totals
+
+def estimate_tokens(text):
+    """
+    粗略估算文本的token数：中日韩等非ASCII字符约1个token/字，ASCII文本约4个字符/token
+    只用于预算控制和用量展示，不追求与具体模型的分词器完全一致
+    """
+    if not text:
+        return 0
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return non_ascii + (len(text) - non_ascii + 3) // 4
+
+def estimate_messages_tokens(messages):
+    """估算消息列表的token数（content可以是字符串或内容块列表）"""
+    total = 0
+    for message in messages:
+        content = message.get('content')
+        if isinstance(content, list):
+            total += sum(estimate_tokens(block.get('text', '')) for block in content)
+        else:
+            total += estimate_tokens(content if isinstance(content, str) else json.dumps(content, ensure_ascii=False))
+    return total
+
+_SIMPLE_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+class TurnStreamParser:
+    """
+    增量解析agent回复的JSON对象 {"type", "reasoning", "payload"}
+
+    模型的token随到随喂给feed()，解析器跟踪JSON的字符串/层级状态（转义、\\uXXXX、代理对跨chunk都能正确处理），
+    返回顶层指定字段字符串值中新解码出的文本片段；顶层字符串字段完整后记录在values中。
+    只用于流式展示，最终结果仍以完整文本json.loads为准
+
+    Args:
+        stream_fields (tuple): 需要增量输出的顶层字段
+    """
+    def __init__(self, stream_fields=('payload',)):
+        self.stream_fields = stream_fields
+        self.values = {}  # 已完整解析的顶层字符串字段
+        self._chunks = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = None  # 正在读取的转义序列（含反斜杠）
+        self._high_surrogate = None
+        self._expect_key = False
+        self._is_key = False
+        self._key = None  # 当前顶层字段名
+        self._buffer = None  # 当前顶层字符串已解码的字符
+
+    @property
+    def text(self):
+        """到目前为止收到的完整原始文本"""
+        return ''.join(self._chunks)
+
+    def feed(self, chunk):
+        """
+        喂入一段文本
+
+        Returns:
+            dict: {字段名: 本次新增的已解码文本}，没有新增时为空dict
+        """
+        self._chunks.append(chunk)
+        deltas = {}
+        for ch in chunk:
+            if self._in_string:
+                decoded = self._read_string_char(ch)
+                if decoded:
+                    self._emit(decoded, deltas)
+            elif ch == '"':
+                self._start_string()
+            elif ch in '{[':
+                self._depth += 1
+                self._expect_key = self._depth == 1 and ch == '{'
+            elif ch in '}]':
+                self._depth -= 1
+            elif self._depth == 1 and ch == ',':
+                self._expect_key = True
+        return deltas
+
+    def _start_string(self):
+        self._in_string = True
+        self._is_key = self._depth == 1 and self._expect_key
+        self._buffer = [] if self._depth == 1 else None
+        if self._is_key:
+            self._expect_key = False
+
+    def _read_string_char(self, ch):
+        """处理字符串内的一个字符，返回解码出的文本（可能为空）"""
+        if self._escape is not None:
+            self._escape += ch
+            if self._escape[1] != 'u':
+                self._escape, escape = None, self._escape
+                return _SIMPLE_ESCAPES.get(escape[1], escape[1])
+            if len(self._escape) < 6:
+                return ''
+            code = int(self._escape[2:], 16)
+            self._escape = None
+            if 0xD800 <= code < 0xDC00:
+                # 代理对的前半部分，等待后半部分
+                self._high_surrogate = code
+                return ''
+            if 0xDC00 <= code < 0xE000 and self._high_surrogate is not None:
+                code = 0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)
+            self._high_surrogate = None
+            return chr(code)
+        if ch == '\\':
+            self._escape = ch
+            return ''
+        if ch == '"':
+            self._end_string()
+            return ''
+        return ch
+
+    def _end_string(self):
+        self._in_string = False
+        if self._buffer is None:
+            return
+        value = ''.join(self._buffer)
+        if self._is_key:
+            self._key = value
+        else:
+            self.values[self._key] = value
+        self._buffer = None
+
+    def _emit(self, text, deltas):
+        if self._buffer is None:
+            return
+        self._buffer.append(text)
+        if not self._is_key and self._key in self.stream_fields:
+            deltas[self._key] = deltas.get(self._key, '') + text
+
+def stream_chat_completion(client, on_delta, **kwargs):
+    """
+    以流式方式调用chat.completions，边接收边用TurnStreamParser解析，
+    每解析出一段payload文本就调用 on_delta(字段名, 文本, 已解析出的type或None)
+
+    Returns:
+        tuple: (完整回复文本, 携带usage的最后一个chunk或None)
+    """
+    parser = TurnStreamParser()
+    usage_chunk = None
+    stream = client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+    for chunk in stream:
+        if getattr(chunk, 'usage', None):
+            usage_chunk = chunk
+        if not chunk.choices:
+            continue
+        content = chunk.choices[0].delta.content
+        if content:
+            for field, text in parser.feed(content).items():
+                on_delta(field, text, parser.values.get('type'))
+    return parser.text, usage_chunk
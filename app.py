@@ -6,20 +6,35 @@ load_dotenv()
 
 import sqlite3
 import json
+import math
 import pathlib
 import google.generativeai as genai
 import pandas as pd
 import io
 from werkzeug.utils import secure_filename
-from helpers import get_prompt, get_db_connection, check_and_migrate_db, log_model_request, log_model_response, log_processing_step, log_batch_item, log_desensitization, log_queue, diagnose_json_error, get_resume_and_jd_info
+from helpers import get_prompt, get_db_connection, check_and_migrate_db, log_model_request, log_model_response, log_processing_step, log_batch_item, log_desensitization, log_queue, diagnose_json_error, get_resume_and_jd_info, run_in_bounded_pool, search_documents
 from resume_generator import resume_generator_bp
 from talent_sourcing_agent import talent_sourcing_bp
 from candidate_agent import CandidateAgent
 from recruiter_agent import RecruiterAgent
+from agent_prompts import estimate_messages_tokens, estimate_tokens
+from db import SQLITE_MAX_VARIABLES, connection_pool
+from match_jobs import BatchMatchJob, MatchJobRegistry, parse_last_event_id
+from screening import shortlist, reset_screening_index
+from compatibility import compatibility_matrix, refresh_compatibility_matrix
+from prompt_registry import prompt_registry
+from ingestion import BatchWriter, RESUME_SPEC, JD_SPEC, build_resume_row, build_jd_row
+from listing import DEFAULT_PAGE_SIZE, list_page, parse_fields, get_record, invalidate_total_count
+from profile_cache import get_cached_company_profile, get_cached_candidate_profile, invalidate_company_profile, get_cache_stats
 import time
 import queue
 import os
+import bisect
 import datetime
+import threading
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from openai import OpenAI
 from flask import Flask, render_template, request, jsonify, Response, stream_template
 
@@ -29,14 +44,32 @@ class MessageQueue:
     简单的消息队列，用于存储撮合过程中的agent消息
     每条消息包含：消息来源、消息类型、reasoning、payload、时间戳
     """
+    AGENT_SOURCES = ('candidate', 'recruiter')
+
     def __init__(self):
         self.messages = []  # 消息列表
         self.session_id = None  # 当前会话ID
+        self._reset_agent_views()
+    
+    def _reset_agent_views(self):
+        """重置各agent的增量历史视图"""
+        # 每个agent一份只追加的、已序列化好的历史记录，在add_message时增量更新
+        self.agent_views = {agent: [] for agent in self.AGENT_SOURCES}
+        # 每个agent已看到的对方chatting消息数量（用于判断是否需要kickoff消息）
+        self.opponent_chat_counts = {agent: 0 for agent in self.AGENT_SOURCES}
+        # 与视图一一对应的 (原始消息, 是否为自己的消息, 估算token数)，供历史压缩使用
+        self.agent_view_meta = {agent: [] for agent in self.AGENT_SOURCES}
+        self.agent_view_tokens = {agent: 0 for agent in self.AGENT_SOURCES}
+        # 历史压缩的增量状态（见new_compaction_state）
+        self.compaction_state = {agent: new_compaction_state() for agent in self.AGENT_SOURCES}
+        # 最近一次为各agent构建历史时的提示词规模统计
+        self.history_stats = {}
     
     def init_session(self, session_id):
         """初始化新的撮合会话"""
         self.session_id = session_id
         self.messages = []
+        self._reset_agent_views()
         print(f"[MessageQueue] 初始化会话: {session_id}")
     
     def add_message(self, source, msg_type, reasoning, payload, timestamp=None):
@@ -67,9 +100,47 @@ class MessageQueue:
         }
         
         self.messages.append(message)
+        self._append_to_agent_views(message)
         print(f"[MessageQueue] 添加消息 #{message['id']}: {source} - {msg_type}")
         return message
     
+    def _append_to_agent_views(self, message):
+        """
+        将新消息追加到各agent的历史视图中（每条消息只序列化一次）
+        - 自己发的所有消息：以assistant角色、JSON格式保存type/reasoning/payload
+        - 对方发的chatting消息：以user角色只保存payload
+        """
+        source = message['source']
+        if source not in self.AGENT_SOURCES:
+            return
+        
+        for agent, view in self.agent_views.items():
+            if agent == source:
+                entry = {
+                    "role": "assistant",
+                    "content": json.dumps({
+                        "type": message['type'],
+                        "reasoning": message['reasoning'],
+                        "payload": message['payload']
+                    }, ensure_ascii=False)
+                }
+            elif message['type'] == 'chatting':
+                entry = {
+                    "role": "user",
+                    "content": message['payload']
+                }
+                self.opponent_chat_counts[agent] += 1
+            else:
+                continue
+            tokens = estimate_messages_tokens([entry])
+            view.append(entry)
+            self.agent_view_meta[agent].append((message, agent == source, tokens))
+            self.agent_view_tokens[agent] += tokens
+    
+    def get_agent_view(self, source_agent):
+        """获取指定agent的历史视图副本（不会重新序列化消息）"""
+        return list(self.agent_views[source_agent])
+    
     def get_messages(self, source=None, msg_type=None):
         """
         获取消息列表，支持按来源和类型过滤
@@ -103,6 +174,7 @@ class MessageQueue:
     def clear(self):
         """清空消息队列"""
         self.messages = []
+        self._reset_agent_views()
         print(f"[MessageQueue] 清空会话 {self.session_id} 的消息队列")
     
     def get_message_count(self):
@@ -125,66 +197,323 @@ class MessageQueue:
             'end_time': self.messages[-1]['timestamp'] if self.messages else None
         }
 
-def get_history_for_agent(source_agent):
+class MessageQueueRegistry:
+    """
+    按会话ID管理多个MessageQueue，使多场撮合可以在同一进程内并发进行
+    - 线程安全：所有读写都在锁内完成
+    - TTL淘汰：超过ttl_seconds未被访问的会话会被清理
+    - 容量上限：会话数超过max_sessions时淘汰最久未访问的会话
+    """
+    def __init__(self, ttl_seconds=3600, max_sessions=64):
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()  # session_id -> (MessageQueue, last_access)
+        self._lock = threading.Lock()
+
+    def create(self, session_id):
+        """创建并注册一个新的会话队列，返回该会话的MessageQueue"""
+        session = MessageQueue()
+        session.init_session(session_id)
+        with self._lock:
+            self._evict_locked()
+            self._sessions[session_id] = (session, time.monotonic())
+            self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted_id, _ = self._sessions.popitem(last=False)
+                print(f"[MessageQueueRegistry] 会话数超过上限，淘汰会话: {evicted_id}")
+        return session
+
+    def get(self, session_id):
+        """获取会话队列，不存在或已过期时返回None"""
+        with self._lock:
+            self._evict_locked()
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return None
+            self._sessions[session_id] = (entry[0], time.monotonic())
+            self._sessions.move_to_end(session_id)
+            return entry[0]
+
+    def remove(self, session_id):
+        """移除会话队列，返回被移除的MessageQueue（不存在时返回None）"""
+        with self._lock:
+            entry = self._sessions.pop(session_id, None)
+        if entry is None:
+            return None
+        entry[0].clear()
+        return entry[0]
+
+    def list_sessions(self):
+        """列出所有存活会话的摘要"""
+        with self._lock:
+            self._evict_locked()
+            sessions = [entry[0] for entry in self._sessions.values()]
+        return [session.get_session_summary() for session in sessions]
+
+    def _evict_locked(self):
+        """清理过期会话（调用方需持有锁）"""
+        deadline = time.monotonic() - self.ttl_seconds
+        expired = [sid for sid, (_, last_access) in self._sessions.items() if last_access < deadline]
+        for sid in expired:
+            del self._sessions[sid]
+            print(f"[MessageQueueRegistry] 会话已过期，淘汰会话: {sid}")
+
+    def __len__(self):
+        with self._lock:
+            return len(self._sessions)
+
+# 历史压缩：历史记录估算超过token预算时，最近HISTORY_KEEP_RECENT条消息原样保留，
+# 更早的、自己的planning消息替换为一条滚动摘要，自己的其他消息去掉reasoning；
+# 仍超出预算时从最早的消息开始继续把双方的消息折叠进摘要，最后省略最早的摘要条目（预算为0表示不压缩）
+HISTORY_TOKEN_BUDGET = int(os.environ.get('HISTORY_TOKEN_BUDGET', 6000))
+HISTORY_KEEP_RECENT = int(os.environ.get('HISTORY_KEEP_RECENT', 6))
+HISTORY_SUMMARY_ITEM_CHARS = 150
+HISTORY_SUMMARY_HEADER = "（以下是此前对话的摘要，较早消息的原文已省略）"
+
+def new_compaction_state(token_budget=None):
+    """
+    历史压缩的增量状态
+    - upto: 视图中已处理到的位置
+    - lines: 摘要条目 [(消息ID, 文本, 估算token数)]，按消息ID排序
+    - entries: 去掉reasoning后原样保留的较早消息 [(原始消息, 是否为自己的消息, 历史条目, 估算token数)]
+    - planning / folded / omitted: 摘要的planning数、折叠进摘要的其他消息数、被省略的最早摘要条目数
+    """
+    return {'budget': token_budget, 'upto': 0, 'lines': [], 'lines_tokens': 0, 'entries': deque(), 'entries_tokens': 0,
+            'planning': 0, 'folded': 0, 'omitted': 0, 'summary': None, 'summary_tokens': 0, 'summary_key': None}
+
+def summarize_history_message(message, speaker=None):
+    """把一条消息抽取为摘要中的一行：保留payload的开头部分；speaker非空时注明发言方和消息类型"""
+    payload = message['payload'] if isinstance(message['payload'], str) else json.dumps(message['payload'], ensure_ascii=False)
+    payload = ' '.join(payload.split())
+    if len(payload) > HISTORY_SUMMARY_ITEM_CHARS:
+        payload = payload[:HISTORY_SUMMARY_ITEM_CHARS] + '…'
+    label = f"（{speaker}的{message['type']}）" if speaker else ''
+    return f"- 第{message['id']}条消息{label}: {payload}"
+
+def omitted_summary_line(count):
+    return f"- （更早的{count}条摘要已省略）"
+
+def add_summary_line(state, message, line):
+    # 每行单独估算（含换行符），各行之和不小于整段摘要的估算值
+    tokens = estimate_tokens(line + "\n")
+    bisect.insort(state['lines'], (message['id'], line, tokens))
+    state['lines_tokens'] += tokens
+
+def estimated_summary_tokens(state):
+    if not state['lines'] and not state['omitted']:
+        return 0
+    tokens = estimate_tokens(HISTORY_SUMMARY_HEADER) + state['lines_tokens']
+    if state['omitted']:
+        tokens += estimate_tokens(omitted_summary_line(state['omitted']) + "\n")
+    return tokens
+
+def compact_agent_view(session, source_agent, keep_recent, token_budget):
+    """
+    压缩agent的历史视图：最近keep_recent条原样保留；更早的消息中，
+    自己的planning合并为一条滚动摘要，自己的其他消息去掉reasoning只保留type和payload，对方的chatting原样保留
+    这样仍超出token_budget时，从最早的消息开始把其余较早消息（包括对方的chatting）也折叠为摘要条目，
+    再不够时省略最早的摘要条目；最近keep_recent条消息无论如何都原样保留，因此结果仍可能超出预算
+    压缩结果随对话推进增量追加，已压缩的消息不会重复处理
+
+    Returns:
+        tuple: (压缩后的历史, 估算token数, 压缩计数 {'planning', 'folded', 'omitted'})
+    """
+    view = session.agent_views[source_agent]
+    meta = session.agent_view_meta[source_agent]
+    boundary = len(view) - keep_recent
+    state = session.compaction_state[source_agent]
+    if boundary < state['upto'] or state['budget'] != token_budget:
+        # keep_recent变大（边界前移）或预算变化时重新压缩
+        state.clear()
+        state.update(new_compaction_state(token_budget))
+    for entry, (message, is_own, tokens) in zip(view[state['upto']:boundary], meta[state['upto']:boundary]):
+        if is_own and message['type'] == 'planning':
+            add_summary_line(state, message, summarize_history_message(message))
+            state['planning'] += 1
+            continue
+        if is_own:
+            entry = {
+                "role": "assistant",
+                "content": json.dumps({"type": message['type'], "payload": message['payload']}, ensure_ascii=False)
+            }
+            tokens = estimate_messages_tokens([entry])
+        state['entries'].append((message, is_own, entry, tokens))
+        state['entries_tokens'] += tokens
+    state['upto'] = boundary
+
+    recent_tokens = sum(tokens for _, _, tokens in meta[boundary:])
+    def over_budget():
+        return estimated_summary_tokens(state) + state['entries_tokens'] + recent_tokens > token_budget
+    while over_budget() and state['entries']:
+        message, is_own, _, tokens = state['entries'].popleft()
+        state['entries_tokens'] -= tokens
+        add_summary_line(state, message, summarize_history_message(message, '你' if is_own else '对方'))
+        state['folded'] += 1
+    while over_budget() and state['lines']:
+        state['lines_tokens'] -= state['lines'].pop(0)[2]
+        state['omitted'] += 1
+
+    summary_key = (state['planning'], state['folded'], state['omitted'])
+    if state['summary_key'] != summary_key:
+        # 摘要条目有变化时才重建摘要消息
+        state['summary_key'] = summary_key
+        lines = [omitted_summary_line(state['omitted'])] if state['omitted'] else []
+        lines.extend(line for _, line, _ in state['lines'])
+        state['summary'] = {"role": "user", "content": HISTORY_SUMMARY_HEADER + "\n" + "\n".join(lines)} if lines else None
+        state['summary_tokens'] = estimate_messages_tokens([state['summary']]) if lines else 0
+
+    history = []
+    history_tokens = state['entries_tokens'] + recent_tokens + state['summary_tokens']
+    if state['summary']:
+        history.append(state['summary'])
+    history.extend(entry for _, _, entry, _ in state['entries'])
+    history.extend(view[boundary:])
+    return history, history_tokens, {name: state[name] for name in ('planning', 'folded', 'omitted')}
+
+def get_history_for_agent(session, source_agent, token_budget=None, keep_recent=None):
     """
     为指定的agent构建历史消息记录
     - 自己source的所有消息
     - 对方source的chatting类型消息
     - 如果对方没有chatting消息，提供一个kickoff消息
-    """
-    history = []
-    opponent_agent = 'recruiter' if source_agent == 'candidate' else 'candidate'
+    - 估算超过token预算时压缩较早的消息（见compact_agent_view）
 
-    print(f"[HistoryBuilder] 为 {source_agent.upper()} 构建历史记录...")
+    历史记录直接取自MessageQueue在add_message时增量维护的视图，
+    每轮构建不再遍历和重新序列化全部消息。本次构建的规模统计保存在session.history_stats中。
 
-    # 统计对方的chatting消息数量
-    opponent_chat_count = 0
-    
-    for msg in message_queue.messages:
-        role = 'assistant' if msg['source'] == source_agent else 'user'
-        
-        # 自己发的所有消息都要给到
-        if msg['source'] == source_agent:
-            # 对于自己的消息，将原始的 'planning', 'chatting', 'decision' 格式封装到 content 中
-            history.append({
-                "role": role,
-                "content": json.dumps({
-                    "type": msg['type'],
-                    "reasoning": msg['reasoning'],
-                    "payload": msg['payload']
-                }, ensure_ascii=False)
-            })
-            print(f"  [+] 添加自己的消息 (ID: {msg['id']}, Type: {msg['type']})")
-        # 对方发的 chatting 消息要给到
-        elif msg['source'] == opponent_agent and msg['type'] == 'chatting':
-            # 对于对方的聊天消息，只传递payload
-            history.append({
-                "role": role,
-                "content": msg['payload']
-            })
-            opponent_chat_count += 1
-            print(f"  [+] 添加对方的聊天消息 (ID: {msg['id']})")
+    Args:
+        session (MessageQueue): 当前撮合会话的消息队列
+        source_agent (str): 'candidate' 或 'recruiter'
+        token_budget (int, optional): 历史记录的token预算，默认HISTORY_TOKEN_BUDGET，0表示不压缩
+        keep_recent (int, optional): 原样保留的最近消息数，默认HISTORY_KEEP_RECENT
+    """
+    token_budget = HISTORY_TOKEN_BUDGET if token_budget is None else token_budget
+    keep_recent = HISTORY_KEEP_RECENT if keep_recent is None else keep_recent
+    opponent_agent = 'recruiter' if source_agent == 'candidate' else 'candidate'
+    original_tokens = session.agent_view_tokens[source_agent]
+
+    counts = {'planning': 0, 'folded': 0, 'omitted': 0}
+    if token_budget and original_tokens > token_budget and len(session.agent_views[source_agent]) > keep_recent:
+        history, history_tokens, counts = compact_agent_view(session, source_agent, keep_recent, token_budget)
+    else:
+        history = session.get_agent_view(source_agent)
+        history_tokens = original_tokens
     
     # 如果对方没有chatting消息，添加一个kickoff消息
-    if opponent_chat_count == 0:
+    if session.opponent_chat_counts[source_agent] == 0:
         kickoff_message = "您好，我想了解更多关于这个机会的信息。" if opponent_agent == 'candidate' else "您好，我想了解您的背景和经验。"
         history.append({
             "role": "user",
             "content": kickoff_message
         })
-        print(f"  [+] 添加kickoff消息 (对方暂无chatting消息)")
     
-    print(f"[HistoryBuilder] 为 {source_agent.upper()} 构建完成，共 {len(history)} 条历史记录。")
+    # 最近keep_recent条消息本身就超出预算时无法再压缩，within_budget为false并记录警告
+    within_budget = not token_budget or history_tokens <= token_budget
+    session.history_stats[source_agent] = {
+        'history_messages': len(history),
+        'history_tokens': history_tokens,
+        'uncompacted_history_tokens': original_tokens,
+        'compacted_messages': counts['planning'],
+        'folded_messages': counts['folded'],
+        'omitted_summary_lines': counts['omitted'],
+        'token_budget': token_budget,
+        'within_budget': within_budget
+    }
+    print(f"[HistoryBuilder] 为 {source_agent.upper()} 构建完成 (会话: {session.session_id})，共 {len(history)} 条历史记录，"
+          f"约 {history_tokens} tokens（压缩前 {original_tokens}，已摘要 {counts['planning']} 条planning、"
+          f"折叠 {counts['folded']} 条较早消息、省略 {counts['omitted']} 条摘要）。")
+    if not within_budget:
+        log_processing_step("HISTORY_BUILDER", "WARNING",
+                            f"{source_agent} history ~{history_tokens} tokens exceeds budget {token_budget} "
+                            f"after compaction (keep_recent={keep_recent})")
     return history
 
-# 全局消息队列实例
-message_queue = MessageQueue()
+def format_prompt_size_event(session, agent, source):
+    """构造本轮请求提示词规模的SSE事件：静态前缀 + 历史记录的估算token数及压缩情况"""
+    stats = session.history_stats.get(source, {})
+    agent.get_static_prefix()
+    data = {
+        'sender': source,
+        **stats,
+        'static_prefix_tokens': agent.static_prefix_tokens,
+        'prompt_tokens': agent.static_prefix_tokens + stats.get('history_tokens', 0)
+    }
+    return f"data: {json.dumps({'type': 'prompt_size', 'data': data})}\n\n"
+
+# 全局会话注册表，每场撮合使用独立的消息队列
+message_queue_registry = MessageQueueRegistry(
+    ttl_seconds=int(os.environ.get('MESSAGE_QUEUE_TTL_SECONDS', 3600)),
+    max_sessions=int(os.environ.get('MESSAGE_QUEUE_MAX_SESSIONS', 64))
+)
+
+# 后台撮合任务注册表：撮合与观看者连接解耦，断线重连和多人观看都不会重复调用模型
+match_job_registry = MatchJobRegistry(
+    ttl_seconds=int(os.environ.get('MATCH_JOB_TTL_SECONDS', 3600)),
+    max_jobs=int(os.environ.get('MATCH_JOB_MAX_JOBS', 64)),
+    max_running=int(os.environ.get('MATCH_JOB_MAX_RUNNING', 8))
+)
+
+def format_usage_event(agent, source):
+    """
+    构造某个agent最近一次模型调用的token用量SSE事件（区分命中前缀缓存与未命中的输入token），
+    本轮没有用量数据时返回None
+    """
+    if not agent.last_usage:
+        return None
+    data = {
+        'sender': source,
+        'call': len(agent.usage_log),
+        **agent.last_usage,
+        'totals': agent.get_usage_summary()
+    }
+    return f"data: {json.dumps({'type': 'usage', 'data': data})}\n\n"
+
+# 撮合时是否以流式方式调用agent模型并推送payload增量（可通过请求参数stream_tokens覆盖）
+AGENT_TOKEN_STREAMING = os.environ.get('AGENT_TOKEN_STREAMING', '1') == '1'
 
-def create_message_from_agent_response(agent_response, source):
+def stream_agent_turn(agent, source, history, stream_tokens=True):
+    """
+    执行agent的一轮回复，期间把模型逐token生成的payload以payload_delta事件推送（生成器，用yield from调用）
+    模型请求在后台线程中进行，增量经队列交给当前生成器；完整、合法的回复仍由respond解析后返回，
+    调用方再写入消息队列。重试时attempt递增，前端据此丢弃上一次尝试的草稿
+    增量只在本轮进行中保留在撮合任务的事件日志里，本轮消息事件写入后即被删除（见MatchJob.append）
+
+    Returns:
+        dict: agent.respond的返回值
+    """
+    if not stream_tokens:
+        return agent.respond(history=history)
+
+    deltas = queue.Queue()
+    result = {}
+
+    def on_delta(field, text, msg_type, attempt):
+        deltas.put({'sender': source, 'field': field, 'delta': text, 'message_type': msg_type, 'attempt': attempt})
+
+    def run():
+        try:
+            result['response'] = agent.respond(history=history, on_delta=on_delta)
+        except Exception as e:
+            result['error'] = e
+        finally:
+            deltas.put(None)
+
+    threading.Thread(target=run, daemon=True).start()
+    while True:
+        delta = deltas.get()
+        if delta is None:
+            break
+        yield f"data: {json.dumps({'type': 'payload_delta', 'data': delta})}\n\n"
+    if 'error' in result:
+        raise result['error']
+    return result.get('response')
+
+def create_message_from_agent_response(session, agent_response, source):
     """
     从agent响应创建消息对象并添加到队列
     
     Args:
+        session (MessageQueue): 当前撮合会话的消息队列
         agent_response (dict): agent的响应
         source (str): 消息来源 ('candidate' 或 'recruiter')
     
@@ -198,24 +527,25 @@ def create_message_from_agent_response(agent_response, source):
     reasoning = agent_response.get('reasoning', '')
     payload = agent_response.get('payload', '')
     
-    return message_queue.add_message(
+    return session.add_message(
         source=source,
         msg_type=msg_type,
         reasoning=reasoning,
         payload=payload
     )
 
-def get_chat_messages_for_agent(source):
+def get_chat_messages_for_agent(session, source):
     """
     获取指定agent可见的对话消息
     
     Args:
+        session (MessageQueue): 当前撮合会话的消息队列
         source (str): agent来源 ('candidate' 或 'recruiter')
     
     Returns:
         list: 对话消息列表，格式化为agent可理解的格式
     """
-    chat_messages = message_queue.get_chat_history()
+    chat_messages = session.get_chat_history()
     formatted_messages = []
     
     for msg in chat_messages:
@@ -230,14 +560,6 @@ def get_chat_messages_for_agent(source):
     
     return formatted_messages
 
-# --- Database Setup ---
-DATABASE = 'talent_match.db'
-
-def get_db_connection():
-    conn = sqlite3.connect(DATABASE)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 # --- OpenAI Setup ---
 # Initialize OpenAI client for profile generation
 openai_client = OpenAI(
@@ -245,6 +567,14 @@ openai_client = OpenAI(
     base_url = "http://47.93.181.123:4000",
 )
 
+# --- Profile Generation Setup ---
+# 候选人画像与企业画像互不依赖，使用有界线程池并发生成
+PROFILE_GENERATION_TIMEOUT = float(os.environ.get('PROFILE_GENERATION_TIMEOUT', 120))
+profile_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('PROFILE_EXECUTOR_WORKERS', 8)),
+    thread_name_prefix='profile-gen'
+)
+
 def get_desensitized_version(resume_data):
     """Calls GenAI to create a desensitized version of the resume."""
     candidate_name = resume_data.get('name', 'Unknown')
@@ -416,12 +746,50 @@ def get_desensitized_jd_version(jd_data):
         # In case of failure, return the original data to avoid breaking the flow
         return jd_data
 
-def get_prompt(filename):
-    """Loads a prompt from the prompts directory."""
+# 合并模式：一次结构化调用同时返回完整记录和脱敏记录
+INGEST_MODES = ('separate', 'combined')
+COMBINED_EXTRACTION_PROMPTS = {
+    'RESUME': ('extract_desensitize_resume.txt', 'name'),
+    'JD': ('extract_desensitize_jd.txt', 'title'),
+}
+
+def extract_and_desensitize_combined(document, kind, label):
+    """
+    通过一次Gemini调用抽取并脱敏文档
+
+    Args:
+        document: 传给Gemini的文档内容（PDF part或文本）
+        kind (str): 'RESUME' 或 'JD'
+        label (str): 日志中使用的文档名称
+
+    Returns:
+        tuple: (完整记录, 脱敏记录)；调用或解析失败时返回None，由调用方回退到两次调用的方式
+    """
+    prompt_file, required_field = COMBINED_EXTRACTION_PROMPTS[kind]
+    task = f"{kind}_EXTRACT_DESENSITIZE"
+    prompt = get_prompt(prompt_file)
+    if not prompt:
+        log_processing_step(task, "ERROR", f"Could not load prompt {prompt_file}")
+        return None
+
     try:
-        with open(f'prompts/{filename}', 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
+        log_model_request("gemini-1.5-flash", task, label)
+        model = genai.GenerativeModel('gemini-1.5-flash', generation_config={"response_mime_type": "application/json"})
+        response = model.generate_content([document, prompt])
+        result = json.loads(response.text)
+
+        full, desensitized = result.get('full'), result.get('desensitized')
+        if not isinstance(full, dict) or not isinstance(desensitized, dict):
+            raise ValueError('Response must contain "full" and "desensitized" objects')
+        if not full.get(required_field):
+            raise ValueError(f'Failed to extract {required_field}')
+
+        log_model_response("gemini-1.5-flash", task, success=True, output_summary=f"Extracted: {full[required_field]}")
+        log_desensitization(kind, full[required_field], success=True)
+        return full, desensitized
+    except Exception as e:
+        log_model_response("gemini-1.5-flash", task, success=False, error_msg=str(e))
+        log_processing_step(task, "FALLBACK", f"{label}: falling back to separate extraction and desensitization")
         return None
 
 def generate_candidate_profile(resume_info, jd_info):
@@ -471,7 +839,8 @@ def generate_candidate_profile(resume_info, jd_info):
         response = openai_client.chat.completions.create(
             model="gpt-4o-mini",
             messages=messages,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            timeout=PROFILE_GENERATION_TIMEOUT
         )
         
         response_content = response.choices[0].message.content
@@ -532,7 +901,8 @@ def generate_company_profile(jd_info):
         response = openai_client.chat.completions.create(
             model="o4-mini",
             messages=messages,
-            response_format={"type": "json_object"}
+            response_format={"type": "json_object"},
+            timeout=PROFILE_GENERATION_TIMEOUT
         )
         
         response_content = response.choices[0].message.content
@@ -550,11 +920,61 @@ def generate_company_profile(jd_info):
         log_processing_step("COMPANY_PROFILE_GENERATION", "ERROR", f"Error generating company profile: {str(e)}")
         return None
 
+def generate_profiles_concurrently(resume_info, jd_info, timeout=PROFILE_GENERATION_TIMEOUT, force_regenerate=False):
+    """
+    同时发起候选人画像和企业画像的生成，等待两者完成
+    
+    Args:
+        resume_info (dict): 候选人简历信息
+        jd_info (dict): 职位描述信息
+        timeout (float): 每个画像调用的超时时间（秒）
+        force_regenerate (bool): 为True时跳过画像缓存，强制重新生成
+    
+    Returns:
+        tuple: (candidate_profile, company_profile, errors)
+            生成失败的画像为None，errors记录失败画像的原因，如 {'company_profile': '生成超时'}
+    """
+    futures = {
+        # 候选人画像按(脱敏简历, 脱敏JD)内容哈希缓存
+        'candidate_profile': profile_executor.submit(
+            get_cached_candidate_profile, resume_info, jd_info, generate_candidate_profile, force_regenerate
+        ),
+        # 企业画像只依赖JD，优先读取按JD内容哈希缓存的画像
+        'company_profile': profile_executor.submit(
+            get_cached_company_profile, jd_info, generate_company_profile, force_regenerate
+        )
+    }
+    
+    # 两个调用同时开始，共用同一个截止时间
+    deadline = time.monotonic() + timeout
+    profiles = {}
+    errors = {}
+    for name, future in futures.items():
+        try:
+            profiles[name] = future.result(timeout=max(0, deadline - time.monotonic()))
+            if not profiles[name]:
+                errors[name] = '生成失败'
+        except FutureTimeoutError:
+            future.cancel()
+            profiles[name] = None
+            errors[name] = f'生成超时（超过{int(timeout)}秒）'
+        except Exception as e:
+            profiles[name] = None
+            errors[name] = str(e)
+    
+    if errors:
+        log_processing_step("PROFILE_GENERATION", "ERROR", f"Profile generation failed: {errors}")
+    
+    return profiles['candidate_profile'], profiles['company_profile'], errors
+
+PROFILE_LABELS = {'candidate_profile': '候选人画像', 'company_profile': '企业画像'}
+
+def describe_profile_errors(errors):
+    """将画像生成失败信息格式化为用户可读的提示"""
+    return '；'.join(f"{PROFILE_LABELS.get(name, name)}{reason}" for name, reason in errors.items())
+
 def init_db():
-    conn = get_db_connection()
-    with open('schema.sql', 'r') as f:
-        conn.executescript(f.read())
-    conn.close()
+    check_and_migrate_db()
     print("Database initialized.")
 
 # 配置GenAI
@@ -574,7 +994,39 @@ UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'txt', 'pdf', 'json', 'xlsx'}
 
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
-app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16 MB
+app.config['MAX_CONTENT_LENGTH'] = 64 * 1024 * 1024  # 64 MB, 批量上传简历时一次请求包含多个PDF
+# 批量导入时同时进行的Gemini抽取/脱敏数量，上限用于避免超出模型服务的限流
+app.config['INGEST_CONCURRENCY'] = int(os.environ.get('INGEST_CONCURRENCY', 4))
+app.config['INGEST_MAX_CONCURRENCY'] = int(os.environ.get('INGEST_MAX_CONCURRENCY', 16))
+# 批量导入时每个写入事务包含的行数
+app.config['INGEST_WRITE_BATCH_SIZE'] = int(os.environ.get('INGEST_WRITE_BATCH_SIZE', 25))
+# 批量导入的默认抽取模式，combined失败时自动回退到separate
+app.config['INGEST_EXTRACTION_MODE'] = os.environ.get('INGEST_EXTRACTION_MODE', 'separate')
+# 批量撮合时同时进行的撮合场数（每场约10~20次模型调用）及单个批量任务的最大简历/JD对数
+app.config['BATCH_MATCH_CONCURRENCY'] = int(os.environ.get('BATCH_MATCH_CONCURRENCY', 4))
+app.config['BATCH_MATCH_MAX_CONCURRENCY'] = int(os.environ.get('BATCH_MATCH_MAX_CONCURRENCY', 16))
+app.config['BATCH_MATCH_MAX_PAIRS'] = int(os.environ.get('BATCH_MATCH_MAX_PAIRS', 5000))
+# 带prescreen_k时参与本地预筛的简历×JD组合数上限（预筛只做向量打分，可以远大于撮合对数）
+app.config['BATCH_MATCH_MAX_PRESCREEN_PAIRS'] = int(os.environ.get('BATCH_MATCH_MAX_PRESCREEN_PAIRS', 5_000_000))
+# 预筛接口单次返回的最大组合数
+SCREENING_MAX_K = 1000
+
+def get_ingest_concurrency():
+    """读取本次批量导入的并发数（表单参数concurrency可覆盖默认值，但不超过上限）"""
+    concurrency = request.form.get('concurrency', type=int) or app.config['INGEST_CONCURRENCY']
+    return max(1, min(concurrency, app.config['INGEST_MAX_CONCURRENCY']))
+
+def get_ingest_mode():
+    """
+    读取本次批量导入的抽取模式（表单参数mode可覆盖默认值）：separate为抽取、脱敏两次调用，combined为单次调用
+
+    Raises:
+        ValueError: mode不是支持的取值
+    """
+    mode = request.form.get('mode') or app.config['INGEST_EXTRACTION_MODE']
+    if mode not in INGEST_MODES:
+        raise ValueError(f"Unsupported mode: {mode}, expected one of {', '.join(INGEST_MODES)}")
+    return mode
 
 # Register Blueprints
 app.register_blueprint(resume_generator_bp)
@@ -596,57 +1048,14 @@ def index():
 # Resume管理页面
 @app.route('/resume')
 def resume_management():
-    conn = get_db_connection()
-    resumes_from_db = conn.execute('SELECT * FROM resumes ORDER BY created_at DESC').fetchall()
-    conn.close()
-    
-    resumes = []
-    for r in resumes_from_db:
-        resume = dict(r)
-        # Safely parse JSON fields
-        try:
-            resume['experience'] = json.loads(r['experience_json']) if r['experience_json'] else []
-        except json.JSONDecodeError:
-            resume['experience'] = r['experience_json'] # Store as plain text if not valid JSON
-        try:
-            resume['education'] = json.loads(r['education_json']) if 'education_json' in r.keys() and r['education_json'] else []
-        except json.JSONDecodeError:
-            resume['education'] = r['education_json']
-        try:
-            resume['publications'] = json.loads(r['publications_json']) if 'publications_json' in r.keys() and r['publications_json'] else []
-        except json.JSONDecodeError:
-            resume['publications'] = r['publications_json'] if 'publications_json' in r.keys() else ''
-        try:
-            resume['projects'] = json.loads(r['projects_json']) if 'projects_json' in r.keys() and r['projects_json'] else []
-        except json.JSONDecodeError:
-            resume['projects'] = r['projects_json'] if 'projects_json' in r.keys() else ''
-        
-        # Safely parse desensitized data
-        try:
-            resume['desensitized'] = json.loads(r['desensitized_json']) if 'desensitized_json' in r.keys() and r['desensitized_json'] else None
-        except (json.JSONDecodeError, TypeError):
-            resume['desensitized'] = None
-
-        resumes.append(resume)
-
-    return render_template('resume.html', resumes=resumes)
+    # 简历列表由前端通过 /api/resumes 按页加载
+    return render_template('resume.html', page_size=DEFAULT_PAGE_SIZE)
 
 # JD管理页面
 @app.route('/jd')
 def jd_management():
-    conn = get_db_connection()
-    jds_from_db = conn.execute('SELECT * FROM job_descriptions ORDER BY created_at DESC').fetchall()
-    conn.close()
-    job_descriptions = [dict(jd) for jd in jds_from_db]
-    
-    # Parse desensitized data for each JD
-    for jd in job_descriptions:
-        try:
-            jd['desensitized'] = json.loads(jd['desensitized_json']) if jd.get('desensitized_json') else None
-        except (json.JSONDecodeError, TypeError):
-            jd['desensitized'] = None
-    
-    return render_template('jd.html', job_descriptions=job_descriptions)
+    # 职位列表由前端通过 /api/jds 按页加载
+    return render_template('jd.html', page_size=DEFAULT_PAGE_SIZE)
 
 # 人岗撮合页面
 @app.route('/facilitate')
@@ -677,101 +1086,152 @@ def talent_facilitate():
 
     return render_template('facilitate.html', resumes=resumes, job_descriptions=jds, facilitation_history=facilitation_history)
 
-# API: 批量上传简历 (处理单个文件)
+# API: 分页列出简历 (keyset分页，fields指定返回字段)
+@app.route('/api/resumes', methods=['GET'])
+def list_resumes():
+    return list_table_page('resumes')
+
+# API: 分页列出职位描述
+@app.route('/api/jds', methods=['GET'])
+def list_jds():
+    return list_table_page('job_descriptions')
+
+def list_table_page(table):
+    """处理列表API的公共逻辑：?cursor=&limit=&fields=id,name,..."""
+    try:
+        fields = parse_fields(table, request.args.get('fields'))
+        page = list_page(
+            table,
+            fields=fields,
+            cursor=request.args.get('cursor') or None,
+            limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+        )
+        return jsonify({'status': 'success', 'data': page})
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        log_processing_step("LIST_PAGE", "ERROR", f"Failed to list {table}: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# API: 获取单份简历详情
+@app.route('/api/resume/<int:resume_id>', methods=['GET'])
+def get_resume(resume_id):
+    resume = get_record('resumes', resume_id)
+    if resume is None:
+        return jsonify({'status': 'error', 'message': '简历不存在'}), 404
+    return jsonify({'status': 'success', 'data': resume})
+
+# API: 获取单个职位描述详情
+@app.route('/api/jd/<int:jd_id>', methods=['GET'])
+def get_jd(jd_id):
+    jd = get_record('job_descriptions', jd_id)
+    if jd is None:
+        return jsonify({'status': 'error', 'message': '职位不存在'}), 404
+    return jsonify({'status': 'success', 'data': jd})
+
+# API: 批量上传简历 (一次请求可包含多个PDF文件，并发解析，SSE推送逐个文件的进度)
 @app.route('/api/resume/batch_upload', methods=['POST'])
 def batch_upload_resume():
-    if 'files' not in request.files:
+    # 兼容旧前端使用的resume_file字段
+    files = request.files.getlist('files') or request.files.getlist('resume_file')
+    if not files:
         return jsonify({'status': 'error', 'message': 'No file part in the request'}), 400
-
-    files = request.files.getlist('files')
-    if not files or not files[0].filename.endswith('.pdf'):
-        return jsonify({'status': 'error', 'message': 'Invalid file type, only PDF is supported'}), 400
-
-    log_processing_step("RESUME_BATCH_UPLOAD", "START", f"Processing {len(files)} files")
-    
     try:
-        # 1. AI Parsing
-        if os.environ.get("GOOGLE_API_KEY") is None:
-            log_processing_step("RESUME_BATCH_UPLOAD", "ERROR", "Google API Key not configured")
-            return jsonify({'status': 'error', 'message': 'Google API Key not configured'}), 500
+        mode = get_ingest_mode()
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
-        pdf_bytes = files[0].read()
+    if os.environ.get("GOOGLE_API_KEY") is None:
+        log_processing_step("RESUME_BATCH_UPLOAD", "ERROR", "Google API Key not configured")
+        return jsonify({'status': 'error', 'message': 'Google API Key not configured'}), 500
+
+    prompt = get_prompt('extract_resume_info.txt')
+    if not prompt:
+        log_processing_step("RESUME_BATCH_UPLOAD", "ERROR", "Could not load resume extraction prompt")
+        return jsonify({'status': 'error', 'message': 'Could not load resume extraction prompt.'}), 500
+
+    # Read every file into memory now; the request files are closed once the generator runs.
+    uploads = [{'filename': f.filename, 'content': f.read()} for f in files]
+    concurrency = get_ingest_concurrency()
+
+    def extract_resume(upload):
+        """工作线程：调用Gemini解析并脱敏单份简历（不访问数据库）"""
+        if not upload['filename'].lower().endswith('.pdf'):
+            raise ValueError('Invalid file type, only PDF is supported')
+
+        document = {"mime_type": "application/pdf", "data": upload['content']}
+        if mode == 'combined':
+            extracted = extract_and_desensitize_combined(document, 'RESUME', upload['filename'])
+            if extracted:
+                return extracted
+
+        log_model_request("gemini-1.5-flash", "RESUME_EXTRACTION", f"PDF file: {upload['filename']}")
         model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        prompt = get_prompt('extract_resume_info.txt')
-        if not prompt:
-            log_processing_step("RESUME_BATCH_UPLOAD", "ERROR", "Could not load resume extraction prompt")
-            return jsonify({'status': 'error', 'message': 'Could not load resume extraction prompt.'}), 500
-
-        # Log model request
-        log_model_request("gemini-1.5-flash", "RESUME_EXTRACTION", f"PDF file: {files[0].filename}")
-
-        response = model.generate_content([
-            {"mime_type": "application/pdf", "data": pdf_bytes},
-            prompt
-        ])
+        response = model.generate_content([document, prompt])
         
         cleaned_text = response.text.strip().replace('```json', '').replace('```', '').strip()
         data = json.loads(cleaned_text)
         
-        # Log successful extraction
-        candidate_name = data.get('name', 'Unknown')
+        candidate_name = data.get('name')
+        if not candidate_name:
+            raise ValueError('Failed to extract candidate name.')
         log_model_response("gemini-1.5-flash", "RESUME_EXTRACTION", success=True, 
                           output_summary=f"Extracted: {candidate_name}")
 
-        # 2. Desensitize the extracted data
         log_processing_step("RESUME_DESENSITIZATION", "START", f"Desensitizing data for: {candidate_name}")
-        desensitized_data = get_desensitized_version(data)
+        return data, get_desensitized_version(data)
 
-        # 3. Duplicate Check
-        name = data.get('name')
-        email = data.get('email')
-        phone = data.get('phone')
-        
-        if not name:
-            log_processing_step("RESUME_BATCH_UPLOAD", "ERROR", "Failed to extract candidate name")
-            return jsonify({'status': 'error', 'message': 'Failed to extract candidate name.'})
+    def generate_progress():
+        total_files = len(uploads)
+        results = [None] * total_files
+        processed_count = 0
+        log_processing_step("RESUME_BATCH_UPLOAD", "START", f"Processing {total_files} files with concurrency {concurrency}, mode {mode}")
+
+        def report(i, result):
+            """记录单个文件的最终结果并生成对应的进度事件"""
+            nonlocal processed_count
+            processed_count += 1
+            results[i] = result
+            log_batch_item("RESUME_BATCH_UPLOAD", i, total_files, result['filename'],
+                           success=result['status'] != 'error', details=result['message'])
+            return f"data: {json.dumps({'type': 'progress', 'processed': processed_count, 'total': total_files, **result})}\n\n"
+
+        def report_written(outcomes):
+            for outcome in outcomes:
+                i = outcome['index']
+                result = {'filename': uploads[i]['filename'], 'status': outcome['status'], 'message': outcome['message']}
+                if outcome['status'] == 'success':
+                    result.update(id=outcome['id'], message='Resume added successfully')
+                elif outcome['status'] == 'duplicate' and outcome['id'] is not None:
+                    result['message'] = f"Candidate already exists (ID: {outcome['id']})"
+                yield report(i, result)
 
-        log_processing_step("DUPLICATE_CHECK", "START", f"Checking duplicates for: {name}")
         conn = get_db_connection()
-        query = "SELECT id FROM resumes WHERE name = ? OR (email != '' AND email = ?) OR (phone != '' AND phone = ?)"
-        existing = conn.execute(query, (name, email, phone)).fetchone()
-
-        if existing:
+        writer = BatchWriter(conn, RESUME_SPEC, batch_size=app.config['INGEST_WRITE_BATCH_SIZE'])
+        try:
+            # 解析和脱敏在线程池中并发进行；校验通过的行交给单写者缓冲，按批次去重并在一个事务中写入
+            for i, extracted, error in run_in_bounded_pool(uploads, extract_resume, concurrency, thread_name_prefix='resume-ingest'):
+                if error:
+                    log_model_response("gemini-1.5-flash", "RESUME_EXTRACTION", success=False, error_msg=str(error))
+                    yield report(i, {'filename': uploads[i]['filename'], 'status': 'error', 'message': str(error)})
+                    continue
+                data, desensitized_data = extracted
+                yield from report_written(writer.add(i, build_resume_row(data, desensitized_data)))
+            yield from report_written(writer.flush())
+        finally:
             conn.close()
-            log_processing_step("DUPLICATE_CHECK", "COMPLETE", f"Duplicate found (ID: {existing['id']})")
-            return jsonify({'status': 'duplicate', 'message': f"Candidate already exists (ID: {existing['id']})"})
-
-        # 4. Insert into DB
-        log_processing_step("DATABASE_INSERT", "START", f"Inserting resume for: {name}")
-        conn.execute(
-            """
-            INSERT INTO resumes (name, email, phone, skills, summary, experience_json, education_json, publications_json, projects_json, desensitized_json)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                name, email, phone,
-                data.get('skills', ''),
-                data.get('summary', ''),
-                json.dumps(data.get('experience', [])),
-                json.dumps(data.get('education', [])),
-                json.dumps(data.get('publications', [])),
-                json.dumps(data.get('projects', [])),
-                json.dumps(desensitized_data)
-            )
-        )
-        conn.commit()
-        conn.close()
-        
-        log_processing_step("DATABASE_INSERT", "COMPLETE", f"Successfully inserted: {name}")
-        log_processing_step("RESUME_BATCH_UPLOAD", "COMPLETE", f"Successfully processed: {files[0].filename}")
-        
-        return jsonify({'status': 'success', 'message': 'Resume added successfully'})
+            invalidate_total_count('resumes')
+            refresh_compatibility_matrix()
 
-    except Exception as e:
-        log_processing_step("RESUME_BATCH_UPLOAD", "ERROR", f"Error processing {files[0].filename}: {str(e)}")
-        log_model_response("gemini-1.5-flash", "RESUME_EXTRACTION", success=False, error_msg=str(e))
-        return jsonify({'status': 'error', 'message': str(e)}), 500
+        log_processing_step("DATABASE_INSERT", "COMPLETE", f"Batch writer stats: {writer.stats}")
+        summary = {status: sum(1 for r in results if r and r['status'] == status) for status in ('success', 'duplicate', 'error')}
+        log_processing_step("RESUME_BATCH_UPLOAD", "COMPLETE", 
+                           f"Processed {total_files} files: {summary['success']} successful, {summary['duplicate']} duplicates, {summary['error']} failed")
+
+        # 最终报告按上传顺序排列，与完成顺序无关
+        yield f"data: {json.dumps({'type': 'complete', 'success_count': summary['success'], 'duplicate_count': summary['duplicate'], 'error_count': summary['error'], 'results': results})}\n\n"
+
+    return Response(generate_progress(), mimetype='text/event-stream')
 
 # API: 上传并解析简历
 @app.route('/api/resume/upload', methods=['POST'])
@@ -870,7 +1330,7 @@ def add_resume():
 
     # Insert new resume
     log_processing_step("DATABASE_INSERT", "START", f"Inserting resume for: {name}")
-    conn.execute(
+    cursor = conn.execute(
         """
         INSERT INTO resumes (name, email, phone, skills, summary, experience_json, education_json, publications_json, projects_json, desensitized_json)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
@@ -889,9 +1349,12 @@ def add_resume():
         )
     )
     conn.commit()
-    new_resume_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+    new_resume_id = cursor.lastrowid
     new_resume = conn.execute('SELECT * FROM resumes WHERE id = ?', (new_resume_id,)).fetchone()
     conn.close()
+    invalidate_total_count('resumes')
+    # 连接关闭后再同步矩阵（同步会使用连接池中的其他连接）
+    refresh_compatibility_matrix()
 
     log_processing_step("DATABASE_INSERT", "COMPLETE", f"Successfully inserted: {name} (ID: {new_resume_id})")
     log_processing_step("ADD_RESUME", "COMPLETE", f"Successfully added resume for: {name}")
@@ -909,6 +1372,8 @@ def delete_resume(resume_id):
     conn.execute('DELETE FROM resumes WHERE id = ?', (resume_id,))
     conn.commit()
     conn.close()
+    invalidate_total_count('resumes')
+    refresh_compatibility_matrix()
     return jsonify({'status': 'success', 'message': '简历删除成功'})
 
 # API: 批量上传职位描述
@@ -920,11 +1385,16 @@ def batch_upload_jd():
     file = request.files['jd_file']
     if file.filename == '':
         return jsonify({'status': 'error', 'message': 'No file selected'}), 400
+    try:
+        mode = get_ingest_mode()
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
 
     # Read the file into memory immediately to prevent "I/O operation on closed file"
     # in the generator that is executed after this function returns.
     file_content = file.read()
     filename = file.filename.lower()
+    concurrency = get_ingest_concurrency()
 
     def generate_progress():
         # 1. Read file content based on type
@@ -962,7 +1432,6 @@ def batch_upload_jd():
             yield f"data: {json.dumps({'status': 'error', 'message': 'Google API Key not configured'})}\n\n"
             return
         
-        model = genai.GenerativeModel('gemini-1.5-flash')
         prompt = get_prompt('extract_jd_info.txt')
         if not prompt:
             log_processing_step("JD_BATCH_UPLOAD", "ERROR", "Could not load JD extraction prompt")
@@ -971,68 +1440,95 @@ def batch_upload_jd():
 
         total_jobs = len(jobs_to_process)
         success_count = 0
-        failures = []
-        conn = get_db_connection()
+        results = [None] * total_jobs
+        processed_count = 0
         
-        log_processing_step("JD_BATCH_PROCESSING", "START", f"Processing {total_jobs} jobs")
-
-        for i, job in enumerate(jobs_to_process):
-            try:
-                # Log model request for each job
-                log_model_request("gemini-1.5-flash", "JD_EXTRACTION", f"Batch item {i+1}/{total_jobs}: {job['source']}")
-                
-                response = model.generate_content([job['content'], prompt])
-                cleaned_text = response.text.strip().replace('```json', '').replace('```', '').strip()
-                data = json.loads(cleaned_text)
+        def extract_job(indexed_job):
+            """工作线程：调用Gemini抽取并脱敏单条JD（不访问数据库）"""
+            i, job = indexed_job
+            if mode == 'combined':
+                extracted = extract_and_desensitize_combined(job['content'], 'JD', job['source'])
+                if extracted:
+                    return extracted
+
+            log_model_request("gemini-1.5-flash", "JD_EXTRACTION", f"Batch item {i+1}/{total_jobs}: {job['source']}")
+            
+            model = genai.GenerativeModel('gemini-1.5-flash')
+            response = model.generate_content([job['content'], prompt])
+            cleaned_text = response.text.strip().replace('```json', '').replace('```', '').strip()
+            data = json.loads(cleaned_text)
 
-                title = data.get('title')
-                if not title:
-                    raise ValueError('Failed to extract job title.')
-                
-                # Log successful extraction
-                company = data.get('company', 'Unknown')
-                log_model_response("gemini-1.5-flash", "JD_EXTRACTION", success=True, 
-                                  output_summary=f"Extracted: {title} @ {company}")
-                
-                # Get desensitized version
-                desensitized_data = get_desensitized_jd_version(data)
-                
-                # Check for duplicates
-                existing = conn.execute('SELECT id FROM job_descriptions WHERE title = ? AND company = ?', (title, company)).fetchone()
-                if existing:
-                    raise ValueError(f'Duplicate job already exists (ID: {existing["id"]})')
-
-                # Insert into database
-                conn.execute(
-                    """
-                    INSERT INTO job_descriptions (title, company, location, salary, requirements, description, benefits, desensitized_json)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (title, company, data.get('location', ''), data.get('salary', ''), data.get('requirements', ''), data.get('description', ''), data.get('benefits', ''), json.dumps(desensitized_data))
-                )
-                conn.commit()
+            title = data.get('title')
+            if not title:
+                raise ValueError('Failed to extract job title.')
+            
+            # Log successful extraction
+            company = data.get('company', 'Unknown')
+            log_model_response("gemini-1.5-flash", "JD_EXTRACTION", success=True, 
+                              output_summary=f"Extracted: {title} @ {company}")
+            
+            # Get desensitized version
+            desensitized_data = get_desensitized_jd_version(data)
+            return data, desensitized_data
+
+        def report(i, result):
+            """记录单条JD的最终结果并生成对应的进度事件"""
+            nonlocal processed_count, success_count
+            processed_count += 1
+            results[i] = result
+            progress = {'type': 'progress', 'processed': processed_count, 'total': total_jobs, 'source': result['source']}
+            if result['status'] == 'success':
                 success_count += 1
-                
-                # Log successful batch item
-                log_batch_item("JD_BATCH_UPLOAD", i, total_jobs, f"{title} @ {company}", success=True, 
-                              details="Successfully inserted into database")
-                
-                yield f"data: {json.dumps({'type': 'progress', 'processed': i + 1, 'total': total_jobs, 'source': job['source']})}\n\n"
+                log_batch_item("JD_BATCH_UPLOAD", i, total_jobs, result['title'], success=True,
+                               details="Successfully inserted into database")
+            else:
+                log_batch_item("JD_BATCH_UPLOAD", i, total_jobs, result['source'], success=False, details=result['reason'])
+                progress['error'] = result['reason']
+            return f"data: {json.dumps(progress)}\n\n"
+
+        def report_written(outcomes, rows):
+            for outcome in outcomes:
+                i = outcome['index']
+                source = jobs_to_process[i]['source']
+                if outcome['status'] == 'success':
+                    yield report(i, {'source': source, 'status': 'success', 'id': outcome['id'], 'title': rows.pop(i)['title']})
+                else:
+                    rows.pop(i, None)
+                    reason = outcome['message']
+                    if outcome['status'] == 'duplicate' and outcome['id'] is not None:
+                        reason = f"Duplicate job already exists (ID: {outcome['id']})"
+                    yield report(i, {'source': source, 'status': 'error', 'reason': reason})
 
-            except Exception as e:
-                # Log failed extraction
-                log_model_response("gemini-1.5-flash", "JD_EXTRACTION", success=False, error_msg=str(e))
-                log_batch_item("JD_BATCH_UPLOAD", i, total_jobs, job['source'], success=False, 
-                              details=str(e))
-                
-                failures.append({'source': job['source'], 'reason': str(e)})
-                yield f"data: {json.dumps({'type': 'progress', 'processed': i + 1, 'total': total_jobs, 'source': job['source'], 'error': str(e)})}\n\n"
-        
-        conn.close()
+        conn = get_db_connection()
+        writer = BatchWriter(conn, JD_SPEC, batch_size=app.config['INGEST_WRITE_BATCH_SIZE'])
+        buffered_rows = {}
+
+        log_processing_step("JD_BATCH_PROCESSING", "START", f"Processing {total_jobs} jobs with concurrency {concurrency}, mode {mode}")
+
+        try:
+            # 抽取和脱敏在线程池中并发进行；校验通过的行交给单写者缓冲，按批次去重并在一个事务中写入
+            for i, extracted, error in run_in_bounded_pool(list(enumerate(jobs_to_process)), extract_job, concurrency, thread_name_prefix='jd-ingest'):
+                if error:
+                    log_model_response("gemini-1.5-flash", "JD_EXTRACTION", success=False, error_msg=str(error))
+                    yield report(i, {'source': jobs_to_process[i]['source'], 'status': 'error', 'reason': str(error)})
+                    continue
+                data, desensitized_data = extracted
+                buffered_rows[i] = build_jd_row(data, desensitized_data)
+                yield from report_written(writer.add(i, buffered_rows[i]), buffered_rows)
+            yield from report_written(writer.flush(), buffered_rows)
+        finally:
+            conn.close()
+            invalidate_total_count('job_descriptions')
+            refresh_compatibility_matrix()
+
+        log_processing_step("DATABASE_INSERT", "COMPLETE", f"Batch writer stats: {writer.stats}")
+
+        # 最终报告按源文件中的行顺序排列，与完成顺序无关
+        failures = [{'source': r['source'], 'reason': r['reason']} for r in results if r and r['status'] == 'error']
         
         log_processing_step("JD_BATCH_PROCESSING", "COMPLETE", f"Processed {total_jobs} jobs: {success_count} successful, {len(failures)} failed")
 
-        yield f"data: {json.dumps({'type': 'complete', 'success_count': success_count, 'failures': failures})}\n\n"
+        yield f"data: {json.dumps({'type': 'complete', 'success_count': success_count, 'failures': failures, 'results': results})}\n\n"
 
     return Response(generate_progress(), mimetype='text/event-stream')
 
@@ -1086,6 +1582,9 @@ def add_jd():
     new_jd_id = cursor.lastrowid
     new_jd = conn.execute('SELECT * FROM job_descriptions WHERE id = ?', (new_jd_id,)).fetchone()
     conn.close()
+    invalidate_total_count('job_descriptions')
+    # 连接关闭后再同步矩阵（同步会使用连接池中的其他连接）
+    refresh_compatibility_matrix()
 
     log_processing_step("DATABASE_INSERT", "COMPLETE", f"Successfully inserted: {title} @ {company} (ID: {new_jd_id})")
     log_processing_step("ADD_JD", "COMPLETE", f"Successfully added JD: {title} @ {company}")
@@ -1101,8 +1600,11 @@ def add_jd():
 def delete_jd(jd_id):
     conn = get_db_connection()
     conn.execute('DELETE FROM job_descriptions WHERE id = ?', (jd_id,))
+    invalidate_company_profile(conn, jd_id)
     conn.commit()
     conn.close()
+    invalidate_total_count('job_descriptions')
+    refresh_compatibility_matrix()
     return jsonify({'status': 'success', 'message': '职位描述删除成功'})
 
 # API: AI画像生成
@@ -1111,6 +1613,8 @@ def generate_profiles():
     data = request.get_json()
     resume_id = data.get('resume_id')
     jd_id = data.get('jd_id')
+    # 为True时跳过画像缓存，强制重新生成
+    force_regenerate = bool(data.get('force_regenerate', False))
     
     if not resume_id or not jd_id:
         return jsonify({'status': 'error', 'message': '请选择简历和职位'}), 400
@@ -1130,25 +1634,27 @@ def generate_profiles():
     
     log_processing_step("PROFILE_GENERATION", "PROGRESS", f"Generating profiles for {candidate_name} with {jd_title} @ {company}")
     
-    # 2. 生成候选人求职画像
-    log_processing_step("PROFILE_GENERATION", "PROGRESS", "Generating candidate profile...")
-    candidate_profile = generate_candidate_profile(resume_info, jd_info)
-    
-    if not candidate_profile:
-        log_processing_step("PROFILE_GENERATION", "ERROR", "Failed to generate candidate profile")
-        return jsonify({'status': 'error', 'message': '生成候选人画像失败'}), 500
-    
-    # 3. 生成企业招聘画像
-    log_processing_step("PROFILE_GENERATION", "PROGRESS", "Generating company profile...")
-    company_profile = generate_company_profile(jd_info)
+    # 2. 并发生成候选人求职画像和企业招聘画像
+    log_processing_step("PROFILE_GENERATION", "PROGRESS", "Generating candidate and company profiles concurrently...")
+    candidate_profile, company_profile, errors = generate_profiles_concurrently(
+        resume_info, jd_info, force_regenerate=force_regenerate
+    )
     
-    if not company_profile:
-        log_processing_step("PROFILE_GENERATION", "ERROR", "Failed to generate company profile")
-        return jsonify({'status': 'error', 'message': '生成企业画像失败'}), 500
+    if errors:
+        return jsonify({
+            'status': 'error',
+            'message': f'生成画像失败：{describe_profile_errors(errors)}',
+            'errors': errors,
+            # 返回已成功生成的部分画像，便于前端展示或重试失败的部分
+            'profiles': {
+                'candidate_profile': candidate_profile,
+                'company_profile': company_profile
+            }
+        }), 500
     
     log_processing_step("PROFILE_GENERATION", "COMPLETE", f"Profile generation completed for {candidate_name} <-> {jd_title}")
     
-    # 4. Prepare data for JSON response (只包含画像信息，不保存到数据库)
+    # 3. Prepare data for JSON response (只包含画像信息，不保存到数据库)
     result_to_return = {
         'resume_name': resume_info['name'],
         'jd_title': jd_info['title'],
@@ -1164,6 +1670,41 @@ def generate_profiles():
         'profiles': result_to_return
     })
 
+# API: 画像缓存统计
+@app.route('/api/profile_cache/stats', methods=['GET'])
+def profile_cache_stats():
+    try:
+        return jsonify({'status': 'success', 'data': get_cache_stats()})
+    except Exception as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# API: 全文检索简历和职位描述
+@app.route('/api/search', methods=['GET'])
+def search():
+    query = request.args.get('q', '').strip()
+    doc_type = request.args.get('type', 'all')
+    limit = max(1, min(request.args.get('limit', 10, type=int), 50))
+    if not query:
+        return jsonify({'status': 'error', 'message': 'Missing search query (q)'}), 400
+    try:
+        return jsonify({'status': 'success', 'data': search_documents(query, doc_type=doc_type, limit=limit)})
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        log_processing_step("FULL_TEXT_SEARCH", "ERROR", f"Search failed: {str(e)}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+# API: 数据库连接池统计
+@app.route('/api/db/pool_stats', methods=['GET'])
+def db_pool_stats():
+    return jsonify({'status': 'success', 'data': connection_pool.stats()})
+
+# API: 提示词模板版本与注册表统计
+@app.route('/api/prompts/versions', methods=['GET'])
+def prompt_versions():
+    prompt_registry.load_all()
+    return jsonify({'status': 'success', 'data': {'versions': prompt_registry.versions(), 'stats': prompt_registry.stats()}})
+
 # API: 获取单个撮合历史
 @app.route('/api/facilitate/<int:facilitation_id>')
 def get_facilitation_result(facilitation_id):
@@ -1215,16 +1756,24 @@ def clear_database():
     try:
         conn = get_db_connection()
         conn.execute(f'DELETE FROM {table_to_clear}')
+        if table_to_clear == 'job_descriptions':
+            invalidate_company_profile(conn)
         # Reset autoincrement counter for sqlite
         conn.execute(f"DELETE FROM sqlite_sequence WHERE name='{table_to_clear}'")
         conn.commit()
         conn.close()
+        invalidate_total_count(table_to_clear)
+        reset_screening_index(table_to_clear)
+        compatibility_matrix.reset()
         return jsonify({'status': 'success', 'message': f"Table '{table_to_clear}' has been cleared."})
     except sqlite3.Error as e:
         # Handle case where table might not be in sqlite_sequence (if it never had data)
         if "no such table: sqlite_sequence" in str(e):
              conn.commit()
              conn.close()
+             invalidate_total_count(table_to_clear)
+             reset_screening_index(table_to_clear)
+             compatibility_matrix.reset()
              return jsonify({'status': 'success', 'message': f"Table '{table_to_clear}' has been cleared."})
         print(f"Database clear error: {e}")
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -1253,132 +1802,199 @@ def log_stream():
     return Response(generate_logs(), mimetype='text/event-stream', 
                    headers={'Cache-Control': 'no-cache'})
 
-# API: AI撮合流式接口（实时对话展示）
-@app.route('/api/ai_matching_stream', methods=['GET'])
-def ai_matching_stream():
-    resume_id = request.args.get('resume_id', type=int)
-    jd_id = request.args.get('jd_id', type=int)
-    profiles_param = request.args.get('profiles')
-    
-    if not resume_id or not jd_id:
-        return jsonify({'status': 'error', 'message': '请选择简历和职位'}), 400
-    
-    log_processing_step("AI_MATCHING_STREAM", "START", f"Starting streaming AI matching for Resume ID: {resume_id}, JD ID: {jd_id}")
-    
-    def generate_matching_stream():
-        try:
-            # 初始化消息队列会话
-            session_id = f"{resume_id}_{jd_id}_{int(time.time())}"
-            message_queue.init_session(session_id)
-            
-            # 发送开始信号
-            yield f"data: {json.dumps({'type': 'start', 'message': '开始AI撮合...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-            
-            # 1. 获取简历和JD的完整信息
-            yield f"data: {json.dumps({'type': 'progress', 'message': '正在获取简历和职位信息...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-            resume_info, jd_info = get_resume_and_jd_info(resume_id, jd_id)
-            
-            if not resume_info or not jd_info:
-                yield f"data: {json.dumps({'type': 'error', 'message': '找不到对应的简历或职位', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-                return
-            
-            candidate_name = resume_info['name']
-            jd_title = jd_info['title']
-            company = jd_info['company']
-            
-            # 2. 获取或生成画像
-            if profiles_param:
-                # 使用传递的画像数据
-                try:
-                    profiles_data = json.loads(profiles_param)
-                    candidate_profile = profiles_data.get('candidate_profile')
-                    company_profile = profiles_data.get('company_profile')
-                    yield f"data: {json.dumps({'type': 'progress', 'message': '使用已生成的画像数据...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-                    
-                    if not candidate_profile or not company_profile:
-                        yield f"data: {json.dumps({'type': 'error', 'message': '画像数据不完整，请重新生成画像', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-                        return
-                except (json.JSONDecodeError, KeyError) as e:
-                    yield f"data: {json.dumps({'type': 'error', 'message': '画像数据解析失败，请重新生成画像', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-                    return
-            else:
-                # 重新生成画像（兼容旧流程）
-                yield f"data: {json.dumps({'type': 'progress', 'message': '正在生成候选人和企业画像...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-                candidate_profile = generate_candidate_profile(resume_info, jd_info)
-                company_profile = generate_company_profile(jd_info)
+# 前端渲染撮合事件的节奏倍数上限（pace=1时planning后停顿0.5秒、chatting后停顿1秒，0表示不停顿）
+MAX_MATCHING_PACE = 5.0
+
+def run_matching_session(resume_id, jd_id, job_id, profiles_param=None, force_regenerate=False, pace=1.0, stream_tokens=True):
+    """
+    运行一场完整的简历/JD撮合，按顺序产生SSE事件文本（"data: {...}\\n\\n"），结果写入facilitation_results
+    由后台撮合任务（单场实时观看或批量撮合）消费，不依赖请求上下文
+    """
+    # 为本次撮合创建独立的消息队列会话（同一秒内同一对简历/JD也不会冲突）
+    session_id = f"{resume_id}_{jd_id}_{int(time.time())}_{uuid.uuid4().hex[:6]}"
+    session = message_queue_registry.create(session_id)
+    try:
+        # 发送开始信号
+        yield f"data: {json.dumps({'type': 'start', 'message': '开始AI撮合...', 'job_id': job_id, 'session_id': session_id, 'pace': pace, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        
+        # 1. 获取简历和JD的完整信息
+        yield f"data: {json.dumps({'type': 'progress', 'message': '正在获取简历和职位信息...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        resume_info, jd_info = get_resume_and_jd_info(resume_id, jd_id)
+        
+        if not resume_info or not jd_info:
+            yield f"data: {json.dumps({'type': 'error', 'message': '找不到对应的简历或职位', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+            return
+        
+        candidate_name = resume_info['name']
+        jd_title = jd_info['title']
+        company = jd_info['company']
+        
+        # 2. 获取或生成画像
+        if profiles_param:
+            # 使用传递的画像数据
+            try:
+                profiles_data = json.loads(profiles_param)
+                candidate_profile = profiles_data.get('candidate_profile')
+                company_profile = profiles_data.get('company_profile')
+                yield f"data: {json.dumps({'type': 'progress', 'message': '使用已生成的画像数据...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
                 
                 if not candidate_profile or not company_profile:
-                    yield f"data: {json.dumps({'type': 'error', 'message': '生成画像失败，无法进行撮合', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+                    yield f"data: {json.dumps({'type': 'error', 'message': '画像数据不完整，请重新生成画像', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
                     return
+            except (json.JSONDecodeError, KeyError) as e:
+                yield f"data: {json.dumps({'type': 'error', 'message': '画像数据解析失败，请重新生成画像', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+                return
+        else:
+            # 重新生成画像（兼容旧流程）
+            yield f"data: {json.dumps({'type': 'progress', 'message': '正在生成候选人和企业画像...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+            candidate_profile, company_profile, errors = generate_profiles_concurrently(
+                resume_info, jd_info, force_regenerate=force_regenerate
+            )
             
-            # 3. 准备Agent数据
-            yield f"data: {json.dumps({'type': 'progress', 'message': '正在准备代理数据...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-            
-            # 候选人agent看到：完整简历 + 脱敏JD + 候选人画像
-            full_resume = {
-                'name': resume_info['name'],
-                'email': resume_info['email'],
-                'phone': resume_info['phone'],
-                'skills': resume_info['skills'],
-                'summary': resume_info['summary'],
-                'experience': resume_info['experience'],
-                'education': resume_info['education'],
-                'publications': resume_info['publications'],
-                'projects': resume_info['projects']
-            }
-            
-            desensitized_jd = jd_info.get('desensitized_data') if jd_info.get('desensitized_data') else {
-                'title': jd_info['title'],
-                'company': '某公司',
-                'location': jd_info.get('location', '某城市'),
-                'salary': '面议',
-                'requirements': jd_info['requirements'],
-                'description': jd_info['description'],
-                'benefits': jd_info['benefits']
-            }
-            
-            # 招聘方agent看到：脱敏简历 + 完整JD + 企业画像
-            desensitized_resume = resume_info.get('desensitized_data') if resume_info.get('desensitized_data') else {
-                'name': '候选人',
-                'email': 'hidden@example.com',
-                'phone': '***-****-****',
-                'skills': resume_info['skills'],
-                'summary': resume_info['summary'],
-                'experience': resume_info['experience'],
-                'education': resume_info['education'],
-                'publications': resume_info['publications'],
-                'projects': resume_info['projects']
-            }
-            
-            full_jd = {
-                'title': jd_info['title'],
-                'company': jd_info['company'],
-                'location': jd_info['location'],
-                'salary': jd_info['salary'],
-                'requirements': jd_info['requirements'],
-                'description': jd_info['description'],
-                'benefits': jd_info['benefits']
-            }
-            
-            # 4. 创建双方agent
-            yield f"data: {json.dumps({'type': 'progress', 'message': '正在初始化候选人和企业代理...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-            candidate_agent = CandidateAgent(full_resume, desensitized_jd, candidate_profile)
-            recruiter_agent = RecruiterAgent(desensitized_resume, full_jd, company_profile)
-            
-            # 发送撮合信息
-            yield f"data: {json.dumps({'type': 'matching_info', 'data': {'resume_name': candidate_name, 'jd_title': jd_title, 'company': company}, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-            
-            # 5. 开始agent对话撮合（使用消息队列）
-            yield f"data: {json.dumps({'type': 'progress', 'message': '开始代理对话撮合...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+            if errors:
+                yield f"data: {json.dumps({'type': 'error', 'message': f'生成画像失败，无法进行撮合：{describe_profile_errors(errors)}', 'errors': errors, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+                return
+        
+        # 3. 准备Agent数据
+        yield f"data: {json.dumps({'type': 'progress', 'message': '正在准备代理数据...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        
+        # 候选人agent看到：完整简历 + 脱敏JD + 候选人画像
+        full_resume = {
+            'name': resume_info['name'],
+            'email': resume_info['email'],
+            'phone': resume_info['phone'],
+            'skills': resume_info['skills'],
+            'summary': resume_info['summary'],
+            'experience': resume_info['experience'],
+            'education': resume_info['education'],
+            'publications': resume_info['publications'],
+            'projects': resume_info['projects']
+        }
+        
+        desensitized_jd = jd_info.get('desensitized_data') if jd_info.get('desensitized_data') else {
+            'title': jd_info['title'],
+            'company': '某公司',
+            'location': jd_info.get('location', '某城市'),
+            'salary': '面议',
+            'requirements': jd_info['requirements'],
+            'description': jd_info['description'],
+            'benefits': jd_info['benefits']
+        }
+        
+        # 招聘方agent看到：脱敏简历 + 完整JD + 企业画像
+        desensitized_resume = resume_info.get('desensitized_data') if resume_info.get('desensitized_data') else {
+            'name': '候选人',
+            'email': 'hidden@example.com',
+            'phone': '***-****-****',
+            'skills': resume_info['skills'],
+            'summary': resume_info['summary'],
+            'experience': resume_info['experience'],
+            'education': resume_info['education'],
+            'publications': resume_info['publications'],
+            'projects': resume_info['projects']
+        }
+        
+        full_jd = {
+            'title': jd_info['title'],
+            'company': jd_info['company'],
+            'location': jd_info['location'],
+            'salary': jd_info['salary'],
+            'requirements': jd_info['requirements'],
+            'description': jd_info['description'],
+            'benefits': jd_info['benefits']
+        }
+        
+        # 4. 创建双方agent
+        yield f"data: {json.dumps({'type': 'progress', 'message': '正在初始化候选人和企业代理...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        candidate_agent = CandidateAgent(full_resume, desensitized_jd, candidate_profile)
+        recruiter_agent = RecruiterAgent(desensitized_resume, full_jd, company_profile)
+        
+        # 发送撮合信息
+        yield f"data: {json.dumps({'type': 'matching_info', 'data': {'resume_name': candidate_name, 'jd_title': jd_title, 'company': company}, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        
+        # 5. 开始agent对话撮合（使用消息队列）
+        yield f"data: {json.dumps({'type': 'progress', 'message': '开始代理对话撮合...', 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        
+        max_rounds = 10  # 最大对话轮数
+        current_round = 1
+        
+        # 候选人agent先开始
+        history = get_history_for_agent(session, 'candidate')
+        yield format_prompt_size_event(session, candidate_agent, 'candidate')
+        candidate_response = yield from stream_agent_turn(candidate_agent, 'candidate', history, stream_tokens)
+        usage_event = format_usage_event(candidate_agent, 'candidate')
+        if usage_event:
+            yield usage_event
+        if candidate_response:
+            # 将响应添加到消息队列
+            message = create_message_from_agent_response(session, candidate_response, 'candidate')
+            if message:
+                # 构造一个更简洁的数据结构
+                data_payload = {
+                    'sender': 'candidate',
+                    'reasoning': message.get('reasoning'),
+                    'timestamp': message.get('timestamp')
+                }
+                message_type = message.get('type')
+
+                if message_type == 'planning':
+                    data_payload['content'] = message.get('payload')
+                    yield f"data: {json.dumps({'type': 'planning', 'data': data_payload})}\n\n"
+                elif message_type == 'chatting':
+                    data_payload['content'] = message.get('payload')
+                    data_payload['round'] = current_round
+                    yield f"data: {json.dumps({'type': 'chatting', 'data': data_payload})}\n\n"
+                elif message_type == 'decision':
+                    data_payload['decision'] = message.get('payload')
+                    yield f"data: {json.dumps({'type': 'decision', 'data': data_payload})}\n\n"
+        
+        # 开始对话循环
+        while current_round < max_rounds and not candidate_agent.has_reached_decision() and not recruiter_agent.has_reached_decision():
+            # 招聘方回应
+            history = get_history_for_agent(session, 'recruiter')
+            yield format_prompt_size_event(session, recruiter_agent, 'recruiter')
+            recruiter_response = yield from stream_agent_turn(recruiter_agent, 'recruiter', history, stream_tokens)
+            usage_event = format_usage_event(recruiter_agent, 'recruiter')
+            if usage_event:
+                yield usage_event
+            if recruiter_response:
+                # 将响应添加到消息队列
+                message = create_message_from_agent_response(session, recruiter_response, 'recruiter')
+                if message:
+                    # 构造一个更简洁的数据结构
+                    data_payload = {
+                        'sender': 'recruiter',
+                        'reasoning': message.get('reasoning'),
+                        'timestamp': message.get('timestamp')
+                    }
+                    message_type = message.get('type')
+
+                    if message_type == 'planning':
+                        data_payload['content'] = message.get('payload')
+                        yield f"data: {json.dumps({'type': 'planning', 'data': data_payload})}\n\n"
+                    elif message_type == 'chatting':
+                        data_payload['content'] = message.get('payload')
+                        data_payload['round'] = current_round
+                        yield f"data: {json.dumps({'type': 'chatting', 'data': data_payload})}\n\n"
+                    elif message_type == 'decision':
+                        data_payload['decision'] = message.get('payload')
+                        yield f"data: {json.dumps({'type': 'decision', 'data': data_payload})}\n\n"
+                        break
             
-            max_rounds = 10  # 最大对话轮数
-            current_round = 1
+            # 如果招聘方已做决定，跳出循环
+            if recruiter_agent.has_reached_decision():
+                break
             
-            # 候选人agent先开始
-            candidate_response = candidate_agent.respond(history=get_history_for_agent('candidate'))
+            # 候选人回应
+            history = get_history_for_agent(session, 'candidate')
+            yield format_prompt_size_event(session, candidate_agent, 'candidate')
+            candidate_response = yield from stream_agent_turn(candidate_agent, 'candidate', history, stream_tokens)
+            usage_event = format_usage_event(candidate_agent, 'candidate')
+            if usage_event:
+                yield usage_event
             if candidate_response:
                 # 将响应添加到消息队列
-                message = create_message_from_agent_response(candidate_response, 'candidate')
+                message = create_message_from_agent_response(session, candidate_response, 'candidate')
                 if message:
                     # 构造一个更简洁的数据结构
                     data_payload = {
@@ -1391,176 +2007,401 @@ def ai_matching_stream():
                     if message_type == 'planning':
                         data_payload['content'] = message.get('payload')
                         yield f"data: {json.dumps({'type': 'planning', 'data': data_payload})}\n\n"
-                        time.sleep(0.5)
                     elif message_type == 'chatting':
+                        current_round += 1
                         data_payload['content'] = message.get('payload')
                         data_payload['round'] = current_round
                         yield f"data: {json.dumps({'type': 'chatting', 'data': data_payload})}\n\n"
-                        time.sleep(1)
                     elif message_type == 'decision':
                         data_payload['decision'] = message.get('payload')
                         yield f"data: {json.dumps({'type': 'decision', 'data': data_payload})}\n\n"
+                        break
             
-            # 开始对话循环
-            while current_round < max_rounds and not candidate_agent.has_reached_decision() and not recruiter_agent.has_reached_decision():
-                # 招聘方回应
-                recruiter_response = recruiter_agent.respond(
-                    history=get_history_for_agent('recruiter')
-                )
-                if recruiter_response:
-                    # 将响应添加到消息队列
-                    message = create_message_from_agent_response(recruiter_response, 'recruiter')
-                    if message:
-                        # 构造一个更简洁的数据结构
-                        data_payload = {
-                            'sender': 'recruiter',
-                            'reasoning': message.get('reasoning'),
-                            'timestamp': message.get('timestamp')
-                        }
-                        message_type = message.get('type')
-
-                        if message_type == 'planning':
-                            data_payload['content'] = message.get('payload')
-                            yield f"data: {json.dumps({'type': 'planning', 'data': data_payload})}\n\n"
-                            time.sleep(0.5)
-                        elif message_type == 'chatting':
-                            data_payload['content'] = message.get('payload')
-                            data_payload['round'] = current_round
-                            yield f"data: {json.dumps({'type': 'chatting', 'data': data_payload})}\n\n"
-                            time.sleep(1)
-                        elif message_type == 'decision':
-                            data_payload['decision'] = message.get('payload')
-                            yield f"data: {json.dumps({'type': 'decision', 'data': data_payload})}\n\n"
-                            break
-                
-                # 如果招聘方已做决定，跳出循环
-                if recruiter_agent.has_reached_decision():
-                    break
-                
-                # 候选人回应
-                candidate_response = candidate_agent.respond(
-                    history=get_history_for_agent('candidate')
-                )
-                if candidate_response:
-                    # 将响应添加到消息队列
-                    message = create_message_from_agent_response(candidate_response, 'candidate')
-                    if message:
-                        # 构造一个更简洁的数据结构
-                        data_payload = {
-                            'sender': 'candidate',
-                            'reasoning': message.get('reasoning'),
-                            'timestamp': message.get('timestamp')
-                        }
-                        message_type = message.get('type')
-
-                        if message_type == 'planning':
-                            data_payload['content'] = message.get('payload')
-                            yield f"data: {json.dumps({'type': 'planning', 'data': data_payload})}\n\n"
-                            time.sleep(0.5)
-                        elif message_type == 'chatting':
-                            current_round += 1
-                            data_payload['content'] = message.get('payload')
-                            data_payload['round'] = current_round
-                            yield f"data: {json.dumps({'type': 'chatting', 'data': data_payload})}\n\n"
-                            time.sleep(1)
-                        elif message_type == 'decision':
-                            data_payload['decision'] = message.get('payload')
-                            yield f"data: {json.dumps({'type': 'decision', 'data': data_payload})}\n\n"
-                            break
-                
-                # 如果候选人已做决定，跳出循环
-                if candidate_agent.has_reached_decision():
-                    break
-            
-            # 6. 发送最终决策结果
-            final_decisions = {
-                'candidate_decision': candidate_agent.get_final_decision(),
-                'recruiter_decision': recruiter_agent.get_final_decision()
+            # 如果候选人已做决定，跳出循环
+            if candidate_agent.has_reached_decision():
+                break
+        
+        # 6. 发送最终决策结果
+        final_decisions = {
+            'candidate_decision': candidate_agent.get_final_decision(),
+            'recruiter_decision': recruiter_agent.get_final_decision()
+        }
+        
+        yield f"data: {json.dumps({'type': 'decisions', 'data': final_decisions, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        
+        # 7. 计算最终结果
+        if final_decisions['candidate_decision'] == 'SUITABLE' and final_decisions['recruiter_decision'] == 'SUITABLE':
+            final_result = {
+                'status': 'MATCH',
+                'message': '双方撮合成功！',
+                'icon': '🎉',
+                'summary': f'{candidate_name} 和 {company} 的 {jd_title} 职位达成匹配'
             }
+        elif final_decisions['candidate_decision'] == 'UNSUITABLE' or final_decisions['recruiter_decision'] == 'UNSUITABLE':
+            final_result = {
+                'status': 'NO_MATCH',
+                'message': '撮合未成功',
+                'icon': '😔',
+                'summary': '双方未能达成一致，撮合失败'
+            }
+        else:
+            final_result = {
+                'status': 'UNCERTAIN',
+                'message': '撮合结果不明确',
+                'icon': '🤔',
+                'summary': '需要进一步沟通确认'
+            }
+        
+        # 8. 保存撮合结果到数据库
+        facilitation_id = None
+        try:
+            conn = get_db_connection()
             
-            yield f"data: {json.dumps({'type': 'decisions', 'data': final_decisions, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-            
-            # 7. 计算最终结果
-            if final_decisions['candidate_decision'] == 'SUITABLE' and final_decisions['recruiter_decision'] == 'SUITABLE':
-                final_result = {
-                    'status': 'MATCH',
-                    'message': '双方撮合成功！',
-                    'icon': '🎉',
-                    'summary': f'{candidate_name} 和 {company} 的 {jd_title} 职位达成匹配'
-                }
-            elif final_decisions['candidate_decision'] == 'UNSUITABLE' or final_decisions['recruiter_decision'] == 'UNSUITABLE':
-                final_result = {
-                    'status': 'NO_MATCH',
-                    'message': '撮合未成功',
-                    'icon': '😔',
-                    'summary': '双方未能达成一致，撮合失败'
-                }
-            else:
-                final_result = {
-                    'status': 'UNCERTAIN',
-                    'message': '撮合结果不明确',
-                    'icon': '🤔',
-                    'summary': '需要进一步沟通确认'
-                }
+            # 获取消息队列摘要
+            session_summary = session.get_session_summary()
             
-            # 8. 保存撮合结果到数据库
-            try:
-                conn = get_db_connection()
-                
-                # 获取消息队列摘要
-                session_summary = message_queue.get_session_summary()
-                
-                conn.execute(
-                    """
-                    INSERT INTO facilitation_results 
-                    (resume_id, jd_id, candidate_decision, recruiter_decision, final_result, conversation_log, session_summary)
-                    VALUES (?, ?, ?, ?, ?, ?, ?)
-                    """,
-                    (
-                        resume_id,
-                        jd_id,
-                        final_decisions['candidate_decision'],
-                        final_decisions['recruiter_decision'],
-                        final_result['status'],
-                        json.dumps(message_queue.messages),  # 保存完整的消息队列
-                        json.dumps(session_summary)  # 保存会话摘要
-                    )
+            cursor = conn.execute(
+                """
+                INSERT INTO facilitation_results 
+                (resume_id, jd_id, candidate_decision, recruiter_decision, final_result, conversation_log, session_summary)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    resume_id,
+                    jd_id,
+                    final_decisions['candidate_decision'],
+                    final_decisions['recruiter_decision'],
+                    final_result['status'],
+                    json.dumps(session.messages),  # 保存完整的消息队列
+                    json.dumps(session_summary)  # 保存会话摘要
                 )
-                conn.commit()
-                conn.close()
-                
-                log_processing_step("AI_MATCHING_STREAM", "COMPLETE", f"Saved facilitation result: {final_result['status']}")
-                
-            except Exception as e:
-                log_processing_step("AI_MATCHING_STREAM", "ERROR", f"Failed to save result: {str(e)}")
+            )
+            facilitation_id = cursor.lastrowid
+            conn.commit()
+            conn.close()
             
-            # 发送完成信号
-            yield f"data: {json.dumps({'type': 'complete', 'data': final_result, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+            log_processing_step("AI_MATCHING_STREAM", "COMPLETE", f"Saved facilitation result: {final_result['status']}")
             
-        except GeneratorExit:
-            log_processing_step("AI_MATCHING_STREAM", "INFO", "Client disconnected, closing stream.")
         except Exception as e:
-            error_message = f"撮合过程中发生错误: {str(e)}"
-            log_processing_step("AI_MATCHING_STREAM", "ERROR", error_message)
-            yield f"data: {json.dumps({'type': 'error', 'message': error_message, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
-        finally:
-            # 清理消息队列
-            message_queue.clear()
+            log_processing_step("AI_MATCHING_STREAM", "ERROR", f"Failed to save result: {str(e)}")
+        
+        # 发送完成信号
+        usage_summary = {'candidate': candidate_agent.get_usage_summary(), 'recruiter': recruiter_agent.get_usage_summary()}
+        log_processing_step("AI_MATCHING_STREAM", "USAGE", f"Token usage: {json.dumps(usage_summary)}")
+        yield f"data: {json.dumps({'type': 'complete', 'data': final_result, 'facilitation_id': facilitation_id, 'usage': usage_summary, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+        
+    except GeneratorExit:
+        log_processing_step("AI_MATCHING_STREAM", "INFO", f"Job {job_id} closed before completion.")
+    except Exception as e:
+        error_message = f"撮合过程中发生错误: {str(e)}"
+        log_processing_step("AI_MATCHING_STREAM", "ERROR", error_message)
+        yield f"data: {json.dumps({'type': 'error', 'message': error_message, 'timestamp': datetime.datetime.now().isoformat()})}\n\n"
+    finally:
+        # 清理并注销本次会话的消息队列
+        message_queue_registry.remove(session_id)
+
+# API: AI撮合流式接口（实时对话展示）
+@app.route('/api/ai_matching_stream', methods=['GET'])
+def ai_matching_stream():
+    resume_id = request.args.get('resume_id', type=int)
+    jd_id = request.args.get('jd_id', type=int)
+    profiles_param = request.args.get('profiles')
+    force_regenerate = request.args.get('force_regenerate', 'false').lower() in ('1', 'true', 'yes')
+    # 展示节奏由前端控制：服务端不再sleep，事件产生后立即发送，pace只回传给前端用于渲染
+    pace = request.args.get('pace', default=1.0, type=float)
+    pace = min(max(pace, 0.0), MAX_MATCHING_PACE) if math.isfinite(pace) else 1.0
+    stream_tokens = request.args.get('stream_tokens', '1' if AGENT_TOKEN_STREAMING else '0').lower() in ('1', 'true', 'yes')
+    
+    # 撮合在后台任务中运行，本接口只负责观看：传入job_id（或EventSource自动重连时携带的Last-Event-ID）
+    # 时附加到已有任务，回放断线期间错过的事件后继续接收新事件
+    job_id = request.args.get('job_id')
+    last_job_id, last_seq = parse_last_event_id(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    job_id = job_id or last_job_id
+    if job_id:
+        job = match_job_registry.get(job_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': f'撮合任务不存在或已过期: {job_id}'}), 404
+        after = last_seq if last_job_id == job_id else 0
+        if job.finished and after >= job.last_seq():
+            # 任务已结束且没有未读事件，返回204让EventSource停止重连
+            return Response(status=204)
+        log_processing_step("AI_MATCHING_STREAM", "ATTACH", f"Viewer attached to job {job_id} after event {after}")
+        return Response(job.stream(after), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
     
-    return Response(generate_matching_stream(), mimetype='text/event-stream')
+    if not resume_id or not jd_id:
+        return jsonify({'status': 'error', 'message': '请选择简历和职位'}), 400
+    
+    def generate_matching_stream(job_id):
+        return run_matching_session(resume_id, jd_id, job_id, profiles_param, force_regenerate, pace, stream_tokens)
+    
+    # 同一对简历/JD的撮合运行中时直接附加到该任务（例如刷新页面），不会再次调用模型；
+    # 运行中的任务输入不同（强制重新生成画像、不同的画像、不同的推送方式）时返回409，而不是附加到结果不符的任务
+    inputs = {'profiles': profiles_param, 'force_regenerate': force_regenerate, 'stream_tokens': stream_tokens}
+    job, created = match_job_registry.start(
+        generate_matching_stream, key=(resume_id, jd_id),
+        params={'resume_id': resume_id, 'jd_id': jd_id, 'pace': pace, **inputs}
+    )
+    if job is None:
+        # 撮合在后台运行，客户端断开后仍会继续调用模型，因此同时运行的撮合数有上限
+        return jsonify({
+            'status': 'error',
+            'message': f'同时进行的撮合已达上限（{match_job_registry.max_running}），请稍后重试'
+        }), 429, {'Retry-After': '30'}
+    if not created and any(job.params.get(name) != value for name, value in inputs.items()):
+        log_processing_step("AI_MATCHING_STREAM", "CONFLICT", f"Matching for Resume ID: {resume_id}, JD ID: {jd_id} already running as job {job.job_id} with different inputs")
+        return jsonify({
+            'status': 'error',
+            'message': '该简历与职位的撮合正在以不同的参数进行，请等待其结束或附加到该任务',
+            'job_id': job.job_id
+        }), 409
+    if created:
+        log_processing_step("AI_MATCHING_STREAM", "START", f"Starting streaming AI matching for Resume ID: {resume_id}, JD ID: {jd_id}, job: {job.job_id}")
+    else:
+        log_processing_step("AI_MATCHING_STREAM", "ATTACH", f"Matching for Resume ID: {resume_id}, JD ID: {jd_id} already running, attached to job {job.job_id}")
+    return Response(job.stream(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+def run_pair_match(resume_id, jd_id, cancel_event):
+    """
+    批量撮合的单对工作函数：完整运行一场撮合（不逐token推送），结果由run_matching_session写入facilitation_results
+    取消后在下一个事件处关闭生成器，本对不保存结果
+    """
+    events = run_matching_session(resume_id, jd_id, job_id=f"batch-{resume_id}-{jd_id}", stream_tokens=False)
+    result = {'status': 'failed', 'error': '撮合未产生结果'}
+    try:
+        for chunk in events:
+            if cancel_event.is_set():
+                return {'status': 'cancelled'}
+            # 只解析结束事件，其余事件直接丢弃
+            if chunk.startswith('data: {"type": "complete"'):
+                event = json.loads(chunk[len('data: '):])
+                if event.get('facilitation_id') is None:
+                    # 撮合结束但结果没有写入facilitation_results，本对按失败统计
+                    result = {'status': 'failed', 'usage': event.get('usage'),
+                              'error': f"撮合结果（{event['data']['status']}）保存到facilitation_results失败"}
+                else:
+                    result = {'status': 'completed', 'final_result': event['data']['status'],
+                              'facilitation_id': event['facilitation_id'], 'usage': event.get('usage')}
+            elif chunk.startswith('data: {"type": "error"'):
+                result = {'status': 'failed', 'error': json.loads(chunk[len('data: '):])['message']}
+    finally:
+        events.close()
+    return result
+
+# 批量撮合任务注册表
+batch_match_registry = MatchJobRegistry(
+    ttl_seconds=int(os.environ.get('BATCH_MATCH_TTL_SECONDS', 24 * 3600)),
+    max_jobs=int(os.environ.get('BATCH_MATCH_MAX_JOBS', 16)),
+    max_running=int(os.environ.get('BATCH_MATCH_MAX_RUNNING', 2))
+)
 
-# API: 获取当前消息队列状态（调试用）
+def parse_id_list(value):
+    """把请求中的ID列表（JSON数组或逗号分隔字符串）解析为去重后的正整数列表，格式不对时返回None"""
+    if isinstance(value, str):
+        value = [item for item in value.split(',') if item.strip()]
+    if not isinstance(value, list):
+        return None
+    try:
+        ids = [int(item) for item in value]
+    except (TypeError, ValueError):
+        return None
+    if any(i <= 0 for i in ids):
+        return None
+    return list(dict.fromkeys(ids))
+
+def existing_ids(conn, table, ids):
+    """返回ids中在表中存在的ID集合（按SQLite绑定参数上限分块查询）"""
+    found = set()
+    for start in range(0, len(ids), SQLITE_MAX_VARIABLES):
+        chunk = ids[start:start + SQLITE_MAX_VARIABLES]
+        found.update(row['id'] for row in conn.execute(
+            f"SELECT id FROM {table} WHERE id IN ({','.join('?' * len(chunk))})", chunk))
+    return found
+
+# API: 批量撮合（N份简历 × M个职位）
+@app.route('/api/batch_matching', methods=['POST'])
+def start_batch_matching():
+    data = request.get_json(silent=True) or {}
+    resume_ids = parse_id_list(data.get('resume_ids'))
+    jd_ids = parse_id_list(data.get('jd_ids'))
+    if not resume_ids or not jd_ids:
+        return jsonify({'status': 'error', 'message': 'resume_ids和jd_ids必须是非空的ID列表'}), 400
+
+    prescreen_k = data.get('prescreen_k')
+    if prescreen_k is not None and (isinstance(prescreen_k, bool) or not isinstance(prescreen_k, int) or prescreen_k <= 0):
+        return jsonify({'status': 'error', 'message': 'prescreen_k必须是正整数'}), 400
+
+    # 预筛时只有入围的组合才会撮合，上限作用于入围后的对数；预筛本身的输入规模单独限制
+    pair_count = len(resume_ids) * len(jd_ids)
+    if prescreen_k:
+        if pair_count > app.config['BATCH_MATCH_MAX_PRESCREEN_PAIRS']:
+            return jsonify({'status': 'error', 'message': f"预筛组合数 {pair_count} 超过上限 {app.config['BATCH_MATCH_MAX_PRESCREEN_PAIRS']}"}), 400
+        pair_count = min(prescreen_k, len(resume_ids)) * len(jd_ids)
+    if pair_count > app.config['BATCH_MATCH_MAX_PAIRS']:
+        return jsonify({'status': 'error', 'message': f"撮合对数 {pair_count} 超过上限 {app.config['BATCH_MATCH_MAX_PAIRS']}"}), 400
+
+    # 只对存在的简历/JD排队，缺失的ID在响应中返回
+    conn = get_db_connection()
+    try:
+        existing_resumes = existing_ids(conn, 'resumes', resume_ids)
+        existing_jds = existing_ids(conn, 'job_descriptions', jd_ids)
+    finally:
+        conn.close()
+    missing = {
+        'resume_ids': [i for i in resume_ids if i not in existing_resumes],
+        'jd_ids': [i for i in jd_ids if i not in existing_jds]
+    }
+    # 按JD分组排序：同一JD的企业画像只生成一次，后续各对命中画像缓存
+    if prescreen_k:
+        # 先用本地打分预筛，每个JD只对得分最高的prescreen_k份简历进行agent撮合，组内按排名先后
+        shortlisted = shortlist(jd_ids=sorted(existing_jds), resume_ids=sorted(existing_resumes), k=prescreen_k, per_jd=True)
+        jd_order = {jd_id: order for order, jd_id in enumerate(jd_ids)}
+        ranked = sorted(enumerate(shortlisted), key=lambda item: (jd_order[item[1]['jd_id']], item[0]))
+        pairs = [(item['resume_id'], item['jd_id']) for _, item in ranked]
+    else:
+        pairs = [(resume_id, jd_id) for jd_id in jd_ids if jd_id in existing_jds
+                 for resume_id in resume_ids if resume_id in existing_resumes]
+    if not pairs:
+        return jsonify({'status': 'error', 'message': '没有可撮合的简历/职位', 'missing': missing}), 404
+
+    concurrency = data.get('concurrency', app.config['BATCH_MATCH_CONCURRENCY'])
+    # bool是int的子类，需要单独排除
+    if isinstance(concurrency, bool) or not isinstance(concurrency, int) or concurrency <= 0:
+        return jsonify({'status': 'error', 'message': 'concurrency必须是正整数'}), 400
+    concurrency = min(concurrency, app.config['BATCH_MATCH_MAX_CONCURRENCY'])
+    job = batch_match_registry.submit(BatchMatchJob(uuid.uuid4().hex[:12], pairs, concurrency), run_pair_match)
+    if job is None:
+        return jsonify({
+            'status': 'error',
+            'message': f'同时进行的批量撮合任务已达上限（{batch_match_registry.max_running}），请等待其结束或取消后重试'
+        }), 429, {'Retry-After': '60'}
+    return jsonify({'status': 'success', 'data': {**job.summary(), 'missing': missing}}), 202
+
+# API: 本地向量化预筛（TF-IDF文本相似度 + 技能覆盖率），返回得分最高的简历×JD组合
+@app.route('/api/screening/shortlist', methods=['GET'])
+def screening_shortlist():
+    jd_ids = parse_id_list(request.args['jd_ids']) if request.args.get('jd_ids') else None
+    resume_ids = parse_id_list(request.args['resume_ids']) if request.args.get('resume_ids') else None
+    if (request.args.get('jd_ids') and not jd_ids) or (request.args.get('resume_ids') and not resume_ids):
+        return jsonify({'status': 'error', 'message': 'jd_ids和resume_ids必须是逗号分隔的ID列表'}), 400
+    k = max(1, min(request.args.get('k', default=20, type=int), SCREENING_MAX_K))
+    per_jd = request.args.get('per_jd', 'false').lower() in ('1', 'true', 'yes')
+    min_score = request.args.get('min_score', default=0.0, type=float)
+
+    started = time.perf_counter()
+    pairs = shortlist(jd_ids=jd_ids, resume_ids=resume_ids, k=k, per_jd=per_jd, min_score=min_score)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    # 附上展示用的姓名和职位名称
+    if pairs:
+        pair_resume_ids = list({pair['resume_id'] for pair in pairs})
+        pair_jd_ids = list({pair['jd_id'] for pair in pairs})
+        conn = get_db_connection()
+        try:
+            names = {row['id']: row['name'] for row in conn.execute(
+                f"SELECT id, name FROM resumes WHERE id IN ({','.join('?' * len(pair_resume_ids))})", pair_resume_ids)}
+            titles = {row['id']: row['title'] for row in conn.execute(
+                f"SELECT id, title FROM job_descriptions WHERE id IN ({','.join('?' * len(pair_jd_ids))})", pair_jd_ids)}
+        finally:
+            conn.close()
+        for pair in pairs:
+            pair['resume_name'] = names.get(pair['resume_id'])
+            pair['jd_title'] = titles.get(pair['jd_id'])
+
+    log_processing_step("SCREENING", "COMPLETE", f"Shortlisted {len(pairs)} pairs in {elapsed_ms:.1f} ms")
+    return jsonify({'status': 'success', 'data': {'pairs': pairs, 'elapsed_ms': round(elapsed_ms, 2)}})
+
+# API: 从持久化的匹配度矩阵中查询top-k（传jd_id查最佳候选人，传resume_id查最匹配的职位）
+@app.route('/api/compatibility/top', methods=['GET'])
+def compatibility_top():
+    jd_id = request.args.get('jd_id', type=int)
+    resume_id = request.args.get('resume_id', type=int)
+    if bool(jd_id) == bool(resume_id):
+        return jsonify({'status': 'error', 'message': '必须且只能提供jd_id或resume_id之一'}), 400
+    k = max(1, min(request.args.get('k', default=20, type=int), SCREENING_MAX_K))
+
+    started = time.perf_counter()
+    compatibility_matrix.sync()
+    items = compatibility_matrix.top_resumes(jd_id, k) if jd_id else compatibility_matrix.top_jds(resume_id, k)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if items is None:
+        return jsonify({'status': 'error', 'message': f"{'职位' if jd_id else '简历'}不存在: {jd_id or resume_id}"}), 404
+    key = 'resume_id' if jd_id else 'jd_id'
+    return jsonify({'status': 'success', 'data': {
+        'items': [{key: item['id'], 'score': item['score']} for item in items],
+        'elapsed_ms': round(elapsed_ms, 2)
+    }})
+
+@app.route('/api/compatibility/stats', methods=['GET'])
+def compatibility_stats():
+    return jsonify({'status': 'success', 'data': compatibility_matrix.stats()})
+
+@app.route('/api/compatibility/rebuild', methods=['POST'])
+def compatibility_rebuild():
+    """按当前语料重建IDF快照并重新计算整个矩阵（stats中snapshot.rebuild_recommended为true时调用）"""
+    started = time.perf_counter()
+    changes = compatibility_matrix.rebuild()
+    elapsed = time.perf_counter() - started
+    log_processing_step("COMPAT_MATRIX", "REBUILD", f"Rebuilt in {elapsed:.2f}s: {json.dumps(changes)}")
+    return jsonify({'status': 'success', 'data': {**compatibility_matrix.stats(), 'elapsed_seconds': round(elapsed, 3)}})
+
+@app.route('/api/batch_matching', methods=['GET'])
+def list_batch_matching():
+    return jsonify({'status': 'success', 'data': batch_match_registry.list_jobs()})
+
+@app.route('/api/batch_matching/<job_id>', methods=['GET'])
+def get_batch_matching(job_id):
+    """批量撮合进度；include_results=1时附带已完成各对的结果"""
+    job = batch_match_registry.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'批量撮合任务不存在或已过期: {job_id}'}), 404
+    include_results = request.args.get('include_results', 'false').lower() in ('1', 'true', 'yes')
+    return jsonify({'status': 'success', 'data': job.summary(include_results=include_results)})
+
+@app.route('/api/batch_matching/<job_id>/cancel', methods=['POST'])
+def cancel_batch_matching(job_id):
+    job = batch_match_registry.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'批量撮合任务不存在或已过期: {job_id}'}), 404
+    if not job.cancel():
+        return jsonify({'status': 'success', 'message': f'批量撮合任务已结束: {job.status}', 'data': job.summary()})
+    log_processing_step("BATCH_MATCH", "CANCEL", f"Cancel requested for batch {job_id}")
+    return jsonify({'status': 'success', 'message': '已请求取消，进行中的撮合将在当前模型调用结束后停止', 'data': job.summary()})
+
+# API: 后台撮合任务列表/状态
+@app.route('/api/match_jobs', methods=['GET'])
+def list_match_jobs():
+    return jsonify({'status': 'success', 'data': match_job_registry.list_jobs()})
+
+@app.route('/api/match_jobs/<job_id>', methods=['GET'])
+def get_match_job(job_id):
+    job = match_job_registry.get(job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': f'撮合任务不存在或已过期: {job_id}'}), 404
+    return jsonify({'status': 'success', 'data': job.summary()})
+
+# API: 获取消息队列状态（调试用）
 @app.route('/api/message_queue/status', methods=['GET'])
 def get_message_queue_status():
-    """获取当前消息队列状态，用于调试"""
+    """获取消息队列状态，用于调试。传入session_id时返回该会话详情，否则列出所有存活会话"""
     try:
+        session_id = request.args.get('session_id')
+        if not session_id:
+            return jsonify({'status': 'success', 'data': {
+                'session_count': len(message_queue_registry),
+                'sessions': message_queue_registry.list_sessions()
+            }})
+
+        session = message_queue_registry.get(session_id)
+        if session is None:
+            return jsonify({'status': 'error', 'message': f'会话不存在或已过期: {session_id}'}), 404
+
         status = {
-            'session_id': message_queue.session_id,
-            'message_count': message_queue.get_message_count(),
-            'messages': message_queue.messages,
-            'summary': message_queue.get_session_summary() if message_queue.messages else None,
-            'latest_message': message_queue.get_latest_message(),
-            'chat_history': message_queue.get_chat_history()
+            'session_id': session.session_id,
+            'message_count': session.get_message_count(),
+            'messages': session.messages,
+            'summary': session.get_session_summary() if session.messages else None,
+            'latest_message': session.get_latest_message(),
+            'chat_history': session.get_chat_history()
         }
         return jsonify({'status': 'success', 'data': status})
     except Exception as e:
@@ -1569,13 +2410,22 @@ def get_message_queue_status():
 # API: 清空消息队列（调试用）
 @app.route('/api/message_queue/clear', methods=['POST'])
 def clear_message_queue():
-    """清空当前消息队列，用于调试"""
+    """清空指定会话的消息队列，用于调试"""
     try:
-        old_count = message_queue.get_message_count()
-        message_queue.clear()
+        data = request.get_json(silent=True) or {}
+        session_id = data.get('session_id') or request.args.get('session_id')
+        if not session_id:
+            return jsonify({'status': 'error', 'message': '必须提供session_id'}), 400
+
+        session = message_queue_registry.get(session_id)
+        if session is None:
+            return jsonify({'status': 'error', 'message': f'会话不存在或已过期: {session_id}'}), 404
+
+        old_count = session.get_message_count()
+        session.clear()
         return jsonify({
             'status': 'success', 
-            'message': f'已清空消息队列，删除了 {old_count} 条消息'
+            'message': f'已清空会话 {session_id} 的消息队列，删除了 {old_count} 条消息'
         })
     except Exception as e:
         return jsonify({'status': 'error', 'message': str(e)}), 500
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+测量匹配度矩阵的增量更新与top-k查询耗时
+
+在临时数据库中生成N份简历和M个JD，分别测量：
+- 首次建立（分词建索引 + 计算全部分数）
+- 新增一份简历 / 一个JD后的增量同步（只计算新的一列 / 一行）
+- 从内存映射矩阵中查询某JD的top-k候选人、某简历的top-k职位
+- 对照：不使用矩阵，直接用预筛打分为该JD重新计算全部简历
+
+运行: python bench_compatibility.py [简历数量 ...]（默认 10000 100000）
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import db
+import screening
+from compatibility import CompatibilityMatrix
+from migrations import apply_migrations
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+SKILLS = ['Python', 'Java', 'Go', 'C++', '机器学习', '深度学习', 'React', 'SQL', 'Kubernetes', '数据分析',
+          'Spark', 'Flink', 'TensorFlow', 'PyTorch', 'Vue', 'Redis', 'Kafka', '推荐系统', '自然语言处理', '计算机视觉']
+JD_COUNT = 50
+
+
+def resume_row(i):
+    skills = [SKILLS[(i * p) % len(SKILLS)] for p in (1, 3, 7, 11)]
+    return (f"候选人{i}", '、'.join(skills), f"{i % 9 + 1}年{skills[0]}开发经验，熟悉{skills[1]}和{skills[2]}。",
+            f'[{{"company": "公司{i % 97}", "role": "{skills[0]}工程师", "description": "负责{skills[3]}相关系统的设计与开发"}}]')
+
+
+def jd_row(i):
+    skills = [SKILLS[(i * p) % len(SKILLS)] for p in (1, 3, 5)]
+    return (f"{skills[0]}工程师", f"熟悉{'、'.join(skills)}，3年以上相关经验", f"负责{skills[0]}方向的核心系统建设")
+
+
+def populate(path, count):
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        conn.executescript(f.read())
+    apply_migrations(conn)
+    conn.executemany('INSERT INTO resumes (name, skills, summary, experience_json) VALUES (?, ?, ?, ?)',
+                     (resume_row(i) for i in range(count)))
+    conn.executemany('INSERT INTO job_descriptions (title, requirements, description) VALUES (?, ?, ?)',
+                     (jd_row(i) for i in range(JD_COUNT)))
+    conn.commit()
+    conn.close()
+
+
+def insert(path, sql, params):
+    conn = sqlite3.connect(path)
+    conn.execute(sql, params)
+    conn.commit()
+    conn.close()
+
+
+def timed(func, *args, repeat=1):
+    """返回 (最快一次的耗时秒数, 最后一次的返回值)"""
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def bench(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        populate(path, count)
+        db.DATABASE = path
+        screening.reset_screening_index()
+        matrix = CompatibilityMatrix(os.path.join(tmp, 'matrix'))
+        try:
+            build_time, _ = timed(matrix.sync)
+            insert(path, 'INSERT INTO resumes (name, skills, summary, experience_json) VALUES (?, ?, ?, ?)', resume_row(count))
+            add_resume_time, changes = timed(matrix.sync)
+            assert changes['resumes_added'] == 1
+            insert(path, 'INSERT INTO job_descriptions (title, requirements, description) VALUES (?, ?, ?)', jd_row(JD_COUNT))
+            add_jd_time, changes = timed(matrix.sync)
+            assert changes['jds_added'] == 1
+            top_resumes_time, top = timed(matrix.top_resumes, 42, 20, repeat=50)
+            top_jds_time, _ = timed(matrix.top_jds, 4242 % count + 1, 20, repeat=50)
+            rescore_time, fresh = timed(screening.shortlist, [42], None, 20, repeat=3)
+            # 合成数据中同分的简历很多，且新增简历使IDF略有变化，因此比较分数而不是ID
+            assert all(abs(item['score'] - pair['score']) < 1e-2 for item, pair in zip(top, fresh)), "矩阵与重新计算的结果不一致"
+            stats = matrix.stats()
+        finally:
+            matrix.close()
+            screening.reset_screening_index()
+            db.connection_pool.close_all()
+
+    print(f"{count} 份简历 × {JD_COUNT + 1} 个JD（矩阵文件 {stats['file_bytes'] / 1e6:.1f} MB）")
+    print(f"  首次建立 (建索引 + 全部分数):   {build_time * 1000:10.2f} ms")
+    print(f"  新增一份简历 (增量计算一列):    {add_resume_time * 1000:10.2f} ms")
+    print(f"  新增一个JD (增量计算一行):      {add_jd_time * 1000:10.2f} ms")
+    print(f"  某JD的top-20候选人:             {top_resumes_time * 1000:10.2f} ms")
+    print(f"  某简历的top-20职位:             {top_jds_time * 1000:10.2f} ms")
+    print(f"  对照：为该JD重新打分全部简历:   {rescore_time * 1000:10.2f} ms  ({rescore_time / top_resumes_time:.0f}x)")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    for count in counts:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+对比agent历史记录构建的新旧实现
+
+回放一场200条消息的撮合对话：每添加一条消息，就像撮合流程那样为下一位发言的agent构建一次历史记录。
+- 旧实现：每轮遍历全部消息、重新json.dumps自己的消息、每条消息打印一行日志
+- 新实现：直接读取MessageQueue在add_message时增量维护的视图（关闭历史压缩，结果应与旧实现一致）
+- 另外统计开启历史压缩（默认token预算）后，整场对话累计发送的历史token数
+
+运行: python bench_history_builder.py [消息数量]
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app import HISTORY_TOKEN_BUDGET, MessageQueue, get_history_for_agent
+from agent_prompts import estimate_messages_tokens
+
+
+def legacy_history_for_agent(session, source_agent):
+    """旧版历史构建逻辑（逐条遍历并重新序列化），仅用于对比"""
+    history = []
+    opponent_agent = 'recruiter' if source_agent == 'candidate' else 'candidate'
+    print(f"[HistoryBuilder] 为 {source_agent.upper()} 构建历史记录...")
+    opponent_chat_count = 0
+    for msg in session.messages:
+        role = 'assistant' if msg['source'] == source_agent else 'user'
+        if msg['source'] == source_agent:
+            history.append({
+                "role": role,
+                "content": json.dumps({
+                    "type": msg['type'],
+                    "reasoning": msg['reasoning'],
+                    "payload": msg['payload']
+                }, ensure_ascii=False)
+            })
+            print(f"  [+] 添加自己的消息 (ID: {msg['id']}, Type: {msg['type']})")
+        elif msg['source'] == opponent_agent and msg['type'] == 'chatting':
+            history.append({"role": role, "content": msg['payload']})
+            opponent_chat_count += 1
+            print(f"  [+] 添加对方的聊天消息 (ID: {msg['id']})")
+    if opponent_chat_count == 0:
+        kickoff_message = "您好，我想了解更多关于这个机会的信息。" if opponent_agent == 'candidate' else "您好，我想了解您的背景和经验。"
+        history.append({"role": "user", "content": kickoff_message})
+    print(f"[HistoryBuilder] 为 {source_agent.upper()} 构建完成，共 {len(history)} 条历史记录。")
+    return history
+
+
+def build_conversation(message_count):
+    """生成一场撮合对话：每位agent依次发送planning和chatting消息"""
+    conversation = []
+    for i in range(message_count):
+        source = 'candidate' if (i // 2) % 2 == 0 else 'recruiter'
+        msg_type = 'planning' if i % 2 == 0 else 'chatting'
+        conversation.append({
+            'source': source,
+            'msg_type': msg_type,
+            'reasoning': f"第{i + 1}条消息的思考过程：" + "分析对方的回复并规划下一步沟通策略。" * 8,
+            'payload': f"第{i + 1}条消息的内容：" + "关于职位职责、团队情况与薪资期望的讨论。" * 6
+        })
+    return conversation
+
+
+def uncompacted_history_for_agent(session, source_agent):
+    """关闭历史压缩的新实现"""
+    return get_history_for_agent(session, source_agent, token_budget=0)
+
+
+def replay(conversation, builder, totals=None):
+    """回放对话，每添加一条消息后为下一位agent构建一次历史记录，返回(耗时, 最后一次历史)"""
+    session = MessageQueue()
+    history = None
+    elapsed = 0.0
+    with contextlib.redirect_stdout(io.StringIO()):
+        session.init_session("bench_session")
+        for msg in conversation:
+            start = time.perf_counter()
+            session.add_message(msg['source'], msg['msg_type'], msg['reasoning'], msg['payload'])
+            next_agent = 'recruiter' if msg['source'] == 'candidate' else 'candidate'
+            history = builder(session, next_agent)
+            elapsed += time.perf_counter() - start
+            if totals is not None:
+                # token估算不计入耗时
+                totals.append(estimate_messages_tokens(history))
+    return elapsed, history
+
+
+def main():
+    message_count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    conversation = build_conversation(message_count)
+
+    legacy_time, legacy_history = replay(conversation, legacy_history_for_agent)
+    full_tokens, compacted_tokens = [], []
+    new_time, new_history = replay(conversation, uncompacted_history_for_agent, full_tokens)
+    compacted_time, _ = replay(conversation, get_history_for_agent, compacted_tokens)
+
+    assert legacy_history == new_history, "新旧实现构建的历史记录不一致"
+
+    print(f"回放 {message_count} 条消息的撮合对话（每条消息后构建一次历史记录）")
+    print(f"  旧实现 (逐条重新序列化): {legacy_time * 1000:8.2f} ms")
+    print(f"  新实现 (增量视图):       {new_time * 1000:8.2f} ms")
+    print(f"  加速比: {legacy_time / new_time:.1f}x")
+    print(f"  开启历史压缩:            {compacted_time * 1000:8.2f} ms")
+    print(f"  累计历史token (估算): 不压缩 {sum(full_tokens)}，压缩后 {sum(compacted_tokens)}，"
+          f"最后一轮 {full_tokens[-1]} -> {compacted_tokens[-1]}")
+    print(f"  压缩后超出预算 {HISTORY_TOKEN_BUDGET} 的轮次: {sum(tokens > HISTORY_TOKEN_BUDGET for tokens in compacted_tokens)}，"
+          f"最大 {max(compacted_tokens)} tokens")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+对比简历列表页的新旧读取方式
+
+在临时数据库中生成N份简历，分别测量：
+- 旧实现：SELECT * 读取整张表，逐行把五个JSON列全部json.loads为dict（原resume_management的做法）
+- 惰性行包装：同样读取整张表，但包装为ResumeRow，列表卡片只访问姓名、邮箱和经历时只解码经历一列
+- keyset分页：/api/resumes实际使用的list_page，读取第一页以及翻到较深位置后的一页
+
+运行: python bench_resume_list.py [简历数量 ...]（默认 10000 100000）
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import db
+from listing import list_page, total_count_cache
+from migrations import apply_migrations
+from rows import ResumeRow
+
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'schema.sql')
+
+
+def populate(path, count):
+    """创建表结构并写入count份结构完整的简历"""
+    conn = sqlite3.connect(path)
+    with open(SCHEMA_PATH, encoding='utf-8') as f:
+        conn.executescript(f.read())
+    apply_migrations(conn)
+    experience = json.dumps([
+        {"company": f"公司{i}", "position": "高级工程师", "duration": "2019-2023",
+         "description": "负责核心服务的设计与开发，推动性能优化与稳定性建设。" * 3}
+        for i in range(3)
+    ], ensure_ascii=False)
+    education = json.dumps([{"school": "某大学", "degree": "硕士", "major": "计算机科学", "year": "2019"}], ensure_ascii=False)
+    publications = json.dumps([{"title": f"论文{i}", "venue": "某会议", "year": "2021"} for i in range(2)], ensure_ascii=False)
+    projects = json.dumps([{"name": f"项目{i}", "description": "分布式检索系统的设计与实现。" * 4} for i in range(2)], ensure_ascii=False)
+    desensitized = json.dumps({"name": "候选人", "skills": "Python, SQL", "summary": "资深后端工程师" * 5}, ensure_ascii=False)
+    conn.execute('BEGIN')
+    conn.executemany(
+        'INSERT INTO resumes (name, email, phone, skills, summary, experience_json, education_json, '
+        'publications_json, projects_json, desensitized_json, created_at) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        ((f"候选人{i}", f"user{i}@example.com", f"138{i:08d}", "Python, SQL, 分布式系统",
+          "资深后端工程师，专注于高并发服务。", experience, education, publications, projects, desensitized,
+          f"2024-01-01 00:{i // 6000 % 60:02d}:{i // 100 % 60:02d}")
+         for i in range(count))
+    )
+    conn.commit()
+    conn.close()
+
+
+def legacy_full_list():
+    """旧版列表页：读取整张表并立即解码全部JSON列"""
+    conn = db.get_db_connection()
+    rows = conn.execute('SELECT * FROM resumes ORDER BY created_at DESC').fetchall()
+    conn.close()
+    resumes = []
+    for r in rows:
+        resume = dict(r)
+        for field in ('experience', 'education', 'publications', 'projects'):
+            try:
+                resume[field] = json.loads(r[f'{field}_json']) if r[f'{field}_json'] else []
+            except json.JSONDecodeError:
+                resume[field] = r[f'{field}_json']
+        try:
+            resume['desensitized'] = json.loads(r['desensitized_json']) if r['desensitized_json'] else None
+        except (json.JSONDecodeError, TypeError):
+            resume['desensitized'] = None
+        resumes.append(resume)
+    # 列表卡片实际用到的字段
+    return [(resume['name'], resume['email'], len(resume['experience'])) for resume in resumes]
+
+
+def lazy_full_list():
+    """同样读取整张表，但只解码卡片访问到的经历列"""
+    conn = db.get_db_connection()
+    rows = conn.execute('SELECT * FROM resumes ORDER BY created_at DESC').fetchall()
+    conn.close()
+    resumes = [ResumeRow(r) for r in rows]
+    return [(resume['name'], resume['email'], len(resume['experience'])) for resume in resumes]
+
+
+def keyset_pages(depth):
+    """list_page读取第一页，再沿游标翻depth页"""
+    page = list_page('resumes')
+    for _ in range(depth):
+        page = list_page('resumes', cursor=page['next_cursor'])
+    return page
+
+
+def measure(func, *args, repeat=3):
+    """返回多次运行中最快的一次耗时（秒）"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def bench(count):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        populate(path, count)
+        db.DATABASE = path
+        total_count_cache.invalidate()
+        try:
+            assert legacy_full_list() == lazy_full_list(), "新旧实现读取的卡片数据不一致"
+            legacy_time = measure(legacy_full_list)
+            lazy_time = measure(lazy_full_list)
+            first_page_time = measure(keyset_pages, 0, repeat=20)
+            deep_page_time = measure(keyset_pages, 50, repeat=3) / 51
+        finally:
+            db.connection_pool.close_all()
+
+    print(f"{count} 份简历")
+    print(f"  旧实现 (整表 + 全部JSON列立即解码): {legacy_time * 1000:10.2f} ms")
+    print(f"  惰性行包装 (整表 + 只解码经历):     {lazy_time * 1000:10.2f} ms  ({legacy_time / lazy_time:.1f}x)")
+    print(f"  keyset分页 第一页:                  {first_page_time * 1000:10.2f} ms  ({legacy_time / first_page_time:.0f}x)")
+    print(f"  keyset分页 翻页平均 (前51页):       {deep_page_time * 1000:10.2f} ms")
+
+
+def main():
+    counts = [int(arg) for arg in sys.argv[1:]] or [10000, 100000]
+    for count in counts:
+        bench(count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,319 @@
+import json
+import os
+import shutil
+import threading
+
+import numpy as np
+
+import screening
+from helpers import log_processing_step
+
+COMPAT_MATRIX_DIR = os.environ.get('COMPAT_MATRIX_DIR', 'compat_matrix')
+INITIAL_RESUME_CAPACITY = 1024
+INITIAL_JD_CAPACITY = 64
+# 当前语料的IDF相对快照的漂移超过该比例时，stats()中提示重建
+COMPAT_MAX_IDF_DRIFT = float(os.environ.get('COMPAT_MAX_IDF_DRIFT', 0.05))
+
+def _scoring_config():
+    """打分参数变化后已持久化的分数不再可比，需要重建矩阵"""
+    return {'n_features': screening.N_FEATURES, 'text_weight': screening.TEXT_WEIGHT, 'skill_weight': screening.SKILL_WEIGHT}
+
+class CompatibilityMatrix:
+    """
+    持久化的简历×JD匹配度矩阵（float32，np.memmap），按JD为行存储，"某JD的最佳候选人"只需读取连续的一行
+
+    增量维护：
+    - 新增简历只计算它与所有JD的分数（矩阵中的一列）
+    - 新增JD只计算它与所有简历的分数（矩阵中的一行）
+    - 删除只把槽位ID置0，查询时被忽略；槽位不复用
+    容量不足时按倍数扩容（只复制已有分数，不重新计算）
+
+    所有分数使用同一份冻结的IDF和技能词表快照（矩阵为空时按当前语料建立，rebuild()时重建），
+    因此同一行/列中先后写入的分数始终可比；stats()报告当前语料相对快照的漂移，超过阈值时提示重建
+
+    Args:
+        directory (str): 矩阵文件目录
+    """
+    def __init__(self, directory=COMPAT_MATRIX_DIR):
+        self.directory = directory
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._synced_versions = None
+
+    def _path(self, name):
+        return os.path.join(self.directory, name)
+
+    @property
+    def exists(self):
+        return os.path.exists(self._path('meta.json'))
+
+    def _open(self, name, dtype, shape, mode):
+        return np.memmap(self._path(name), dtype=dtype, mode=mode, shape=shape)
+
+    def _load(self):
+        """打开已有矩阵；不存在或打分参数已变化时创建空矩阵"""
+        if self._loaded:
+            return
+        meta = None
+        if self.exists:
+            with open(self._path('meta.json'), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta.get('scoring') != _scoring_config():
+                log_processing_step("COMPAT_MATRIX", "STALE", "Scoring config changed, rebuilding matrix")
+                meta = None
+        if meta is None:
+            os.makedirs(self.directory, exist_ok=True)
+            meta = {'n_resumes': 0, 'n_jds': 0, 'resume_capacity': INITIAL_RESUME_CAPACITY,
+                    'jd_capacity': INITIAL_JD_CAPACITY, 'scoring': _scoring_config()}
+            mode = 'w+'
+        else:
+            mode = 'r+'
+        self.n_resumes, self.n_jds = meta['n_resumes'], meta['n_jds']
+        self.resume_capacity, self.jd_capacity = meta['resume_capacity'], meta['jd_capacity']
+        self.scores = self._open('scores.f32', np.float32, (self.jd_capacity, self.resume_capacity), mode)
+        self.resume_ids = self._open('resume_ids.i64', np.int64, (self.resume_capacity,), mode)
+        self.jd_ids = self._open('jd_ids.i64', np.int64, (self.jd_capacity,), mode)
+        self.resume_slots = {int(i): slot for slot, i in enumerate(self.resume_ids[:self.n_resumes]) if i}
+        self.jd_slots = {int(i): slot for slot, i in enumerate(self.jd_ids[:self.n_jds]) if i}
+        self.snapshot = meta.get('snapshot')
+        if self.snapshot:
+            self.idf = np.fromfile(self._path('idf.f32'), dtype=np.float32)
+            self.skill_vocabulary = np.fromfile(self._path('skill_vocabulary.bool'), dtype=bool)
+        else:
+            self.idf = self.skill_vocabulary = None
+        self._loaded = True
+        self._synced_versions = None
+        if mode == 'w+':
+            self._save_meta()
+
+    def _save_meta(self):
+        self.scores.flush()
+        self.resume_ids.flush()
+        self.jd_ids.flush()
+        meta = {'n_resumes': self.n_resumes, 'n_jds': self.n_jds, 'resume_capacity': self.resume_capacity,
+                'jd_capacity': self.jd_capacity, 'scoring': _scoring_config(), 'snapshot': self.snapshot}
+        temp_path = self._path('meta.json.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(temp_path, self._path('meta.json'))
+
+    def _take_snapshot(self):
+        """冻结当前简历语料的IDF和技能词表，之后的增量计算都使用这份快照"""
+        self.idf = screening.resume_index.idf().copy()
+        self.skill_vocabulary = screening.resume_index.skill_df > 0
+        for name, array in (('idf.f32', self.idf), ('skill_vocabulary.bool', self.skill_vocabulary)):
+            array.tofile(self._path(name + '.tmp'))
+            os.replace(self._path(name + '.tmp'), self._path(name))
+        self.snapshot = {'resumes': screening.resume_index.n_alive, 'version': screening.resume_index.version}
+        log_processing_step("COMPAT_MATRIX", "SNAPSHOT", f"Froze IDF over {self.snapshot['resumes']} resumes")
+
+    def drift(self):
+        """
+        当前语料相对快照的变化
+
+        Returns:
+            dict: idf_drift为按当前文档频率加权的IDF相对变化；new_skill_terms为快照之后才出现在简历技能中的词数
+        """
+        if self.snapshot is None:
+            return None
+        current = screening.resume_index.idf()
+        df = screening.resume_index.text_df
+        total = float(np.dot(current, df))
+        idf_drift = float(np.dot(np.abs(current - self.idf), df)) / total if total else 0.0
+        new_skill_terms = int(np.count_nonzero((screening.resume_index.skill_df > 0) & ~self.skill_vocabulary))
+        return {
+            'resumes_at_snapshot': self.snapshot['resumes'],
+            'resumes_now': screening.resume_index.n_alive,
+            'idf_drift': round(idf_drift, 4),
+            'new_skill_terms': new_skill_terms,
+            'rebuild_recommended': idf_drift > COMPAT_MAX_IDF_DRIFT
+        }
+
+    def _reserve(self, n_resumes, n_jds):
+        """保证容量足够，不足时按倍数扩容并复制已有分数"""
+        resume_capacity, jd_capacity = self.resume_capacity, self.jd_capacity
+        while resume_capacity < n_resumes:
+            resume_capacity *= 2
+        while jd_capacity < n_jds:
+            jd_capacity *= 2
+        if (resume_capacity, jd_capacity) == (self.resume_capacity, self.jd_capacity):
+            return
+
+        log_processing_step("COMPAT_MATRIX", "GROW", f"{self.jd_capacity}x{self.resume_capacity} -> {jd_capacity}x{resume_capacity}")
+        scores = np.memmap(self._path('scores.f32.tmp'), dtype=np.float32, mode='w+', shape=(jd_capacity, resume_capacity))
+        for start in range(0, self.n_jds, 256):
+            scores[start:start + 256, :self.n_resumes] = self.scores[start:start + 256, :self.n_resumes]
+        scores.flush()
+        del self.scores
+        os.replace(self._path('scores.f32.tmp'), self._path('scores.f32'))
+        self.scores = self._open('scores.f32', np.float32, (jd_capacity, resume_capacity), 'r+')
+
+        for name, attr, capacity in (('resume_ids.i64', 'resume_ids', resume_capacity), ('jd_ids.i64', 'jd_ids', jd_capacity)):
+            old = np.array(getattr(self, attr))
+            delattr(self, attr)
+            grown = self._open(name + '.tmp', np.int64, (capacity,), 'w+')
+            grown[:len(old)] = old
+            grown.flush()
+            del grown
+            os.replace(self._path(name + '.tmp'), self._path(name))
+            setattr(self, attr, self._open(name, np.int64, (capacity,), 'r+'))
+        self.resume_capacity, self.jd_capacity = resume_capacity, jd_capacity
+
+    def _live_slots(self, ids_array, count, index):
+        """(槽位数组, 对应的索引行号数组)，只包含仍在索引中的记录"""
+        slots = np.flatnonzero(ids_array[:count] > 0)
+        positions = index.lookup_positions(np.asarray(ids_array[slots]))
+        found = positions >= 0
+        return slots[found], positions[found]
+
+    def _fill(self, jd_slots, jd_positions, resume_slots, resume_positions):
+        """计算一组JD与一组简历的分数并写入矩阵（简历分块，每块一次矩阵乘法）"""
+        if not len(jd_slots) or not len(resume_slots):
+            return
+        matrix = screening.JdScoringMatrix(screening.jd_index, jd_positions, self.idf, self.skill_vocabulary)
+        block_rows = matrix.block_rows(screening.BLOCK_CELLS)
+        for start in range(0, len(resume_positions), block_rows):
+            combined, _, _ = matrix.score(screening.resume_index, resume_positions[start:start + block_rows], self.idf)
+            self.scores[jd_slots[:, None], resume_slots[None, start:start + block_rows]] = combined.T
+
+    def sync(self):
+        """
+        与简历/JD索引增量同步：新增JD计算一行，新增简历计算一列，删除的记录清除槽位
+
+        Returns:
+            dict: 本次新增/删除的简历和JD数
+        """
+        with self._lock:
+            self._load()
+            screening.sync_indexes()
+            versions = (screening.resume_index.version, screening.jd_index.version)
+            if versions == self._synced_versions:
+                return {'resumes_added': 0, 'jds_added': 0, 'resumes_removed': 0, 'jds_removed': 0}
+
+            changes = {}
+            added = {}
+            for kind, slots_by_id, ids_array, count, index in (
+                    ('resumes', self.resume_slots, self.resume_ids, self.n_resumes, screening.resume_index),
+                    ('jds', self.jd_slots, self.jd_ids, self.n_jds, screening.jd_index)):
+                stored = np.asarray(ids_array[:count])
+                stored = stored[stored > 0]
+                indexed = index.alive_ids()
+                removed = np.setdiff1d(stored, indexed, assume_unique=True).tolist()
+                for record_id in removed:
+                    ids_array[slots_by_id.pop(record_id)] = 0
+                changes[f'{kind}_removed'] = len(removed)
+                added[kind] = np.setdiff1d(indexed, stored, assume_unique=True)
+
+            new_resumes, new_jds = added['resumes'], added['jds']
+            # 矩阵中还没有分数时（新建、重建或数据被删空）按当前语料建立快照
+            if self.snapshot is None or not self.resume_slots or not self.jd_slots:
+                self._take_snapshot()
+            self._reserve(self.n_resumes + len(new_resumes), self.n_jds + len(new_jds))
+
+            # 先为新增JD计算整行（覆盖已有简历），再为新增简历计算整列（覆盖全部JD，含新增JD）
+            if len(new_jds):
+                old_resume_slots, old_resume_positions = self._live_slots(self.resume_ids, self.n_resumes, screening.resume_index)
+                new_jd_slots = np.arange(self.n_jds, self.n_jds + len(new_jds), dtype=np.int64)
+                self.jd_ids[new_jd_slots] = new_jds
+                self.jd_slots.update(zip(new_jds.tolist(), new_jd_slots.tolist()))
+                self.n_jds += len(new_jds)
+                self._fill(new_jd_slots, screening.jd_index.lookup_positions(new_jds), old_resume_slots, old_resume_positions)
+
+            if len(new_resumes):
+                new_resume_slots = np.arange(self.n_resumes, self.n_resumes + len(new_resumes), dtype=np.int64)
+                self.resume_ids[new_resume_slots] = new_resumes
+                self.resume_slots.update(zip(new_resumes.tolist(), new_resume_slots.tolist()))
+                self.n_resumes += len(new_resumes)
+                jd_slots, jd_positions = self._live_slots(self.jd_ids, self.n_jds, screening.jd_index)
+                self._fill(jd_slots, jd_positions, new_resume_slots, screening.resume_index.lookup_positions(new_resumes))
+
+            self._save_meta()
+            self._synced_versions = versions
+            changes.update(resumes_added=len(new_resumes), jds_added=len(new_jds))
+            if len(new_resumes) or len(new_jds) or changes['resumes_removed'] or changes['jds_removed']:
+                log_processing_step("COMPAT_MATRIX", "SYNC", json.dumps(changes))
+                drift = self.drift()
+                if drift['rebuild_recommended']:
+                    log_processing_step("COMPAT_MATRIX", "DRIFT", f"IDF drifted {drift['idf_drift']:.1%} since snapshot, rebuild recommended")
+            return changes
+
+    def _top(self, values, ids, k):
+        """在一行/一列分数上用argpartition取top-k，忽略已删除的槽位"""
+        values = np.where(ids > 0, values, -np.inf)
+        k = min(k, int(np.count_nonzero(ids)))
+        if k <= 0:
+            return []
+        top = np.argpartition(-values, k - 1)[:k] if k < len(values) else np.arange(len(values))
+        top = top[np.lexsort((ids[top], -values[top]))][:k]
+        return [{'id': int(ids[i]), 'score': round(float(values[i]), 4)} for i in top]
+
+    def top_resumes(self, jd_id, k=20):
+        """某个JD的最佳候选人：读取矩阵中的一行；JD不存在时返回None"""
+        with self._lock:
+            self._load()
+            slot = self.jd_slots.get(jd_id)
+            if slot is None:
+                return None
+            return self._top(np.asarray(self.scores[slot, :self.n_resumes]), np.asarray(self.resume_ids[:self.n_resumes]), k)
+
+    def top_jds(self, resume_id, k=20):
+        """某份简历最匹配的JD：读取矩阵中的一列；简历不存在时返回None"""
+        with self._lock:
+            self._load()
+            slot = self.resume_slots.get(resume_id)
+            if slot is None:
+                return None
+            return self._top(np.asarray(self.scores[:self.n_jds, slot]), np.asarray(self.jd_ids[:self.n_jds]), k)
+
+    def rebuild(self):
+        """丢弃已有矩阵，按当前语料重新建立快照并计算全部分数"""
+        with self._lock:
+            self.close()
+            shutil.rmtree(self.directory, ignore_errors=True)
+            return self.sync()
+
+    def close(self):
+        """释放内存映射（文件保留），下次访问时重新打开"""
+        with self._lock:
+            if self._loaded:
+                self._save_meta()
+                del self.scores, self.resume_ids, self.jd_ids
+            self._loaded = False
+            self._synced_versions = None
+
+    def reset(self):
+        """删除矩阵文件（表被清空时调用）"""
+        with self._lock:
+            self.close()
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self):
+        with self._lock:
+            if not self._loaded and not self.exists:
+                return {'exists': False}
+            self._load()
+            screening.sync_indexes()
+            return {
+                'exists': True,
+                'resumes': len(self.resume_slots),
+                'jds': len(self.jd_slots),
+                'resume_slots': self.n_resumes,
+                'jd_slots': self.n_jds,
+                'resume_capacity': self.resume_capacity,
+                'jd_capacity': self.jd_capacity,
+                'file_bytes': self.jd_capacity * self.resume_capacity * 4,
+                'snapshot': self.drift()
+            }
+
+compatibility_matrix = CompatibilityMatrix()
+
+def refresh_compatibility_matrix():
+    """
+    简历/JD增删后调用：矩阵已创建时只计算新增的行/列；尚未创建时不做任何事（首次查询时才创建）
+    失败只记录日志，不影响调用方的写入
+    """
+    try:
+        if compatibility_matrix.exists:
+            compatibility_matrix.sync()
+    except Exception as e:
+        log_processing_step("COMPAT_MATRIX", "ERROR", f"Incremental update failed: {str(e)}")
@@ -0,0 +1,157 @@
+import os
+import sqlite3
+import threading
+
+# 数据库文件路径（相对路径按调用时的工作目录解析）
+DATABASE = os.environ.get('TALENT_MATCH_DB', 'talent_match.db')
+# SQLite单条语句默认最多999个绑定参数，IN查询和集合式查重按此分块
+SQLITE_MAX_VARIABLES = 999
+
+class PooledConnection:
+    """
+    连接池中连接的代理对象，接口与sqlite3.Connection一致
+    close()不会真正关闭连接，而是回滚未提交的事务后归还连接池
+    """
+    __slots__ = ('_conn', '_pool', '_path', '__weakref__')
+
+    def __init__(self, conn, pool, path):
+        self._conn = conn
+        self._pool = pool
+        self._path = path
+
+    def __getattr__(self, name):
+        conn = self._conn
+        if conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        return getattr(conn, name)
+
+    def __setattr__(self, name, value):
+        if name in PooledConnection.__slots__:
+            object.__setattr__(self, name, value)
+        elif self._conn is None:
+            raise sqlite3.ProgrammingError('Cannot operate on a closed database.')
+        else:
+            setattr(self._conn, name, value)
+
+    def __enter__(self):
+        self._conn.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return self._conn.__exit__(exc_type, exc_value, traceback)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            self._pool.release(self._path, conn)
+
+    def __del__(self):
+        # 调用方忘记close时，在回收代理对象时归还连接
+        try:
+            self.close()
+        except Exception:
+            pass
+
+class ConnectionPool:
+    """
+    SQLite连接池
+    - 连接以WAL模式打开，读写互不阻塞；设置busy_timeout，写锁冲突时等待而不是立即报错
+    - 连接长期复用，sqlite3内置的语句缓存（cached_statements）因此得以跨请求复用已编译的语句
+    - 空闲连接按数据库路径分组保存；一个连接同一时刻只被一个线程使用，
+      Flask开发服务器为每个请求创建新线程，因此空闲连接在线程间共享而不是绑定到某个线程
+
+    Args:
+        max_idle (int): 每个数据库最多保留的空闲连接数
+        busy_timeout (float): 等待写锁的秒数
+        cached_statements (int): 每个连接缓存的预编译语句数量
+    """
+    def __init__(self, max_idle=8, busy_timeout=5.0, cached_statements=256):
+        self.max_idle = max_idle
+        self.busy_timeout = busy_timeout
+        self.cached_statements = cached_statements
+        self._lock = threading.Lock()
+        self._idle = {}  # {abs_path: [sqlite3.Connection]}
+        self._stats = {'created': 0, 'reused': 0, 'released': 0, 'discarded': 0,
+                       'rolled_back': 0, 'in_use': 0, 'peak_in_use': 0}
+
+    def _open(self, path):
+        conn = sqlite3.connect(path, timeout=self.busy_timeout, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute(f'PRAGMA busy_timeout={int(self.busy_timeout * 1000)}')
+        return conn
+
+    def acquire(self, database=None):
+        """从连接池获取连接，没有空闲连接时新建"""
+        path = os.path.abspath(database or DATABASE)
+        with self._lock:
+            idle = self._idle.get(path)
+            conn = idle.pop() if idle else None
+            self._stats['reused' if conn else 'created'] += 1
+            self._stats['in_use'] += 1
+            self._stats['peak_in_use'] = max(self._stats['peak_in_use'], self._stats['in_use'])
+        if conn is None:
+            try:
+                conn = self._open(path)
+            except Exception:
+                with self._lock:
+                    self._stats['in_use'] -= 1
+                raise
+        conn.row_factory = sqlite3.Row
+        return PooledConnection(conn, self, path)
+
+    def release(self, path, conn):
+        """归还连接：回滚调用方未提交的事务，超出空闲上限时关闭"""
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+                rolled_back = True
+            else:
+                rolled_back = False
+        except sqlite3.Error:
+            # 连接已不可用，直接丢弃
+            with self._lock:
+                self._stats['in_use'] -= 1
+                self._stats['discarded'] += 1
+            conn.close()
+            return
+
+        with self._lock:
+            self._stats['in_use'] -= 1
+            self._stats['released'] += 1
+            if rolled_back:
+                self._stats['rolled_back'] += 1
+            idle = self._idle.setdefault(path, [])
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+            self._stats['discarded'] += 1
+        conn.close()
+
+    def close_all(self):
+        """关闭所有空闲连接（正在使用的连接归还时会重新进入连接池）"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for conn in connections:
+                conn.close()
+
+    def stats(self):
+        """获取连接池统计信息"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = sum(len(connections) for connections in self._idle.values())
+        acquired = stats['created'] + stats['reused']
+        stats['reuse_rate'] = round(stats['reused'] / acquired, 4) if acquired else 0.0
+        stats['max_idle'] = self.max_idle
+        return stats
+
+connection_pool = ConnectionPool(
+    max_idle=int(os.environ.get('DB_POOL_MAX_IDLE', 8)),
+    busy_timeout=float(os.environ.get('DB_BUSY_TIMEOUT', 5.0))
+)
+
+def get_db_connection():
+    """从连接池获取数据库连接，使用完毕后调用close()归还"""
+    return connection_pool.acquire()
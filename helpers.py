@@ -1,8 +1,14 @@
-import sqlite3
 import datetime
 import json
+import os
 import queue
 import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from agent_prompts import estimate_tokens
+from db import SQLITE_MAX_VARIABLES, get_db_connection
+from migrations import FTS_TOKENIZER, LATEST_VERSION, apply_migrations, get_schema_version
+from prompt_registry import prompt_registry
+from rows import JdRow, ResumeRow
 
 # 全局日志队列，用于向前端广播日志
 log_queue = queue.Queue(maxsize=1000)
@@ -78,6 +84,32 @@ def log_desensitization(data_type, name_or_title, success=True, error_msg=""):
     print(log_message)
     broadcast_log_to_frontend(log_message)
 
+def run_in_bounded_pool(items, worker_fn, max_workers, thread_name_prefix='batch-worker'):
+    """
+    使用有界线程池并发处理items，按完成顺序产出结果
+    
+    Args:
+        items (list): 待处理的项目
+        worker_fn (callable): 处理单个项目的函数，签名为 worker_fn(item)
+        max_workers (int): 最大并发数
+        thread_name_prefix (str): 工作线程名前缀
+    
+    Yields:
+        tuple: (index, result, error) —— index为项目在items中的位置；成功时error为None，失败时result为None
+    """
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=thread_name_prefix)
+    try:
+        futures = {executor.submit(worker_fn, item): index for index, item in enumerate(items)}
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                yield index, future.result(), None
+            except Exception as e:
+                yield index, None, e
+    finally:
+        # 生成器被提前关闭（如客户端断开）时，取消尚未开始的任务
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def diagnose_json_error(json_text, error_msg):
     """诊断JSON错误并提供详细信息"""
     lines = json_text.split('\n')
@@ -105,44 +137,46 @@ def diagnose_json_error(json_text, error_msg):
     
     return f"JSON Error: {error_msg}\nJSON preview: {json_text[:200]}..."
 
-def get_db_connection():
-    """Establishes a connection to the SQLite database."""
-    conn = sqlite3.connect('talent_match.db', check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
-
 def check_and_migrate_db():
-    """Checks for table existence and adds them if they don't exist."""
+    """
+    初始化并升级数据库表结构（不会删除已有数据）
+    1. 执行schema.sql创建缺失的基础表（CREATE TABLE IF NOT EXISTS）
+    2. 按PRAGMA user_version依次应用migrations.py中尚未执行的迁移
+    """
     log_processing_step("DATABASE_MIGRATION", "START", "Checking database schema")
     
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # List of all tables that should exist
-    required_tables = {'resumes', 'job_descriptions', 'facilitation_results'}
-    
-    cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-    existing_tables = {row[0] for row in cursor.fetchall()}
-    
-    missing_tables = required_tables - existing_tables
-    
-    if missing_tables:
-        log_processing_step("DATABASE_MIGRATION", "PROGRESS", f"Missing tables detected: {', '.join(missing_tables)}")
+    try:
         with open('schema.sql') as f:
             conn.executescript(f.read())
-        log_processing_step("DATABASE_MIGRATION", "COMPLETE", "Database schema applied successfully")
-    else:
-        log_processing_step("DATABASE_MIGRATION", "COMPLETE", "Database schema is up-to-date")
-    
-    conn.close()
+
+        current_version = get_schema_version(conn)
+        if current_version >= LATEST_VERSION:
+            log_processing_step("DATABASE_MIGRATION", "COMPLETE", f"Database schema is up-to-date (version {current_version})")
+            return
+
+        log_processing_step("DATABASE_MIGRATION", "PROGRESS", f"Upgrading schema from version {current_version} to {LATEST_VERSION}")
+        for version, description in apply_migrations(conn):
+            log_processing_step("DATABASE_MIGRATION", "PROGRESS", f"Applied migration {version}: {description}")
+        log_processing_step("DATABASE_MIGRATION", "COMPLETE", f"Database schema upgraded to version {LATEST_VERSION}")
+    except Exception as e:
+        log_processing_step("DATABASE_MIGRATION", "ERROR", f"Schema migration failed: {str(e)}")
+        raise
+    finally:
+        conn.close()
 
 def get_prompt(filename):
-    """Loads a prompt from the prompts directory."""
-    try:
-        with open(f'prompts/{filename}', 'r', encoding='utf-8') as f:
-            return f.read()
-    except FileNotFoundError:
-        return None 
+    """从提示词注册表获取模板原文（内存缓存，文件修改后自动重新加载），不存在时返回None"""
+    template = prompt_registry.get(filename)
+    return template.text if template else None
+
+def render_prompt(filename, /, **values):
+    """用预编译的模板填充占位符，不存在时返回None"""
+    return prompt_registry.render(filename, **values)
+
+def get_prompt_version(filename):
+    """提示词模板的版本哈希，用于缓存键；不存在时返回None"""
+    return prompt_registry.version(filename)
 
 def get_resume_and_jd_info(resume_id, jd_id):
     """
@@ -153,7 +187,7 @@ def get_resume_and_jd_info(resume_id, jd_id):
         jd_id (int): 职位描述ID
     
     Returns:
-        tuple: (resume_info, jd_info) 包含完整信息的字典，如果找不到返回 (None, None)
+        tuple: (resume_info, jd_info) 包含完整信息的ResumeRow/JdRow（可按dict方式读取），如果找不到返回 (None, None)
     """
     log_processing_step("GET_RESUME_JD_INFO", "START", f"Fetching Resume ID: {resume_id}, JD ID: {jd_id}")
     
@@ -172,35 +206,9 @@ def get_resume_and_jd_info(resume_id, jd_id):
             log_processing_step("GET_RESUME_JD_INFO", "ERROR", f"JD ID {jd_id} not found")
             return None, None
         
-        # 构建简历信息字典
-        resume_info = {
-            'id': resume['id'],
-            'name': resume['name'],
-            'email': resume['email'],
-            'phone': resume['phone'],
-            'skills': resume['skills'],
-            'summary': resume['summary'],
-            'experience': json.loads(resume['experience_json']) if resume['experience_json'] else [],
-            'education': json.loads(resume['education_json']) if resume['education_json'] else [],
-            'publications': json.loads(resume['publications_json']) if resume['publications_json'] else [],
-            'projects': json.loads(resume['projects_json']) if resume['projects_json'] else [],
-            'desensitized_data': json.loads(resume['desensitized_json']) if resume['desensitized_json'] else None,
-            'created_at': resume['created_at']
-        }
-        
-        # 构建JD信息字典
-        jd_info = {
-            'id': jd['id'],
-            'title': jd['title'],
-            'company': jd['company'],
-            'location': jd['location'],
-            'salary': jd['salary'],
-            'requirements': jd['requirements'],
-            'description': jd['description'],
-            'benefits': jd['benefits'],
-            'desensitized_data': json.loads(jd['desensitized_json']) if jd['desensitized_json'] else None,
-            'created_at': jd['created_at']
-        }
+        # 包装为只读的类dict对象，JSON列（经历、教育、脱敏数据等）在第一次访问时才解码
+        resume_info = ResumeRow(resume)
+        jd_info = JdRow(jd)
         
         log_processing_step("GET_RESUME_JD_INFO", "COMPLETE", 
                           f"Retrieved {resume_info['name']} -> {jd_info['title']} @ {jd_info['company']}")
@@ -234,11 +242,19 @@ def find_jd_by_id_or_title(jd_id: int = None, title: str = None) -> str:
             log_processing_step("JD_TOOL_SEARCH", "START", f"通过ID查询JD: {jd_id}")
             query = 'SELECT * FROM job_descriptions WHERE id = ?'
             params = (jd_id,)
+        elif len(title) >= FTS_MIN_TERM_LENGTH:
+            log_processing_step("JD_TOOL_SEARCH", "START", f"通过标题查询JD: {title}")
+            # 通过全文索引按标题模糊匹配，并优先选择最新的一个
+            query = """
+                SELECT j.* FROM jds_fts JOIN job_descriptions j ON j.id = jds_fts.rowid
+                WHERE jds_fts MATCH ? ORDER BY j.created_at DESC LIMIT 1
+            """
+            params = (f'title : {quote_fts_term(title)}',)
         else:
             log_processing_step("JD_TOOL_SEARCH", "START", f"通过标题查询JD: {title}")
-            # 使用LIKE进行模糊匹配，并优先选择最新的一个
-            query = 'SELECT * FROM job_descriptions WHERE title LIKE ? ORDER BY created_at DESC LIMIT 1'
-            params = (f'%{title}%',)
+            # 标题过短无法使用全文索引，退回LIKE匹配
+            query = "SELECT * FROM job_descriptions WHERE title LIKE ? ESCAPE '\\' ORDER BY created_at DESC LIMIT 1"
+            params = (f'%{escape_like(title)}%',)
 
         jd = conn.execute(query, params).fetchone()
 
@@ -276,64 +292,279 @@ def list_all_resume_ids() -> str:
     finally:
         conn.close()
 
-def get_resumes_by_ids(resume_ids: list[int]) -> str:
+# get_resume_details工具可返回的字段（脱敏数据不提供给agent）
+RESUME_TOOL_FIELDS = ('id', 'name', 'email', 'phone', 'skills', 'summary', 'experience', 'education',
+                      'publications', 'projects', 'created_at')
+# 单次调用返回内容的token预算（结果直接进入executor和observer的prompt）
+RESUME_TOOL_DEFAULT_TOKENS = int(os.environ.get('RESUME_TOOL_DEFAULT_TOKENS', 4000))
+RESUME_TOOL_MAX_TOKENS = int(os.environ.get('RESUME_TOOL_MAX_TOKENS', 16000))
+RESUME_TOOL_MIN_TOKENS = 200
+# 为status、next_cursor等外层字段预留的token数
+RESUME_TOOL_ENVELOPE_TOKENS = 60
+# 按ID分块读取，块大小从小到大（上限为SQLITE_MAX_VARIABLES），预算很小时只读取少量记录
+RESUME_FETCH_FIRST_CHUNK = 32
+
+def parse_resume_fields(fields):
     """
-    根据简历ID列表从数据库中查询完整的简历信息，并排除脱敏字段。
+    解析get_resume_details的字段列表（列表或逗号分隔的字符串），未指定时返回全部字段；id总是包含在内
+
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    if not fields:
+        return list(RESUME_TOOL_FIELDS)
+    if isinstance(fields, str):
+        fields = fields.split(',')
+    requested = [field.strip() for field in fields if field and field.strip()]
+    unknown = [field for field in requested if field not in RESUME_TOOL_FIELDS]
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(unknown)}，可用: {', '.join(RESUME_TOOL_FIELDS)}")
+    return ['id'] + [field for field in dict.fromkeys(requested) if field != 'id']
+
+def shrink_value(value, max_chars, max_items):
+    """把长文本截断到max_chars个字符、长列表截断到max_items项（递归处理嵌套结构）"""
+    if isinstance(value, str):
+        return value if len(value) <= max_chars else value[:max_chars] + '…'
+    if isinstance(value, list):
+        shrunk = [shrink_value(item, max_chars, max_items) for item in value[:max_items]]
+        if len(value) > max_items:
+            shrunk.append(f'…(省略{len(value) - max_items}项)')
+        return shrunk
+    if isinstance(value, dict):
+        return {key: shrink_value(item, max_chars, max_items) for key, item in value.items()}
+    return value
+
+def fit_record(record, max_tokens):
+    """
+    把单条记录压缩到token预算内：逐步减小文本长度和列表项数，返回 (记录, token数)
+    压缩到最小仍超出预算时照常返回，保证每次调用至少推进一条记录
+    """
+    max_chars, max_items = 2000, 20
+    while True:
+        shrunk = shrink_value(record, max_chars, max_items)
+        shrunk['truncated'] = True
+        tokens = estimate_tokens(json.dumps(shrunk, ensure_ascii=False, default=str))
+        if tokens <= max_tokens or (max_chars <= 20 and max_items <= 1):
+            return shrunk, tokens
+        max_chars, max_items = max(20, max_chars // 2), max(1, max_items // 2)
+
+def get_resumes_by_ids(resume_ids: list[int], fields=None, max_tokens=None, cursor=None) -> str:
+    """
+    根据简历ID列表从数据库中查询简历信息，只返回请求的字段（不含脱敏字段），结果大小受token预算限制。
+    
+    按ID顺序填充结果，放不下的记录留到下一次调用：返回的next_cursor是下一条未返回记录在resume_ids中的位置，
+    用相同的resume_ids和该cursor再次调用即可继续。单条记录超出预算时截断其中的长文本和长列表并标记truncated。
     
     Args:
         resume_ids (list[int]): 简历的数据库ID列表。
+        fields (list[str] | str): 返回的字段，默认全部字段。
+        max_tokens (int): 本次返回内容的token预算，默认RESUME_TOOL_DEFAULT_TOKENS。
+        cursor (int): 从resume_ids中的第几个开始，默认0。
         
     Returns:
-        str: 一个JSON字符串，包含一个简历信息对象的列表或错误信息。
+        str: 一个JSON字符串，包含简历信息列表、next_cursor（没有更多时为null）或错误信息。
     """
     if not resume_ids:
         return json.dumps({"status": "error", "message": "必须提供简历ID列表。"})
+    try:
+        resume_ids = [int(resume_id) for resume_id in resume_ids]
+        fields = parse_resume_fields(fields)
+        max_tokens = max(RESUME_TOOL_MIN_TOKENS, min(int(max_tokens or RESUME_TOOL_DEFAULT_TOKENS), RESUME_TOOL_MAX_TOKENS))
+        start = int(cursor or 0)
+        if not 0 <= start < len(resume_ids):
+            raise ValueError(f"cursor超出范围: {cursor}")
+    except (TypeError, ValueError) as e:
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
 
-    log_processing_step("RESUME_TOOL_GET_BATCH", "START", f"正在批量查询简历: {resume_ids}")
+    log_processing_step("RESUME_TOOL_GET_BATCH", "START", f"正在批量查询简历: {len(resume_ids)} 个ID，从第 {start} 个开始，字段: {fields}，预算: {max_tokens} tokens")
+    # 只读取请求的字段对应的列
+    columns = ', '.join(dict.fromkeys(ResumeRow.JSON_FIELDS.get(field, (field,))[0] for field in fields))
     conn = get_db_connection()
-    results = []
+    results, missing = [], []
+    used_tokens = RESUME_TOOL_ENVELOPE_TOKENS
+    position = start
+    chunk_size = RESUME_FETCH_FIRST_CHUNK
     
     try:
-        # 使用参数化查询来防止SQL注入
-        placeholders = ','.join('?' for _ in resume_ids)
-        query = f'SELECT * FROM resumes WHERE id IN ({placeholders})'
-        
-        resumes = conn.execute(query, resume_ids).fetchall()
-        
-        # 创建一个从id到resume的映射，以便保持顺序
-        resume_map = {resume['id']: resume for resume in resumes}
-        
-        for resume_id in resume_ids:
-            if resume_id in resume_map:
-                resume = resume_map[resume_id]
-                raw_dict = dict(resume)
-                resume_dict = {}
-                for key, value in raw_dict.items():
-                    if key.endswith('_json'):
-                        # 忽略脱敏字段
-                        if key == 'desensitized_json':
-                            continue
-                        
-                        field_name = key.replace('_json', '')
-                        if value:
-                            try:
-                                resume_dict[field_name] = json.loads(value)
-                            except json.JSONDecodeError:
-                                resume_dict[field_name] = f"Invalid JSON in DB: {value}"
-                        else:
-                            resume_dict[field_name] = [] # or some other default
-                    else:
-                        resume_dict[key] = value
-                
-                # 再次确保 desensitized_data (如果它作为普通列存在) 不在最终结果中
-                resume_dict.pop('desensitized_data', None)
-                results.append(resume_dict)
-        
-        log_processing_step("RESUME_TOOL_GET_BATCH", "COMPLETE", f"成功找到 {len(results)}/{len(resume_ids)} 份简历。")
-        return json.dumps({"status": "success", "data": results}, ensure_ascii=False, default=str)
+        while position < len(resume_ids):
+            chunk = resume_ids[position:position + chunk_size]
+            # 使用参数化查询来防止SQL注入
+            placeholders = ','.join('?' for _ in chunk)
+            rows = conn.execute(f'SELECT {columns} FROM resumes WHERE id IN ({placeholders})', chunk).fetchall()
+            # 创建一个从id到resume的映射，以便保持顺序
+            resume_map = {row['id']: row for row in rows}
+
+            full = False
+            for resume_id in chunk:
+                row = resume_map.get(resume_id)
+                if row is None:
+                    missing.append(resume_id)
+                    position += 1
+                    continue
+                # JSON列在to_dict时才解码，解码失败时保留原文
+                record = ResumeRow(row).to_dict(fields)
+                # 每条记录额外计1个token作为列表中的分隔符
+                tokens = estimate_tokens(json.dumps(record, ensure_ascii=False, default=str)) + 1
+                if used_tokens + tokens > max_tokens:
+                    if results:
+                        full = True
+                        break
+                    record, tokens = fit_record(record, max_tokens - used_tokens - 1)
+                    tokens += 1
+                results.append(record)
+                used_tokens += tokens
+                position += 1
+            if full:
+                break
+            chunk_size = min(chunk_size * 2, SQLITE_MAX_VARIABLES)
+
+        next_cursor = position if position < len(resume_ids) else None
+        log_processing_step("RESUME_TOOL_GET_BATCH", "COMPLETE", f"返回 {len(results)} 份简历（约 {used_tokens} tokens），未找到 {len(missing)} 个，next_cursor: {next_cursor}")
+        return json.dumps({
+            "status": "success",
+            "data": results,
+            "missing_ids": missing,
+            "next_cursor": next_cursor,
+            "remaining": len(resume_ids) - position
+        }, ensure_ascii=False, default=str)
 
     except Exception as e:
         log_processing_step("RESUME_TOOL_GET_BATCH", "ERROR", f"批量查询简历时发生错误: {str(e)}")
         return json.dumps({"status": "error", "message": f"数据库查询失败: {str(e)}"})
     finally:
-        conn.close() 
\ No newline at end of file
+        conn.close()
+
+# 全文检索：每种文档对应的FTS表、源表、索引列、各列的bm25权重以及结果中返回的字段
+FTS_SOURCES = {
+    'resume': {
+        'fts_table': 'resumes_fts',
+        'table': 'resumes',
+        'columns': ('skills', 'summary', 'experience'),
+        'weights': (3.0, 1.0, 1.0),
+        'fields': ('name', 'skills')
+    },
+    'jd': {
+        'fts_table': 'jds_fts',
+        'table': 'job_descriptions',
+        'columns': ('title', 'requirements', 'description'),
+        'weights': (3.0, 1.5, 1.0),
+        'fields': ('title', 'company')
+    }
+}
+# trigram分词器无法用索引匹配少于3个字符的词，这类词改用LIKE过滤
+FTS_MIN_TERM_LENGTH = 3 if FTS_TOKENIZER == 'trigram' else 1
+SNIPPET_CONTEXT_CHARS = 30
+
+def quote_fts_term(term):
+    """将一个检索词转义为FTS5短语"""
+    return '"' + term.replace('"', '""') + '"'
+
+def escape_like(term):
+    """转义LIKE中的通配符（配合 ESCAPE '\\' 使用）"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+def make_snippet(text, term):
+    """在text中截取term附近的片段，用【】标出匹配位置"""
+    position = text.lower().find(term.lower())
+    if position == -1:
+        return text[:SNIPPET_CONTEXT_CHARS * 2]
+    start = max(0, position - SNIPPET_CONTEXT_CHARS)
+    end = min(len(text), position + len(term) + SNIPPET_CONTEXT_CHARS)
+    return (('…' if start > 0 else '') + text[start:position] + '【' + text[position:position + len(term)] + '】'
+            + text[position + len(term):end] + ('…' if end < len(text) else ''))
+
+def search_documents(query, doc_type='all', limit=10):
+    """
+    在简历和/或职位描述的全文索引中检索，按bm25相关度排序
+    检索词之间以空格分隔，结果需包含全部检索词
+
+    Args:
+        query (str): 检索词
+        doc_type (str): 'resume'、'jd' 或 'all'
+        limit (int): 每种文档最多返回的条数
+
+    Returns:
+        dict: {文档类型: [{'id', 展示字段..., 'score', 'snippet'}]}，score越小越相关
+    """
+    terms = (query or '').split()
+    if not terms:
+        raise ValueError('检索词不能为空。')
+    doc_types = list(FTS_SOURCES) if doc_type == 'all' else [doc_type]
+    if any(source_type not in FTS_SOURCES for source_type in doc_types):
+        raise ValueError(f'不支持的文档类型: {doc_type}')
+
+    indexed_terms = [term for term in terms if len(term) >= FTS_MIN_TERM_LENGTH]
+    short_terms = [term for term in terms if len(term) < FTS_MIN_TERM_LENGTH]
+
+    conn = get_db_connection()
+    try:
+        results = {}
+        for source_type in doc_types:
+            source = FTS_SOURCES[source_type]
+            fts_table = source['fts_table']
+            fields = ', '.join(f"s.{field}" for field in source['fields'])
+
+            # 短词在FTS表的各列上做LIKE过滤
+            conditions, params = [], []
+            for term in short_terms:
+                conditions.append('(' + ' OR '.join(f"{fts_table}.{column} LIKE ? ESCAPE '\\'" for column in source['columns']) + ')')
+                params.extend([f'%{escape_like(term)}%'] * len(source['columns']))
+
+            if indexed_terms:
+                weights = ', '.join(str(weight) for weight in source['weights'])
+                query_sql = f"""
+                    SELECT s.id, {fields}, bm25({fts_table}, {weights}) AS score,
+                           snippet({fts_table}, -1, '【', '】', '…', 16) AS snippet
+                    FROM {fts_table} JOIN {source['table']} s ON s.id = {fts_table}.rowid
+                    WHERE {fts_table} MATCH ?{''.join(' AND ' + condition for condition in conditions)}
+                    ORDER BY score LIMIT ?
+                """
+                match = ' '.join(quote_fts_term(term) for term in indexed_terms)
+                hits = [dict(row) for row in conn.execute(query_sql, [match, *params, limit])]
+            else:
+                # 只有短词时无法使用全文索引和bm25，按LIKE过滤并返回最新的记录
+                columns = ', '.join(f"{fts_table}.{column}" for column in source['columns'])
+                query_sql = f"""
+                    SELECT s.id, {fields}, {columns}
+                    FROM {fts_table} JOIN {source['table']} s ON s.id = {fts_table}.rowid
+                    WHERE {' AND '.join(conditions)}
+                    ORDER BY s.id DESC LIMIT ?
+                """
+                hits = []
+                term = short_terms[0]
+                for row in conn.execute(query_sql, [*params, limit]):
+                    text = next((row[column] for column in source['columns']
+                                 if row[column] and term.lower() in row[column].lower()), '')
+                    hit = {field: row[field] for field in ('id', *source['fields'])}
+                    hit.update(score=None, snippet=make_snippet(text, term))
+                    hits.append(hit)
+            results[source_type] = hits
+        return results
+    finally:
+        conn.close()
+
+def full_text_search(query: str, doc_type: str = 'all', limit: int = 10) -> str:
+    """
+    在简历和职位描述中进行全文检索，返回按相关度排序的结果及匹配片段。
+    
+    Args:
+        query (str): 检索词，多个词用空格分隔。
+        doc_type (str): 'resume'、'jd' 或 'all'。
+        limit (int): 每种文档最多返回的条数。
+        
+    Returns:
+        str: 一个JSON字符串，包含检索结果或错误信息。
+    """
+    log_processing_step("FULL_TEXT_SEARCH", "START", f"全文检索: {query} (类型: {doc_type})")
+    try:
+        limit = max(1, min(int(limit or 10), 50))
+        results = search_documents(query, doc_type=doc_type, limit=limit)
+        total = sum(len(hits) for hits in results.values())
+        log_processing_step("FULL_TEXT_SEARCH", "COMPLETE", f"找到 {total} 条匹配结果。")
+        return json.dumps({"status": "success", "data": results}, ensure_ascii=False)
+    except ValueError as e:
+        log_processing_step("FULL_TEXT_SEARCH", "ERROR", str(e))
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    except Exception as e:
+        log_processing_step("FULL_TEXT_SEARCH", "ERROR", f"全文检索时发生错误: {str(e)}")
+        return json.dumps({"status": "error", "message": f"全文检索失败: {str(e)}"}, ensure_ascii=False)
@@ -0,0 +1,207 @@
+import json
+import sqlite3
+from db import SQLITE_MAX_VARIABLES
+from helpers import log_processing_step
+
+class TableSpec:
+    """
+    描述一张可批量写入的表
+
+    Args:
+        table (str): 表名
+        columns (tuple): INSERT的列
+        dedupe_columns (tuple): 用于查重的列
+        match_any (bool): True时任一查重列相同即视为重复（简历的姓名/邮箱/电话），
+                          False时所有查重列都相同才视为重复（JD的职位+公司）
+    """
+    def __init__(self, table, columns, dedupe_columns, match_any):
+        self.table = table
+        self.columns = columns
+        self.dedupe_columns = dedupe_columns
+        self.match_any = match_any
+        placeholders = ', '.join('?' for _ in columns)
+        self.insert_sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})"
+
+    def dedupe_keys(self, row):
+        """返回一行数据的查重键列表（空值不参与查重）"""
+        if self.match_any:
+            return [(column, row[column]) for column in self.dedupe_columns if row.get(column)]
+        return [tuple(row.get(column) for column in self.dedupe_columns)]
+
+RESUME_SPEC = TableSpec(
+    'resumes',
+    ('name', 'email', 'phone', 'skills', 'summary', 'experience_json', 'education_json',
+     'publications_json', 'projects_json', 'desensitized_json'),
+    ('name', 'email', 'phone'),
+    match_any=True
+)
+
+JD_SPEC = TableSpec(
+    'job_descriptions',
+    ('title', 'company', 'location', 'salary', 'requirements', 'description', 'benefits', 'desensitized_json'),
+    ('title', 'company'),
+    match_any=False
+)
+
+def build_resume_row(data, desensitized_data):
+    """将抽取出的简历数据转换为resumes表的一行"""
+    return {
+        'name': data.get('name'),
+        # 空字符串的邮箱/电话存为NULL，避免多份缺少联系方式的简历触发UNIQUE约束
+        'email': data.get('email') or None,
+        'phone': data.get('phone') or None,
+        'skills': data.get('skills', ''),
+        'summary': data.get('summary', ''),
+        'experience_json': json.dumps(data.get('experience', [])),
+        'education_json': json.dumps(data.get('education', [])),
+        'publications_json': json.dumps(data.get('publications', [])),
+        'projects_json': json.dumps(data.get('projects', [])),
+        'desensitized_json': json.dumps(desensitized_data)
+    }
+
+def build_jd_row(data, desensitized_data):
+    """将抽取出的JD数据转换为job_descriptions表的一行"""
+    return {
+        'title': data.get('title'),
+        'company': data.get('company', 'Unknown'),
+        'location': data.get('location', ''),
+        'salary': data.get('salary', ''),
+        'requirements': data.get('requirements', ''),
+        'description': data.get('description', ''),
+        'benefits': data.get('benefits', ''),
+        'desensitized_json': json.dumps(desensitized_data)
+    }
+
+class BatchWriter:
+    """
+    批量导入的单写者入库阶段
+    - 缓冲已校验的行，每满batch_size行在一个事务中用executemany写入
+    - 查重按批次集合式进行：批内去重 + 一次查询比对数据库中已有记录
+    - 批量写入失败时回退为逐行写入（每行一个SAVEPOINT），一行出错不会回滚整批
+
+    只能在持有conn的线程中使用。add/flush返回本次落定的行结果列表，
+    每个结果为 {'index', 'status': 'success'|'duplicate'|'error', 'id', 'message'}
+    """
+    def __init__(self, conn, spec, batch_size=25):
+        self.conn = conn
+        self.spec = spec
+        self.batch_size = max(1, batch_size)
+        self._pending = []  # [(index, row)]
+        self.stats = {'batches': 0, 'rows_written': 0, 'duplicates': 0, 'errors': 0, 'row_fallbacks': 0}
+
+    def add(self, index, row):
+        """缓冲一行，缓冲区满时写入并返回落定的结果"""
+        self._pending.append((index, row))
+        if len(self._pending) >= self.batch_size:
+            return self.flush()
+        return []
+
+    def flush(self):
+        """写入缓冲区中的所有行，返回落定的结果"""
+        if not self._pending:
+            return []
+        pending, self._pending = self._pending, []
+
+        outcomes = {}
+        to_insert = self._filter_duplicates(pending, outcomes)
+        if to_insert:
+            self._write(to_insert, outcomes)
+
+        self.stats['batches'] += 1
+        return [outcomes[index] for index, _ in pending]
+
+    def _filter_duplicates(self, pending, outcomes):
+        """集合式查重，返回需要写入的行；重复行的结果直接写入outcomes"""
+        existing = self._find_existing(pending)
+        seen_in_batch = {}
+        to_insert = []
+        for index, row in pending:
+            keys = self.spec.dedupe_keys(row)
+            duplicate_id = next((existing[key] for key in keys if key in existing), None)
+            if duplicate_id is not None:
+                outcomes[index] = {'index': index, 'status': 'duplicate', 'id': duplicate_id,
+                                   'message': f'Duplicate already exists (ID: {duplicate_id})'}
+                self.stats['duplicates'] += 1
+                continue
+            duplicate_index = next((seen_in_batch[key] for key in keys if key in seen_in_batch), None)
+            if duplicate_index is not None:
+                outcomes[index] = {'index': index, 'status': 'duplicate', 'id': None,
+                                   'message': f'Duplicate of another item in this batch (#{duplicate_index + 1})'}
+                self.stats['duplicates'] += 1
+                continue
+            for key in keys:
+                seen_in_batch[key] = index
+            to_insert.append((index, row))
+        return to_insert
+
+    def _find_existing(self, pending):
+        """一次（分块）查询批次中所有查重键在数据库中的已有记录，返回 {key: id}"""
+        spec = self.spec
+        existing = {}
+        if spec.match_any:
+            for column in spec.dedupe_columns:
+                values = list({row[column] for _, row in pending if row.get(column)})
+                for chunk in _chunks(values, SQLITE_MAX_VARIABLES):
+                    placeholders = ','.join('?' for _ in chunk)
+                    query = f"SELECT id, {column} FROM {spec.table} WHERE {column} IN ({placeholders})"
+                    for record in self.conn.execute(query, chunk):
+                        existing.setdefault((column, record[1]), record[0])
+        else:
+            # 先按第一列缩小范围，再在内存中比对完整的组合键
+            first_column = spec.dedupe_columns[0]
+            values = list({row.get(first_column) for _, row in pending})
+            columns = ', '.join(spec.dedupe_columns)
+            for chunk in _chunks(values, SQLITE_MAX_VARIABLES):
+                placeholders = ','.join('?' for _ in chunk)
+                query = f"SELECT id, {columns} FROM {spec.table} WHERE {first_column} IN ({placeholders})"
+                for record in self.conn.execute(query, chunk):
+                    existing.setdefault(tuple(record[1:]), record[0])
+        return existing
+
+    def _write(self, rows, outcomes):
+        """在一个事务中批量写入；失败时回退为逐行写入以隔离错误行"""
+        spec = self.spec
+        params = [tuple(row[column] for column in spec.columns) for _, row in rows]
+        conn = self.conn
+        try:
+            if conn.in_transaction:
+                conn.commit()
+            conn.execute('BEGIN')
+            conn.executemany(spec.insert_sql, params)
+            # 同一事务内没有其他写者，AUTOINCREMENT分配的ID是连续的
+            last_id = conn.execute('SELECT last_insert_rowid()').fetchone()[0]
+            conn.commit()
+            first_id = last_id - len(rows) + 1
+            for offset, (index, _) in enumerate(rows):
+                outcomes[index] = {'index': index, 'status': 'success', 'id': first_id + offset,
+                                   'message': 'Successfully inserted into database'}
+            self.stats['rows_written'] += len(rows)
+        except sqlite3.Error as e:
+            conn.rollback()
+            log_processing_step("BATCH_WRITE", "RETRY", f"Batch insert into {spec.table} failed ({e}), retrying row by row")
+            self.stats['row_fallbacks'] += 1
+            self._write_row_by_row(rows, params, outcomes)
+
+    def _write_row_by_row(self, rows, params, outcomes):
+        """逐行写入，每行使用SAVEPOINT，出错的行单独回滚"""
+        conn = self.conn
+        conn.execute('BEGIN')
+        for (index, _), row_params in zip(rows, params):
+            conn.execute('SAVEPOINT ingest_row')
+            try:
+                cursor = conn.execute(self.spec.insert_sql, row_params)
+                conn.execute('RELEASE SAVEPOINT ingest_row')
+                outcomes[index] = {'index': index, 'status': 'success', 'id': cursor.lastrowid,
+                                   'message': 'Successfully inserted into database'}
+                self.stats['rows_written'] += 1
+            except sqlite3.Error as e:
+                conn.execute('ROLLBACK TO SAVEPOINT ingest_row')
+                conn.execute('RELEASE SAVEPOINT ingest_row')
+                outcomes[index] = {'index': index, 'status': 'error', 'id': None, 'message': str(e)}
+                self.stats['errors'] += 1
+        conn.commit()
+
+def _chunks(values, size):
+    """将列表按size分块"""
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
@@ -0,0 +1,164 @@
+import base64
+import json
+import os
+import threading
+import time
+from helpers import get_db_connection
+from rows import ResumeRow, JdRow
+
+# 可分页列出的表：普通列、JSON列（返回时解码，字段名去掉_json后缀）、未指定fields时返回的字段以及行包装类型
+LIST_SPECS = {
+    'resumes': {
+        'columns': ('id', 'name', 'email', 'phone', 'skills', 'summary', 'created_at'),
+        'json_columns': {
+            'experience': 'experience_json',
+            'education': 'education_json',
+            'publications': 'publications_json',
+            'projects': 'projects_json',
+            'desensitized': 'desensitized_json'
+        },
+        'default_fields': ('id', 'name', 'email', 'phone', 'experience', 'created_at'),
+        'row_type': ResumeRow
+    },
+    'job_descriptions': {
+        'columns': ('id', 'title', 'company', 'location', 'salary', 'requirements', 'description', 'benefits', 'created_at'),
+        'json_columns': {
+            'desensitized': 'desensitized_json'
+        },
+        'default_fields': ('id', 'title', 'company', 'location', 'salary', 'requirements', 'description', 'created_at'),
+        'row_type': JdRow
+    }
+}
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+class TotalCountCache:
+    """
+    缓存各表的总行数，避免每次翻页都执行COUNT(*)
+    本进程内的增删会主动失效，TTL兜底其他进程的写入
+    """
+    def __init__(self, ttl_seconds=30):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counts = {}  # {table: (count, cached_at)}
+
+    def get(self, table, conn):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._counts.get(table)
+            if cached and now - cached[1] < self.ttl_seconds:
+                return cached[0]
+        count = conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        with self._lock:
+            self._counts[table] = (count, now)
+        return count
+
+    def invalidate(self, table=None):
+        with self._lock:
+            if table is None:
+                self._counts.clear()
+            else:
+                self._counts.pop(table, None)
+
+total_count_cache = TotalCountCache(ttl_seconds=float(os.environ.get('LIST_COUNT_CACHE_TTL', 30)))
+
+def invalidate_total_count(table=None):
+    """表中数据增删后调用，使缓存的总行数失效"""
+    total_count_cache.invalidate(table)
+
+def encode_cursor(created_at, record_id):
+    """把分页位置 (created_at, id) 编码为不透明的游标字符串"""
+    raw = json.dumps([created_at, record_id]).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """解析游标，格式不正确时抛出ValueError"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        created_at, record_id = json.loads(raw)
+        return str(created_at), int(record_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+def parse_fields(table, fields):
+    """
+    解析逗号分隔的字段列表，未指定时返回默认字段
+
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    spec = LIST_SPECS[table]
+    if not fields:
+        return list(spec['default_fields'])
+    requested = [field.strip() for field in fields.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in spec['columns'] and field not in spec['json_columns']]
+    if unknown:
+        raise ValueError(f"Unsupported fields: {', '.join(unknown)}")
+    return requested
+
+def _decode_row(row, table, fields):
+    """按字段列表把数据库行转换为字典，只解码请求的JSON列，解码失败时保留原文"""
+    return LIST_SPECS[table]['row_type'](row).to_dict(fields)
+
+def list_page(table, fields=None, cursor=None, limit=DEFAULT_PAGE_SIZE):
+    """
+    按 (created_at, id) 倒序进行keyset分页，只读取请求的列
+
+    Args:
+        table (str): LIST_SPECS中的表名
+        fields (list): 返回的字段，None时使用默认字段
+        cursor (str): 上一页返回的next_cursor，None表示第一页
+        limit (int): 每页条数
+
+    Returns:
+        dict: {'items', 'next_cursor', 'total', 'limit'}；没有下一页时next_cursor为None
+    """
+    spec = LIST_SPECS[table]
+    fields = fields or list(spec['default_fields'])
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+    # 游标需要created_at和id，即使调用方没有请求这两个字段
+    columns = {'id', 'created_at'}
+    for field in fields:
+        columns.add(spec['json_columns'].get(field, field))
+    select = ', '.join(sorted(columns))
+
+    params = []
+    where = ''
+    if cursor:
+        created_at, record_id = decode_cursor(cursor)
+        where = 'WHERE (created_at, id) < (?, ?)'
+        params.extend([created_at, record_id])
+
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f'SELECT {select} FROM {table} {where} ORDER BY created_at DESC, id DESC LIMIT ?',
+            params + [limit + 1]
+        ).fetchall()
+        total = total_count_cache.get(table, conn)
+    finally:
+        conn.close()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor(rows[-1]['created_at'], rows[-1]['id']) if has_more else None
+    return {
+        'items': [_decode_row(row, table, fields) for row in rows],
+        'next_cursor': next_cursor,
+        'total': total,
+        'limit': limit
+    }
+
+def get_record(table, record_id):
+    """读取单条记录的全部字段（JSON列已解码），不存在时返回None"""
+    spec = LIST_SPECS[table]
+    conn = get_db_connection()
+    try:
+        row = conn.execute(f'SELECT * FROM {table} WHERE id = ?', (record_id,)).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return _decode_row(row, table, list(spec['columns']) + list(spec['json_columns']))
@@ -0,0 +1,361 @@
+import bisect
+import json
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+
+from helpers import log_batch_item, log_processing_step, run_in_bounded_pool
+
+# 客户端断线后EventSource自动重连的等待时间（毫秒），以及无新事件时发送心跳注释的间隔（秒）
+SSE_RETRY_MS = 2000
+SSE_HEARTBEAT_INTERVAL = 15.0
+
+# 逐token推送的payload增量只对实时观看者有意义：一轮回复的消息事件（或错误）写入后，
+# 该轮的增量从事件日志中删除，回放时直接看到完整消息
+DELTA_EVENT_PREFIX = '{"type": "payload_delta"'
+TURN_END_EVENT_PREFIXES = tuple(f'{{"type": "{name}"' for name in ('planning', 'chatting', 'decision', 'error'))
+
+def parse_last_event_id(value):
+    """
+    解析SSE的Last-Event-ID（格式为 "任务ID:序号"）
+
+    Returns:
+        tuple: (job_id, seq)，无法解析时为 (None, 0)
+    """
+    if not value:
+        return None, 0
+    job_id, _, seq = value.rpartition(':')
+    if not job_id or not seq.isdigit():
+        return None, 0
+    return job_id, int(seq)
+
+class MatchJob:
+    """
+    一场在后台线程中运行的撮合任务
+
+    撮合产生的每个SSE事件按顺序追加到事件日志中（序号从1开始），任意数量的观看者
+    可以从任意序号开始回放并继续接收新事件；观看者断开不影响任务本身
+    payload增量事件在所属轮次的消息事件写入后被删除，因此日志中的序号可能不连续
+
+    Attributes:
+        job_id (str): 任务ID
+        key (tuple): 去重键（同一对简历/JD运行中时复用同一任务）
+        status (str): running / completed / failed
+    """
+    def __init__(self, job_id, key=None, params=None):
+        self.job_id = job_id
+        self.key = key
+        self.params = params or {}
+        self.status = 'running'
+        self.created_at = time.time()
+        self.finished_at = None
+        self._events = []  # 每个元素是一条事件的data部分（JSON文本）
+        self._seqs = []  # 与_events一一对应的序号，递增
+        self._turn_start = 0  # 当前轮次第一条事件在_events中的位置
+        self._cond = threading.Condition()
+        self._viewers = 0
+
+    @property
+    def finished(self):
+        return self.status != 'running'
+
+    def append(self, payload):
+        """追加一条事件，返回其序号；一轮回复结束时删除该轮的payload增量"""
+        with self._cond:
+            seq = self._seqs[-1] + 1 if self._seqs else 1
+            self._events.append(payload)
+            self._seqs.append(seq)
+            if payload.startswith(TURN_END_EVENT_PREFIXES):
+                self._drop_deltas_locked()
+            self._cond.notify_all()
+            return seq
+
+    def _drop_deltas_locked(self):
+        """删除当前轮次的payload增量事件（调用方需持有锁）"""
+        kept = [(seq, payload) for seq, payload in zip(self._seqs[self._turn_start:], self._events[self._turn_start:])
+                if not payload.startswith(DELTA_EVENT_PREFIX)]
+        self._seqs[self._turn_start:] = [seq for seq, _ in kept]
+        self._events[self._turn_start:] = [payload for _, payload in kept]
+        self._turn_start = len(self._events)
+
+    def finish(self, status):
+        with self._cond:
+            self._drop_deltas_locked()
+            self.status = status
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def event_count(self):
+        """事件日志中保留的事件数"""
+        with self._cond:
+            return len(self._events)
+
+    def last_seq(self):
+        """最后一条事件的序号，没有事件时为0"""
+        with self._cond:
+            return self._seqs[-1] if self._seqs else 0
+
+    def run(self, events):
+        """
+        消费撮合生成器产生的SSE文本（"data: {...}\\n\\n"），逐条写入事件日志
+        以最后一条事件的类型决定任务状态：error为failed，否则为completed
+        """
+        last_payload = None
+        try:
+            for chunk in events:
+                last_payload = chunk[len('data: '):].rstrip('\n') if chunk.startswith('data: ') else chunk.rstrip('\n')
+                self.append(last_payload)
+        except Exception as e:
+            log_processing_step("MATCH_JOB", "ERROR", f"Job {self.job_id} failed: {str(e)}")
+            last_payload = json.dumps({'type': 'error', 'message': f'撮合过程中发生错误: {str(e)}'})
+            self.append(last_payload)
+        try:
+            failed = last_payload is None or json.loads(last_payload).get('type') == 'error'
+        except (json.JSONDecodeError, AttributeError):
+            failed = False
+        self.finish('failed' if failed else 'completed')
+        log_processing_step("MATCH_JOB", "COMPLETE", f"Job {self.job_id} {self.status} with {self.event_count()} events retained of {self.last_seq()}")
+
+    def stream(self, last_event_id=0, heartbeat_interval=SSE_HEARTBEAT_INTERVAL):
+        """
+        生成带id的SSE文本：先回放序号大于last_event_id的事件，再跟随新事件直到任务结束
+        长时间没有新事件时发送心跳注释，防止代理断开空闲连接
+        """
+        seq = max(last_event_id, 0)
+        with self._cond:
+            self._viewers += 1
+        try:
+            yield f"retry: {SSE_RETRY_MS}\n\n"
+            while True:
+                with self._cond:
+                    if (not self._seqs or seq >= self._seqs[-1]) and not self.finished:
+                        self._cond.wait(heartbeat_interval)
+                    start = bisect.bisect_right(self._seqs, seq)
+                    events = list(zip(self._seqs[start:], self._events[start:]))
+                    finished = self.finished
+                if events:
+                    for seq, payload in events:
+                        yield f"id: {self.job_id}:{seq}\ndata: {payload}\n\n"
+                elif finished:
+                    return
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            with self._cond:
+                self._viewers -= 1
+
+    def summary(self):
+        with self._cond:
+            return {
+                'job_id': self.job_id,
+                'status': self.status,
+                'params': self.params,
+                'event_count': len(self._events),
+                'last_event_id': self._seqs[-1] if self._seqs else 0,
+                'viewers': self._viewers,
+                'created_at': self.created_at,
+                'finished_at': self.finished_at
+            }
+
+class BatchMatchJob:
+    """
+    N×M批量撮合任务：每一对简历/JD作为一个工作项，在有界线程池中逐对完整撮合
+
+    Args:
+        job_id (str): 批量任务ID
+        pairs (list): [(resume_id, jd_id)]
+        concurrency (int): 同时进行的撮合数
+
+    单对撮合由run(match_fn)传入的 match_fn(resume_id, jd_id, cancel_event) 执行，返回
+    {'status': completed / failed / cancelled, ...}；取消后尚未开始的工作项直接记为cancelled，
+    进行中的撮合在下一个事件处停止
+    """
+    def __init__(self, job_id, pairs, concurrency):
+        self.job_id = job_id
+        self.key = None
+        self.pairs = pairs
+        self.concurrency = concurrency
+        self.status = 'running'
+        self.created_at = time.time()
+        self.finished_at = None
+        self._results = [None] * len(pairs)
+        self._counts = Counter()  # 按工作项状态计数
+        self._outcomes = Counter()  # 按撮合结论（MATCH / NO_MATCH / UNCERTAIN）计数
+        self._running = 0
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status != 'running'
+
+    def cancel(self):
+        """请求取消，返回任务是否仍在运行"""
+        self._cancel.set()
+        return not self.finished
+
+    def _work(self, match_fn, pair):
+        if self._cancel.is_set():
+            return {'status': 'cancelled'}
+        with self._lock:
+            self._running += 1
+        started = time.monotonic()
+        try:
+            result = match_fn(pair[0], pair[1], self._cancel)
+        finally:
+            with self._lock:
+                self._running -= 1
+        result['duration'] = round(time.monotonic() - started, 3)
+        return result
+
+    def run(self, match_fn):
+        log_processing_step("BATCH_MATCH", "START", f"Batch {self.job_id}: {len(self.pairs)} pairs with concurrency {self.concurrency}")
+        for index, result, error in run_in_bounded_pool(self.pairs, lambda pair: self._work(match_fn, pair),
+                                                        self.concurrency, thread_name_prefix='batch-match'):
+            if error:
+                result = {'status': 'failed', 'error': str(error)}
+            resume_id, jd_id = self.pairs[index]
+            with self._lock:
+                self._results[index] = {'resume_id': resume_id, 'jd_id': jd_id, **result}
+                self._counts[result['status']] += 1
+                if result.get('final_result'):
+                    self._outcomes[result['final_result']] += 1
+                done = sum(self._counts.values())
+            log_batch_item("BATCH_MATCH", done - 1, len(self.pairs), f"resume {resume_id} × jd {jd_id}",
+                           success=result['status'] != 'failed', details=result.get('final_result') or result.get('error') or result['status'])
+        with self._lock:
+            self.status = 'cancelled' if self._cancel.is_set() else 'completed'
+            self.finished_at = time.time()
+        log_processing_step("BATCH_MATCH", "COMPLETE", f"Batch {self.job_id} {self.status}: {json.dumps(self.progress())}")
+
+    def progress(self):
+        """进度与吞吐：已处理对数、各状态计数、撮合结论分布、每分钟完成对数和预计剩余时间"""
+        with self._lock:
+            done = sum(self._counts.values())
+            end = self.finished_at or time.time()
+            elapsed = max(end - self.created_at, 1e-6)
+            per_minute = done / elapsed * 60
+            remaining = len(self.pairs) - done
+            return {
+                'total': len(self.pairs),
+                'done': done,
+                'running': self._running,
+                'pending': remaining - self._running,
+                'counts': dict(self._counts),
+                'outcomes': dict(self._outcomes),
+                'elapsed_seconds': round(elapsed, 3),
+                'pairs_per_minute': round(per_minute, 2),
+                'eta_seconds': round(remaining / per_minute * 60, 1) if per_minute and not self.finished else None
+            }
+
+    def summary(self, include_results=False):
+        summary = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'cancel_requested': self._cancel.is_set(),
+            'concurrency': self.concurrency,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at,
+            'progress': self.progress()
+        }
+        if include_results:
+            with self._lock:
+                summary['results'] = [result for result in self._results if result is not None]
+        return summary
+
+class MatchJobRegistry:
+    """
+    管理后台撮合任务
+    - 同一去重键的任务运行中时，再次发起撮合直接复用该任务，不会重复调用模型
+    - 已结束的任务保留ttl_seconds供回放，之后被清理；任务数超过max_jobs时优先淘汰最早结束的任务
+    - 运行中的任务不会被淘汰，其数量由max_running限制：达到上限时不再启动新任务
+    """
+    def __init__(self, ttl_seconds=3600, max_jobs=64, max_running=8):
+        self.ttl_seconds = ttl_seconds
+        self.max_jobs = max_jobs
+        self.max_running = max_running
+        self._jobs = OrderedDict()  # job_id -> MatchJob
+        self._lock = threading.Lock()
+
+    def start(self, events_factory, key=None, params=None, job_id=None):
+        """
+        启动后台任务
+
+        Args:
+            events_factory (callable): 接收job_id，返回产生SSE文本的生成器
+            key (tuple): 去重键，None表示不去重
+
+        Returns:
+            tuple: (MatchJob, 是否新建)；运行中的任务数已达上限时为 (None, False)
+        """
+        with self._lock:
+            self._evict_locked()
+            if key is not None:
+                for job in self._jobs.values():
+                    if job.key == key and not job.finished:
+                        return job, False
+            if self._running_count_locked() >= self.max_running:
+                log_processing_step("MATCH_JOB", "REJECT", f"Running job limit reached ({self.max_running})")
+                return None, False
+            job = MatchJob(job_id or uuid.uuid4().hex[:12], key, params)
+            self._add_locked(job)
+
+        thread = threading.Thread(target=job.run, args=(events_factory(job.job_id),),
+                                  name=f"match-job-{job.job_id}", daemon=True)
+        thread.start()
+        log_processing_step("MATCH_JOB", "START", f"Job {job.job_id} started: {json.dumps(job.params)}")
+        return job, True
+
+    def submit(self, job, match_fn):
+        """
+        注册批量撮合任务并在后台线程中运行 job.run(match_fn)
+
+        Returns:
+            任务本身；运行中的任务数已达上限时返回None，任务不会运行
+        """
+        with self._lock:
+            self._evict_locked()
+            if self._running_count_locked() >= self.max_running:
+                log_processing_step("BATCH_MATCH", "REJECT", f"Running job limit reached ({self.max_running})")
+                return None
+            self._add_locked(job)
+        thread = threading.Thread(target=job.run, args=(match_fn,), name=f"batch-match-{job.job_id}", daemon=True)
+        thread.start()
+        return job
+
+    def get(self, job_id):
+        """获取任务，不存在或已被清理时返回None"""
+        with self._lock:
+            self._evict_locked()
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            self._evict_locked()
+            jobs = list(self._jobs.values())
+        return [job.summary() for job in jobs]
+
+    def running_count(self):
+        with self._lock:
+            return self._running_count_locked()
+
+    def _running_count_locked(self):
+        return sum(1 for job in self._jobs.values() if not job.finished)
+
+    def _add_locked(self, job):
+        self._jobs[job.job_id] = job
+        self._evict_locked()
+
+    def _evict_locked(self):
+        """清理过期的已结束任务（调用方需持有锁），运行中的任务不会被淘汰"""
+        deadline = time.time() - self.ttl_seconds
+        for job_id in [jid for jid, job in self._jobs.items() if job.finished and job.finished_at < deadline]:
+            del self._jobs[job_id]
+        finished = [jid for jid, job in self._jobs.items() if job.finished]
+        while len(self._jobs) > self.max_jobs and finished:
+            del self._jobs[finished.pop(0)]
+
+    def __len__(self):
+        with self._lock:
+            return len(self._jobs)
@@ -0,0 +1,92 @@
+import sqlite3
+
+# trigram分词器（SQLite 3.34+）按子串匹配，适合没有空格分词的中文；旧版本退回unicode61
+FTS_TOKENIZER = 'trigram' if sqlite3.sqlite_version_info >= (3, 34, 0) else 'unicode61'
+
+def _json_text(column):
+    """把JSON列中所有字符串值拼接成一段可检索的文本（json.dumps会把中文转义为\\uXXXX，不能直接索引）"""
+    return (f"CASE WHEN json_valid({column}) "
+            f"THEN (SELECT group_concat(value, ' ') FROM json_tree({column}) WHERE type = 'text') "
+            f"ELSE {column} END")
+
+# 基于PRAGMA user_version的增量表结构迁移
+# 每个迁移为 (版本号, 说明, SQL语句列表)，版本号必须递增；已发布的迁移不要修改，新的变更追加新版本
+MIGRATIONS = [
+    (1, 'Add lookup indexes for duplicate checks and facilitation history', [
+        'CREATE INDEX IF NOT EXISTS idx_resumes_name ON resumes (name)',
+        'CREATE INDEX IF NOT EXISTS idx_job_descriptions_title_company ON job_descriptions (title, company)',
+        'CREATE INDEX IF NOT EXISTS idx_facilitation_results_resume_jd_created ON facilitation_results (resume_id, jd_id, created_at)',
+    ]),
+    (2, 'Add FTS5 full-text indexes over resumes and job descriptions', [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS resumes_fts USING fts5(skills, summary, experience, tokenize='{FTS_TOKENIZER}')",
+        f"""CREATE TRIGGER IF NOT EXISTS resumes_fts_ai AFTER INSERT ON resumes BEGIN
+            INSERT INTO resumes_fts (rowid, skills, summary, experience)
+            VALUES (new.id, new.skills, new.summary, {_json_text('new.experience_json')});
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS resumes_fts_ad AFTER DELETE ON resumes BEGIN
+            DELETE FROM resumes_fts WHERE rowid = old.id;
+        END""",
+        f"""CREATE TRIGGER IF NOT EXISTS resumes_fts_au AFTER UPDATE OF skills, summary, experience_json ON resumes BEGIN
+            DELETE FROM resumes_fts WHERE rowid = old.id;
+            INSERT INTO resumes_fts (rowid, skills, summary, experience)
+            VALUES (new.id, new.skills, new.summary, {_json_text('new.experience_json')});
+        END""",
+        f"""INSERT INTO resumes_fts (rowid, skills, summary, experience)
+            SELECT id, skills, summary, {_json_text('experience_json')} FROM resumes""",
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS jds_fts USING fts5(title, requirements, description, tokenize='{FTS_TOKENIZER}')",
+        """CREATE TRIGGER IF NOT EXISTS jds_fts_ai AFTER INSERT ON job_descriptions BEGIN
+            INSERT INTO jds_fts (rowid, title, requirements, description)
+            VALUES (new.id, new.title, new.requirements, new.description);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS jds_fts_ad AFTER DELETE ON job_descriptions BEGIN
+            DELETE FROM jds_fts WHERE rowid = old.id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS jds_fts_au AFTER UPDATE OF title, requirements, description ON job_descriptions BEGIN
+            DELETE FROM jds_fts WHERE rowid = old.id;
+            INSERT INTO jds_fts (rowid, title, requirements, description)
+            VALUES (new.id, new.title, new.requirements, new.description);
+        END""",
+        """INSERT INTO jds_fts (rowid, title, requirements, description)
+            SELECT id, title, requirements, description FROM job_descriptions""",
+    ]),
+    (3, 'Add (created_at, id) indexes for keyset pagination', [
+        'CREATE INDEX IF NOT EXISTS idx_resumes_created_id ON resumes (created_at, id)',
+        'CREATE INDEX IF NOT EXISTS idx_job_descriptions_created_id ON job_descriptions (created_at, id)',
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+def get_schema_version(conn):
+    """读取数据库当前的表结构版本"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def apply_migrations(conn, migrations=None):
+    """
+    依次执行尚未应用的迁移，每个迁移在独立事务中执行并同时更新user_version，
+    失败时该迁移整体回滚，已成功的迁移保留
+
+    Returns:
+        list: 本次应用的 (版本号, 说明)
+    """
+    migrations = MIGRATIONS if migrations is None else migrations
+    current_version = get_schema_version(conn)
+    applied = []
+    for version, description, statements in migrations:
+        if version <= current_version:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute('BEGIN')
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            # user_version写在数据库文件头中，随事务一起提交或回滚
+            conn.execute(f'PRAGMA user_version = {int(version)}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append((version, description))
+        current_version = version
+    return applied
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from helpers import get_db_connection, get_prompt_version, log_processing_step
+
+# 企业画像只依赖JD内容，这些字段与generate_company_profile的输入一致
+JD_PROFILE_FIELDS = ('title', 'company', 'location', 'salary', 'requirements', 'description', 'benefits')
+
+# 生成画像所用的提示词模板；模板的版本哈希计入缓存键，修改提示词后旧画像自动失效
+COMPANY_PROFILE_PROMPT = 'generate_company_profile.txt'
+CANDIDATE_PROFILE_PROMPT = 'generate_candidate_profile.txt'
+
+class CacheStats:
+    """线程安全的缓存命中统计"""
+    def __init__(self, *counter_names):
+        self._lock = threading.Lock()
+        self._counters = {name: 0 for name in counter_names}
+
+    def incr(self, name):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self._counters)
+        lookups = counters.get('hits', 0) + counters.get('misses', 0)
+        counters['hit_rate'] = round(counters.get('hits', 0) / lookups, 4) if lookups else 0.0
+        return counters
+
+class LRUCache:
+    """线程安全的进程内LRU缓存"""
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+company_profile_stats = CacheStats('hits', 'misses', 'stale', 'stores', 'invalidations', 'forced')
+# 候选人画像：进程内LRU在前，SQLite持久化存储在后
+candidate_profile_stats = CacheStats('hits', 'memory_hits', 'db_hits', 'misses', 'stores', 'forced')
+candidate_profile_lru = LRUCache(maxsize=int(os.environ.get('CANDIDATE_PROFILE_LRU_SIZE', 256)))
+# 画像生成锁：固定数量的分段锁，按JD ID取模选用，锁的数量不随JD数量增长（不同JD偶尔共用一把锁）
+COMPANY_PROFILE_LOCK_STRIPES = int(os.environ.get('COMPANY_PROFILE_LOCK_STRIPES', 64))
+_company_profile_locks = [threading.Lock() for _ in range(COMPANY_PROFILE_LOCK_STRIPES)]
+
+def hash_document(document):
+    """对（脱敏后的）文档内容计算稳定的内容哈希"""
+    serialized = json.dumps(document, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+def compute_jd_hash(jd_info):
+    """根据JD的内容字段和企业画像提示词版本计算哈希，任一变化时哈希随之变化"""
+    document = {field: jd_info.get(field) for field in JD_PROFILE_FIELDS}
+    document['prompt_version'] = get_prompt_version(COMPANY_PROFILE_PROMPT)
+    return hash_document(document)
+
+def get_cached_company_profile(jd_info, generate_fn, force_regenerate=False):
+    """
+    读穿式获取企业招聘画像：命中缓存直接返回，否则调用generate_fn生成并写入缓存
+
+    Args:
+        jd_info (dict): 职位描述信息（需包含id）
+        generate_fn (callable): 缓存未命中时调用的画像生成函数，签名为 generate_fn(jd_info)
+        force_regenerate (bool): 为True时跳过缓存读取，重新生成并覆盖缓存
+
+    Returns:
+        dict: 企业招聘画像，生成失败时返回None
+    """
+    jd_id = jd_info.get('id')
+    if jd_id is None:
+        # 没有JD ID时无法缓存，直接生成
+        return generate_fn(jd_info)
+
+    jd_hash = compute_jd_hash(jd_info)
+    if force_regenerate:
+        company_profile_stats.incr('forced')
+        log_processing_step("COMPANY_PROFILE_CACHE", "FORCED", f"JD ID: {jd_id} regeneration requested")
+        profile = generate_fn(jd_info)
+        if profile:
+            store_company_profile(jd_id, jd_hash, profile)
+        return profile
+
+    row, profile = read_company_profile(jd_id, jd_hash)
+    if profile is not None:
+        company_profile_stats.incr('hits')
+        log_processing_step("COMPANY_PROFILE_CACHE", "HIT", f"JD ID: {jd_id}")
+        return profile
+
+    # 同一JD的并发请求（如批量撮合）只生成一次：拿到锁后再查一次缓存，其余请求等待并复用结果
+    with company_profile_lock(jd_id):
+        row, profile = read_company_profile(jd_id, jd_hash)
+        if profile is not None:
+            company_profile_stats.incr('hits')
+            log_processing_step("COMPANY_PROFILE_CACHE", "HIT", f"JD ID: {jd_id} generated by a concurrent request")
+            return profile
+
+        company_profile_stats.incr('misses')
+        if row:
+            # JD内容已变化，旧画像失效
+            company_profile_stats.incr('stale')
+            log_processing_step("COMPANY_PROFILE_CACHE", "STALE", f"JD ID: {jd_id} content changed, regenerating")
+        else:
+            log_processing_step("COMPANY_PROFILE_CACHE", "MISS", f"JD ID: {jd_id}")
+
+        profile = generate_fn(jd_info)
+        if profile:
+            store_company_profile(jd_id, jd_hash, profile)
+        return profile
+
+def read_company_profile(jd_id, jd_hash):
+    """
+    读取已缓存的企业画像
+
+    Returns:
+        tuple: (缓存行或None, 哈希一致且可解析时的画像或None)
+    """
+    conn = get_db_connection()
+    try:
+        row = conn.execute('SELECT jd_hash, profile_json FROM jd_profiles WHERE jd_id = ?', (jd_id,)).fetchone()
+    finally:
+        conn.close()
+
+    if row and row['jd_hash'] == jd_hash:
+        try:
+            return row, json.loads(row['profile_json'])
+        except json.JSONDecodeError:
+            pass  # 缓存内容损坏，按未命中处理
+    return row, None
+
+def company_profile_lock(jd_id):
+    """获取某个JD的画像生成锁（同一JD ID总是得到同一把锁）"""
+    return _company_profile_locks[hash(jd_id) % len(_company_profile_locks)]
+
+def store_company_profile(jd_id, jd_hash, profile):
+    """写入（或覆盖）某个JD的企业画像缓存"""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """
+            INSERT INTO jd_profiles (jd_id, jd_hash, profile_json, created_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(jd_id) DO UPDATE SET
+                jd_hash = excluded.jd_hash,
+                profile_json = excluded.profile_json,
+                created_at = excluded.created_at
+            """,
+            (jd_id, jd_hash, json.dumps(profile, ensure_ascii=False))
+        )
+        conn.commit()
+        company_profile_stats.incr('stores')
+    except Exception as e:
+        log_processing_step("COMPANY_PROFILE_CACHE", "ERROR", f"Failed to store profile for JD ID {jd_id}: {str(e)}")
+    finally:
+        conn.close()
+
+def invalidate_company_profile(conn, jd_id=None):
+    """
+    删除企业画像缓存。jd_id为None时清空全部缓存
+
+    使用调用方的数据库连接，以便与JD的删除在同一事务中提交
+    """
+    if jd_id is None:
+        cursor = conn.execute('DELETE FROM jd_profiles')
+    else:
+        cursor = conn.execute('DELETE FROM jd_profiles WHERE jd_id = ?', (jd_id,))
+    if cursor.rowcount:
+        company_profile_stats.incr('invalidations')
+    return cursor.rowcount
+
+def get_cached_candidate_profile(resume_info, jd_info, generate_fn, force_regenerate=False):
+    """
+    按(脱敏简历, 脱敏JD + 画像提示词版本)内容哈希缓存候选人求职画像
+    先查进程内LRU，再查SQLite持久化存储，都未命中时调用generate_fn生成
+
+    Args:
+        resume_info (dict): 候选人简历信息（需包含desensitized_data）
+        jd_info (dict): 职位描述信息（需包含desensitized_data）
+        generate_fn (callable): 签名为 generate_fn(resume_info, jd_info)
+        force_regenerate (bool): 为True时跳过缓存读取，重新生成并覆盖缓存
+
+    Returns:
+        dict: 候选人求职画像，生成失败时返回None
+    """
+    desensitized_resume = resume_info.get('desensitized_data')
+    desensitized_jd = jd_info.get('desensitized_data')
+    if not desensitized_resume or not desensitized_jd:
+        # 画像只基于脱敏数据生成，缺失时交给generate_fn处理（会记录错误）
+        return generate_fn(resume_info, jd_info)
+
+    key = (
+        hash_document(desensitized_resume),
+        hash_document({'jd': desensitized_jd, 'prompt_version': get_prompt_version(CANDIDATE_PROFILE_PROMPT)})
+    )
+
+    if force_regenerate:
+        candidate_profile_stats.incr('forced')
+        log_processing_step("CANDIDATE_PROFILE_CACHE", "FORCED", f"Regeneration requested for Resume ID: {resume_info.get('id')}")
+    else:
+        profile = candidate_profile_lru.get(key)
+        if profile is not None:
+            candidate_profile_stats.incr('hits')
+            candidate_profile_stats.incr('memory_hits')
+            log_processing_step("CANDIDATE_PROFILE_CACHE", "HIT", f"Resume ID: {resume_info.get('id')} (memory)")
+            return profile
+
+        conn = get_db_connection()
+        try:
+            row = conn.execute(
+                'SELECT profile_json FROM candidate_profiles WHERE resume_hash = ? AND jd_hash = ?', key
+            ).fetchone()
+        finally:
+            conn.close()
+
+        if row:
+            try:
+                profile = json.loads(row['profile_json'])
+                candidate_profile_lru.put(key, profile)
+                candidate_profile_stats.incr('hits')
+                candidate_profile_stats.incr('db_hits')
+                log_processing_step("CANDIDATE_PROFILE_CACHE", "HIT", f"Resume ID: {resume_info.get('id')} (database)")
+                return profile
+            except json.JSONDecodeError:
+                pass  # 缓存内容损坏，按未命中处理
+
+        candidate_profile_stats.incr('misses')
+        log_processing_step("CANDIDATE_PROFILE_CACHE", "MISS", f"Resume ID: {resume_info.get('id')}")
+
+    profile = generate_fn(resume_info, jd_info)
+    if profile:
+        candidate_profile_lru.put(key, profile)
+        store_candidate_profile(key, profile)
+    return profile
+
+def store_candidate_profile(key, profile):
+    """写入（或覆盖）候选人画像的持久化缓存"""
+    resume_hash, jd_hash = key
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """
+            INSERT INTO candidate_profiles (resume_hash, jd_hash, profile_json, created_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(resume_hash, jd_hash) DO UPDATE SET
+                profile_json = excluded.profile_json,
+                created_at = excluded.created_at
+            """,
+            (resume_hash, jd_hash, json.dumps(profile, ensure_ascii=False))
+        )
+        conn.commit()
+        candidate_profile_stats.incr('stores')
+    except Exception as e:
+        log_processing_step("CANDIDATE_PROFILE_CACHE", "ERROR", f"Failed to store candidate profile: {str(e)}")
+    finally:
+        conn.close()
+
+def get_cache_stats():
+    """获取画像缓存统计信息"""
+    conn = get_db_connection()
+    try:
+        cached_company_profiles = conn.execute('SELECT COUNT(*) FROM jd_profiles').fetchone()[0]
+        cached_candidate_profiles = conn.execute('SELECT COUNT(*) FROM candidate_profiles').fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        'company_profile': {**company_profile_stats.snapshot(), 'entries': cached_company_profiles},
+        'candidate_profile': {
+            **candidate_profile_stats.snapshot(),
+            'entries': cached_candidate_profiles,
+            'memory_entries': len(candidate_profile_lru)
+        }
+    }
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import re
+import string
+import threading
+import time
+
+PROMPTS_DIR = os.environ.get('PROMPTS_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'prompts'))
+
+# 直接替换式模板中的占位符，例如 {CANDIDATE_PROFILE_PLACEHOLDER}
+_PLACEHOLDER_PATTERN = re.compile(r'\{([A-Za-z_][A-Za-z0-9_]*)\}')
+
+class PromptTemplate:
+    """
+    一个已加载的提示词模板
+
+    加载时把模板预编译为 [(字面文本, 占位符名或None)] 片段，渲染时只需拼接，不再重复解析：
+    - 所有 {...} 都是合法的str.format字段（可含 {{ }} 转义）时，按str.format的语义编译
+    - 否则（模板中含有JSON示例等花括号）只把 {标识符} 视为占位符，其余文本原样保留
+
+    Attributes:
+        name (str): 文件名
+        text (str): 原始文本
+        version (str): 文本内容的sha256前12位，内容变化时随之变化
+        placeholders (tuple): 模板中的占位符名
+    """
+    __slots__ = ('name', 'text', 'version', 'mtime_key', '_segments', 'placeholders')
+
+    def __init__(self, name, text, mtime_key=None):
+        self.name = name
+        self.text = text
+        self.version = hashlib.sha256(text.encode('utf-8')).hexdigest()[:12]
+        self.mtime_key = mtime_key
+        self._segments = self._compile(text)
+        self.placeholders = tuple(dict.fromkeys(field for _, field in self._segments if field))
+
+    @staticmethod
+    def _compile(text):
+        try:
+            parsed = list(string.Formatter().parse(text))
+            if all(field is None or (field.isidentifier() and not spec and not conversion)
+                   for _, field, spec, conversion in parsed):
+                return [(literal, field) for literal, field, _, _ in parsed]
+        except ValueError:
+            pass
+
+        segments = []
+        position = 0
+        for match in _PLACEHOLDER_PATTERN.finditer(text):
+            segments.append((text[position:match.start()], match.group(1)))
+            position = match.end()
+        segments.append((text[position:], None))
+        return segments
+
+    def render(self, /, **values):
+        """
+        用values替换占位符
+
+        Raises:
+            KeyError: 缺少模板中的占位符
+        """
+        parts = []
+        for literal, field in self._segments:
+            parts.append(literal)
+            if field is not None:
+                parts.append(str(values[field]))
+        return ''.join(parts)
+
+class PromptRegistry:
+    """
+    提示词模板注册表：模板只从磁盘读取一次并缓存在内存中
+    访问时最多每check_interval秒检查一次文件的修改时间和大小，发生变化才重新加载，
+    因此修改prompts/下的文件无需重启服务
+
+    Args:
+        directory (str): 模板目录
+        check_interval (float): 两次检查文件修改时间的最小间隔（秒），0表示每次访问都检查
+    """
+    def __init__(self, directory=PROMPTS_DIR, check_interval=1.0):
+        self.directory = directory
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._templates = {}  # {name: PromptTemplate}
+        self._checked_at = {}  # {name: 上次检查文件的时间}
+        self._stats = {'loads': 0, 'reloads': 0, 'hits': 0, 'missing': 0}
+
+    def _stat(self, name):
+        try:
+            st = os.stat(os.path.join(self.directory, name))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, name, mtime_key):
+        try:
+            with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                return PromptTemplate(name, f.read(), mtime_key)
+        except OSError:
+            return None
+
+    def get(self, name):
+        """获取模板，文件不存在时返回None"""
+        now = time.monotonic()
+        with self._lock:
+            template = self._templates.get(name)
+            if template is not None and now - self._checked_at.get(name, 0) < self.check_interval:
+                self._stats['hits'] += 1
+                return template
+
+        mtime_key = self._stat(name)
+        if template is not None and mtime_key == template.mtime_key:
+            with self._lock:
+                self._checked_at[name] = now
+                self._stats['hits'] += 1
+            return template
+
+        new_template = self._load(name, mtime_key) if mtime_key else None
+        with self._lock:
+            if new_template is None:
+                self._templates.pop(name, None)
+                self._checked_at.pop(name, None)
+                self._stats['missing'] += 1
+                return None
+            self._templates[name] = new_template
+            self._checked_at[name] = now
+            self._stats['reloads' if template is not None else 'loads'] += 1
+        return new_template
+
+    def render(self, name, /, **values):
+        """渲染模板，文件不存在时返回None"""
+        template = self.get(name)
+        return template.render(**values) if template else None
+
+    def version(self, name):
+        """模板的版本哈希，文件不存在时返回None"""
+        template = self.get(name)
+        return template.version if template else None
+
+    def load_all(self):
+        """预加载目录下所有.txt模板"""
+        try:
+            names = sorted(name for name in os.listdir(self.directory) if name.endswith('.txt'))
+        except OSError:
+            return []
+        return [name for name in names if self.get(name) is not None]
+
+    def versions(self):
+        """所有已加载模板的版本哈希"""
+        with self._lock:
+            return {name: template.version for name, template in sorted(self._templates.items())}
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['templates'] = len(self._templates)
+        return stats
+
+prompt_registry = PromptRegistry(check_interval=float(os.environ.get('PROMPT_RELOAD_INTERVAL', 1.0)))
+prompt_registry.load_all()
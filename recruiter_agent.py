@@ -1,7 +1,8 @@
 import json
 import os
 from openai import OpenAI
-from helpers import log_model_request, log_model_response, log_processing_step, get_prompt
+from helpers import log_model_request, log_model_response, log_processing_step, render_prompt
+from agent_prompts import build_static_prefix, estimate_messages_tokens, extract_usage, stream_chat_completion, summarize_usage
 import re
 from datetime import datetime
 
@@ -29,50 +30,56 @@ class RecruiterAgent:
         self.decision_made = False
         self.final_decision = "UNCERTAIN"
         self.chat_rounds = 0  # 记录对话轮数
+        self.static_prefix = None  # 系统提示 + 背景资料，首次调用时构建，之后每轮原样复用
+        self.static_prefix_tokens = 0  # 静态前缀的估算token数
+        self.usage_log = []  # 每次模型调用的token用量
+        self.last_usage = None
         
     def get_system_prompt(self):
         """获取招聘方agent的系统提示"""
-        prompt = get_prompt('recruiter_agent_system.txt')
-        if not prompt:
-            # 如果文件读取失败，使用默认提示
-            return """你是一位专业的招聘代理，代表企业的利益进行人才招聘撮合。请用JSON格式回复，包含type、reasoning、payload字段。"""
-        
-        # 替换企业画像占位符
+        # 替换画像占位符（模板由注册表缓存并预编译，这里只做拼接）
         if self.company_profile:
             profile_text = json.dumps(self.company_profile, ensure_ascii=False, indent=2)
-            prompt = prompt.replace('{COMPANY_PROFILE_PLACEHOLDER}', profile_text)
         else:
-            prompt = prompt.replace('{COMPANY_PROFILE_PLACEHOLDER}', '暂无画像信息')
-        
+            profile_text = '暂无画像信息'
+        prompt = render_prompt('recruiter_agent_system.txt', COMPANY_PROFILE_PLACEHOLDER=profile_text)
+        if not prompt:
+            # 如果文件读取失败，使用默认提示
+            return """你是一位专业的招聘代理，代表企业的利益进行人才招聘撮合。请用JSON格式回复，包含type、reasoning、payload字段。"""
+
         return prompt
 
-    def respond(self, history=None):
+    def get_static_prefix(self):
         """
-        核心方法，根据用户消息和历史记录生成回应
+        获取每次请求开头的静态消息（系统提示含画像，背景资料含简历和JD）
+        只构建一次，保证每轮请求的前缀逐字节相同，可以命中上游的前缀缓存
         """
-        system_prompt = get_prompt('recruiter_agent_system.txt')
-        messages = [{"role": "system", "content": system_prompt}]
-
-        # 如果没有历史记录，构建初始上下文
-        if not history:
-            initial_user_prompt = f"""以下是相关信息：
+        if self.static_prefix is None:
+            self.static_prefix = build_static_prefix(self.get_system_prompt(), [
+                ("职位信息", self.jd_info),
+                ("候选人简历信息（脱敏版）", self.resume_info)
+            ])
+            self.static_prefix_tokens = estimate_messages_tokens(self.static_prefix)
+        return self.static_prefix
 
-职位信息：
-{json.dumps(self.jd_info, ensure_ascii=False, indent=2)}
-
-候选人简历信息（脱敏版）：
-{json.dumps(self.resume_info, ensure_ascii=False, indent=2)}
+    def respond(self, history=None, on_delta=None):
+        """
+        核心方法，根据用户消息和历史记录生成回应
+        每轮请求 = 固定的静态前缀 + 对话历史（没有历史时为启动指令）
 
-企业招聘画像：
-{json.dumps(self.company_profile, ensure_ascii=False, indent=2)}
-"""
-            messages.append({"role": "user", "content": initial_user_prompt})
-            
+        Args:
+            history (list): 对话历史
+            on_delta (callable, optional): 提供时以流式方式调用模型，每收到一段payload文本调用
+                on_delta(字段名, 文本, type或None, 第几次尝试)；返回值仍是完整解析后的回复
+        """
+        self.last_usage = None
+        static_prefix = self.get_static_prefix()
+        messages = list(static_prefix)
+        if history:
+            messages.extend(history)
+        else:
             # 初始启动指令
             messages.append({"role": "user", "content": "请开始评估这个候选人，并与候选人代理进行沟通。请先planning，然后发送chatting消息。"})
-        else:
-            # 如果有历史记录，直接使用
-            messages.extend(history)
         
         # 增加重试机制
         max_retries = 3
@@ -83,16 +90,33 @@ class RecruiterAgent:
                 model_name = "bedrock-claude-4-sonnet"
                 task_type = "RECRUITER_AGENT_CHAT"
                 
-                print(f"[{timestamp}] 🤖 MODEL REQUEST | {model_name} | {task_type} | Input: {json.dumps(messages, ensure_ascii=False, indent=2)}")
+                print(f"[{timestamp}] 🤖 MODEL REQUEST | {model_name} | {task_type} | Static prefix: {len(static_prefix)} messages | Input: {json.dumps(messages[len(static_prefix):], ensure_ascii=False, indent=2)}")
                 
-                response = openai_client.chat.completions.create(
-                    model=model_name,
-                    messages=messages,
-                    temperature=1,
-                    max_tokens=2000
-                )
+                if on_delta:
+                    response_content, usage_source = stream_chat_completion(
+                        openai_client,
+                        lambda field, text, msg_type: on_delta(field, text, msg_type, attempt + 1),
+                        model=model_name,
+                        messages=messages,
+                        temperature=1,
+                        max_tokens=2000
+                    )
+                else:
+                    response = openai_client.chat.completions.create(
+                        model=model_name,
+                        messages=messages,
+                        temperature=1,
+                        max_tokens=2000
+                    )
+                    usage_source = response
+                    response_content = response.choices[0].message.content
                 
-                response_content = response.choices[0].message.content
+                usage = extract_usage(usage_source)
+                self.last_usage = usage
+                self.usage_log.append(usage)
+                log_processing_step("RECRUITER_AGENT", "USAGE",
+                                   f"Input: {usage['input_tokens']} tokens (cached: {usage['cached_input_tokens']}, "
+                                   f"uncached: {usage['uncached_input_tokens']}), Output: {usage['output_tokens']} tokens")
 
                 # 增加对空响应的检查和重试逻辑
                 if not response_content:
@@ -190,6 +214,10 @@ class RecruiterAgent:
                         "error": True
                     }
     
+    def get_usage_summary(self):
+        """汇总本agent所有模型调用的token用量"""
+        return summarize_usage(self.usage_log)
+
     def get_conversation_history(self):
         """获取完整对话历史（包括planning）"""
         return self.conversation_history
@@ -0,0 +1,87 @@
+import json
+from collections.abc import Mapping
+
+class LazyJsonRow(Mapping):
+    """
+    数据库行（sqlite3.Row）的只读包装，可以像dict一样使用
+    普通列直接读取；JSON列在第一次访问时才解码，并缓存解码结果
+
+    子类通过JSON_FIELDS声明 {字段名: (列名, 空值时的默认值)}，默认值为list时每次返回新的空列表；
+    ALIASES声明字段的别名。JSON列按字段名访问，遍历时也只出现字段名而不出现原始的*_json列名
+    解码失败时返回列中的原始文本
+    """
+    __slots__ = ('_row', '_decoded')
+    JSON_FIELDS = {}
+    ALIASES = {}
+    _COLUMN_TO_FIELD = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._COLUMN_TO_FIELD = {column: field for field, (column, _) in cls.JSON_FIELDS.items()}
+
+    def __init__(self, row):
+        self._row = row
+        self._decoded = None  # 第一次解码JSON列时才创建缓存
+
+    def __getitem__(self, key):
+        key = self.ALIASES.get(key, key)
+        spec = self.JSON_FIELDS.get(key)
+        if spec is None:
+            try:
+                return self._row[key]
+            except IndexError:
+                raise KeyError(key) from None
+
+        if self._decoded is None:
+            self._decoded = {}
+        elif key in self._decoded:
+            return self._decoded[key]
+
+        column, default = spec
+        try:
+            raw = self._row[column]
+        except IndexError:
+            raise KeyError(key) from None
+        if not raw:
+            value = list(default) if isinstance(default, list) else default
+        else:
+            try:
+                value = json.loads(raw)
+            except (json.JSONDecodeError, TypeError):
+                value = raw
+        self._decoded[key] = value
+        return value
+
+    def __iter__(self):
+        for column in self._row.keys():
+            yield self._COLUMN_TO_FIELD.get(column, column)
+
+    def __len__(self):
+        return len(self._row.keys())
+
+    def __repr__(self):
+        return f"{type(self).__name__}(id={self.get('id')})"
+
+    def to_dict(self, fields=None, exclude=()):
+        """转换为普通dict（会解码涉及的JSON列），fields为None时包含所有字段"""
+        return {field: self[field] for field in (fields or self) if field not in exclude}
+
+class ResumeRow(LazyJsonRow):
+    """resumes表的一行"""
+    __slots__ = ()
+    JSON_FIELDS = {
+        'experience': ('experience_json', []),
+        'education': ('education_json', []),
+        'publications': ('publications_json', []),
+        'projects': ('projects_json', []),
+        'desensitized_data': ('desensitized_json', None)
+    }
+    ALIASES = {'desensitized': 'desensitized_data'}
+
+class JdRow(LazyJsonRow):
+    """job_descriptions表的一行"""
+    __slots__ = ()
+    JSON_FIELDS = {
+        'desensitized_data': ('desensitized_json', None)
+    }
+    ALIASES = {'desensitized': 'desensitized_data'}
@@ -1,8 +1,6 @@
-DROP TABLE IF EXISTS resumes;
-DROP TABLE IF EXISTS job_descriptions;
-DROP TABLE IF EXISTS facilitation_results;
+-- 基础表结构（版本0），可重复执行；之后的表结构变更写在migrations.py中
 
-CREATE TABLE resumes (
+CREATE TABLE IF NOT EXISTS resumes (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     name TEXT NOT NULL,
     email TEXT,
@@ -19,7 +17,7 @@ CREATE TABLE resumes (
     UNIQUE(phone)
 );
 
-CREATE TABLE job_descriptions (
+CREATE TABLE IF NOT EXISTS job_descriptions (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     title TEXT NOT NULL,
     company TEXT,
@@ -32,7 +30,7 @@ CREATE TABLE job_descriptions (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
 
-CREATE TABLE facilitation_results (
+CREATE TABLE IF NOT EXISTS facilitation_results (
     id INTEGER PRIMARY KEY AUTOINCREMENT,
     resume_id INTEGER NOT NULL,
     jd_id INTEGER NOT NULL,
@@ -44,4 +42,20 @@ CREATE TABLE facilitation_results (
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     FOREIGN KEY (resume_id) REFERENCES resumes (id),
     FOREIGN KEY (jd_id) REFERENCES job_descriptions (id)
+);
+
+CREATE TABLE IF NOT EXISTS jd_profiles (
+    jd_id INTEGER PRIMARY KEY,
+    jd_hash TEXT NOT NULL,
+    profile_json TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (jd_id) REFERENCES job_descriptions (id)
+);
+
+CREATE TABLE IF NOT EXISTS candidate_profiles (
+    resume_hash TEXT NOT NULL,
+    jd_hash TEXT NOT NULL,
+    profile_json TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (resume_hash, jd_hash)
 ); 
\ No newline at end of file
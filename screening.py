@@ -0,0 +1,602 @@
+import json
+import os
+import re
+import threading
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from helpers import SNIPPET_CONTEXT_CHARS, get_db_connection, log_processing_step, make_snippet
+
+# 特征哈希的维度（2的幂）；维度越大冲突越少，只影响稀疏索引中的特征编号，不影响内存占用
+N_FEATURES = 2 ** int(os.environ.get('SCREENING_HASH_BITS', 18))
+# 综合分 = 文本相似度 × TEXT_WEIGHT + 技能覆盖率 × SKILL_WEIGHT（JD没有可识别的技能词时只用文本相似度）
+TEXT_WEIGHT = float(os.environ.get('SCREENING_TEXT_WEIGHT', 0.6))
+SKILL_WEIGHT = float(os.environ.get('SCREENING_SKILL_WEIGHT', 0.4))
+# 每个打分块中稠密矩阵的最大元素数，决定一次向量化处理多少份简历
+BLOCK_CELLS = int(os.environ.get('SCREENING_BLOCK_CELLS', 4_000_000))
+# 同步索引时每条IN查询包含的ID数
+SYNC_CHUNK_SIZE = 500
+# 检索简历时每块处理的简历数
+SEARCH_BLOCK_ROWS = 10000
+# 检索工具最多返回的简历数
+SEARCH_MAX_K = 50
+# 检索工具可用的过滤条件
+SEARCH_FILTERS = ('resume_ids', 'exclude_ids', 'skills', 'min_score')
+
+# 英文/数字词（保留c++、c#、node.js这类写法）和连续的中文片段
+_TOKEN_PATTERN = re.compile(r'[a-z0-9][a-z0-9+#.]*|[一-鿿]+')
+
+def tokenize(text):
+    """
+    把中英文混排文本切分为词：英文按单词，中文按相邻两字（bigram），单个汉字保留原样
+    """
+    tokens = []
+    for match in _TOKEN_PATTERN.findall((text or '').lower()):
+        if match[0] >= '一':
+            if len(match) == 1:
+                tokens.append(match)
+            else:
+                tokens.extend(match[i:i + 2] for i in range(len(match) - 1))
+        else:
+            tokens.append(match.rstrip('.'))
+    return tokens
+
+@lru_cache(maxsize=1 << 18)
+def feature_index(token):
+    """词的哈希特征编号（crc32，跨进程稳定）"""
+    return zlib.crc32(token.encode('utf-8')) & (N_FEATURES - 1)
+
+def hash_counts(tokens):
+    """
+    把词序列映射为稀疏计数向量
+
+    Returns:
+        tuple: (特征编号数组int32，升序且不重复, 对应的计数数组float32)
+    """
+    if not tokens:
+        return np.empty(0, np.int32), np.empty(0, np.float32)
+    features = np.fromiter((feature_index(token) for token in tokens), dtype=np.int32, count=len(tokens))
+    indices, counts = np.unique(features, return_counts=True)
+    return indices, counts.astype(np.float32)
+
+def flatten_json_text(value):
+    """取出JSON文本（或已解析对象）中的全部字符串，用空格连接"""
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    parts = []
+
+    def walk(item):
+        if isinstance(item, str):
+            parts.append(item)
+        elif isinstance(item, dict):
+            for child in item.values():
+                walk(child)
+        elif isinstance(item, list):
+            for child in item:
+                walk(child)
+
+    walk(value)
+    return ' '.join(parts)
+
+def resume_features(row):
+    """简历的 (打分文本, 技能文本)：skills + summary + 工作经历；技能取skills列"""
+    text = ' '.join([row['skills'] or '', row['summary'] or '', flatten_json_text(row['experience_json'] or '')])
+    return text, row['skills'] or ''
+
+def jd_features(row):
+    """JD的 (打分文本, 技能文本)：职位名称 + 任职要求 + 职位描述；技能词从任职要求和职位描述中识别"""
+    text = ' '.join([row['title'] or '', row['requirements'] or '', row['description'] or ''])
+    return text, ' '.join([row['requirements'] or '', row['description'] or ''])
+
+def _grow(array, size):
+    """返回容量不小于size的数组（按倍数扩容，保留原有内容）"""
+    if size <= len(array):
+        return array
+    grown = np.zeros(max(size, 2 * len(array), 16), dtype=array.dtype)
+    grown[:len(array)] = array
+    return grown
+
+class SparseRows:
+    """
+    只追加的CSR稀疏矩阵：每行是一份文档的 (特征编号, 值)
+    底层数组按倍数扩容，追加一行的均摊成本与该行的非零元素数成正比
+    """
+    def __init__(self):
+        self.indptr = np.zeros(16, np.int64)
+        self.indices = np.zeros(0, np.int32)
+        self.data = np.zeros(0, np.float32)
+        self.n_rows = 0
+
+    @property
+    def nnz(self):
+        return int(self.indptr[self.n_rows])
+
+    def append(self, indices, data):
+        start = self.nnz
+        end = start + len(indices)
+        self.indices = _grow(self.indices, end)
+        self.data = _grow(self.data, end)
+        self.indices[start:end] = indices
+        self.data[start:end] = data
+        self.indptr = _grow(self.indptr, self.n_rows + 2)
+        self.indptr[self.n_rows + 1] = end
+        self.n_rows += 1
+
+    def row(self, position):
+        start, end = self.indptr[position], self.indptr[position + 1]
+        return self.indices[start:end], self.data[start:end]
+
+    def gather(self, rows):
+        """
+        取出若干行的全部非零元素
+
+        Args:
+            rows (np.ndarray): 行号
+
+        Returns:
+            tuple: (每个元素属于rows中的第几行, 特征编号, 值)
+        """
+        starts = self.indptr[rows]
+        lengths = self.indptr[rows + 1] - starts
+        total = int(lengths.sum())
+        owner = np.repeat(np.arange(len(rows)), lengths)
+        offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+        return owner, self.indices[offsets], self.data[offsets]
+
+class DocumentIndex:
+    """
+    一类文档（简历或JD）的哈希特征索引：打分文本的次线性词频（1 + log tf）和技能词的0/1向量
+
+    与数据库的同步是增量的：新增的记录只计算自己的向量，删除的记录只做标记，
+    因此任何时候都不需要重新处理整张表。文档频率随增删同步更新，用于计算IDF
+
+    Args:
+        table (str): 表名
+        columns (tuple): 计算特征所需的列
+        extract_fn (callable): extract_fn(row) -> (打分文本, 技能文本)
+    """
+    def __init__(self, table, columns, extract_fn):
+        self.table = table
+        self.columns = columns
+        self.extract_fn = extract_fn
+        self._lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        """清空索引（表被清空、ID可能被复用时调用），下次同步时重新加载"""
+        with self._lock:
+            self.ids = np.zeros(16, np.int64)
+            self.alive = np.zeros(16, bool)
+            self.positions = {}  # 记录ID -> 行号
+            self.text = SparseRows()
+            self.skills = SparseRows()
+            self.text_df = np.zeros(N_FEATURES, np.int32)
+            self.skill_df = np.zeros(N_FEATURES, np.int32)
+            self.n_docs = 0
+            self.n_alive = 0
+            self.version = 0
+            self._signature = None
+            self._idf = None
+
+    def add_row(self, row):
+        """加入（或替换）一条记录，返回其行号"""
+        text, skills_text = self.extract_fn(row)
+        text_indices, counts = hash_counts(tokenize(text))
+        skill_indices, _ = hash_counts(tokenize(skills_text))
+        with self._lock:
+            self.remove(row['id'])
+            position = self.n_docs
+            self.ids = _grow(self.ids, position + 1)
+            self.alive = _grow(self.alive, position + 1)
+            self.ids[position] = row['id']
+            self.alive[position] = True
+            self.text.append(text_indices, 1 + np.log(counts))
+            self.skills.append(skill_indices, np.ones(len(skill_indices), np.float32))
+            self.text_df[text_indices] += 1
+            self.skill_df[skill_indices] += 1
+            self.positions[row['id']] = position
+            self.n_docs += 1
+            self.n_alive += 1
+            self.version += 1
+            self._idf = None
+            return position
+
+    def remove(self, record_id):
+        """移除一条记录（只做标记并扣减文档频率），不存在时返回False"""
+        with self._lock:
+            position = self.positions.pop(record_id, None)
+            if position is None:
+                return False
+            self.alive[position] = False
+            self.text_df[self.text.row(position)[0]] -= 1
+            self.skill_df[self.skills.row(position)[0]] -= 1
+            self.n_alive -= 1
+            self.version += 1
+            self._idf = None
+            return True
+
+    def sync(self, conn):
+        """
+        与数据库增量同步：行数和最大ID都没变时直接返回；否则只加载新增记录、标记已删除记录
+
+        Returns:
+            tuple: (新增数, 删除数)
+        """
+        with self._lock:
+            signature = tuple(conn.execute(f'SELECT COUNT(*), MAX(id) FROM {self.table}').fetchone())
+            if signature == self._signature:
+                return 0, 0
+            current = self.alive_ids()
+            last_id = self._signature[1] if self._signature and self._signature[1] is not None else 0
+            appended = [row[0] for row in conn.execute(f'SELECT id FROM {self.table} WHERE id > ?', (last_id,))]
+            if self._signature is not None and signature[0] == len(current) + len(appended):
+                # 只有追加（最常见的情况）：不需要扫描整张表的ID
+                removed, added = np.empty(0, np.int64), np.array(appended, np.int64)
+            else:
+                db_ids = np.array([row[0] for row in conn.execute(f'SELECT id FROM {self.table}')], np.int64)
+                removed = np.setdiff1d(current, db_ids, assume_unique=True)
+                added = np.setdiff1d(db_ids, current, assume_unique=True)
+            for record_id in removed.tolist():
+                self.remove(record_id)
+            columns = ', '.join(('id',) + self.columns)
+            for start in range(0, len(added), SYNC_CHUNK_SIZE):
+                chunk = added[start:start + SYNC_CHUNK_SIZE].tolist()
+                rows = conn.execute(f"SELECT {columns} FROM {self.table} WHERE id IN ({','.join('?' * len(chunk))})", chunk)
+                for row in rows:
+                    self.add_row(row)
+            self._signature = signature
+            if len(added) or len(removed):
+                log_processing_step("SCREENING_INDEX", "SYNC", f"{self.table}: +{len(added)} -{len(removed)}, {self.n_alive} indexed")
+            return len(added), len(removed)
+
+    def alive_positions(self):
+        return np.flatnonzero(self.alive[:self.n_docs])
+
+    def alive_ids(self):
+        return self.ids[:self.n_docs][self.alive[:self.n_docs]]
+
+    def positions_of(self, record_ids):
+        """把记录ID转换为行号，不在索引中的ID被忽略"""
+        return np.array([self.positions[i] for i in record_ids if i in self.positions], dtype=np.int64)
+
+    def lookup_positions(self, record_ids):
+        """向量化地把ID数组转换为行号数组，不在索引中的ID对应-1"""
+        alive = self.alive_positions()
+        ids = self.ids[alive]
+        order = np.argsort(ids)
+        sorted_ids = ids[order]
+        slots = np.minimum(np.searchsorted(sorted_ids, record_ids), max(len(sorted_ids) - 1, 0))
+        if not len(sorted_ids):
+            return np.full(len(record_ids), -1, np.int64)
+        return np.where(sorted_ids[slots] == record_ids, alive[order][slots], -1)
+
+    def idf(self):
+        """平滑IDF：log((1 + N) / (1 + df)) + 1，索引变化后重新计算"""
+        with self._lock:
+            if self._idf is None:
+                self._idf = (np.log((1 + self.n_alive) / (1 + self.text_df)) + 1).astype(np.float32)
+            return self._idf
+
+def tfidf_rows(index, positions, idf):
+    """
+    取出若干文档的L2归一化TF-IDF稀疏元素
+
+    Returns:
+        tuple: (所属文档序号, 特征编号, 权重)
+    """
+    owner, indices, tf = index.text.gather(positions)
+    weights = tf * idf[indices]
+    norms = np.sqrt(np.bincount(owner, weights=weights * weights, minlength=len(positions)))
+    norms[norms == 0] = 1.0
+    return owner, indices, (weights / norms[owner]).astype(np.float32)
+
+class JdScoringMatrix:
+    """
+    一组JD的打分矩阵，只覆盖这些JD用到的特征（压缩词表），与简历块相乘即得到文本相似度和技能覆盖率
+
+    Args:
+        jd_index (DocumentIndex): JD索引
+        jd_positions (np.ndarray): 参与打分的JD行号
+        idf (np.ndarray): 简历集合上的IDF
+        skill_vocabulary (np.ndarray): bool数组，标记出现在任何简历技能中的特征
+    """
+    def __init__(self, jd_index, jd_positions, idf, skill_vocabulary):
+        n_jds = len(jd_positions)
+        owner, indices, weights = tfidf_rows(jd_index, jd_positions, idf)
+        self.text_features = np.unique(indices)
+        self.text_lookup = self._lookup(self.text_features)
+        self.text = np.zeros((len(self.text_features), n_jds), np.float32)
+        self.text[self.text_lookup[indices], owner] = weights
+
+        # JD的技能词：技能文本中同时出现在简历技能里的词
+        owner, indices, _ = jd_index.skills.gather(jd_positions)
+        keep = skill_vocabulary[indices]
+        owner, indices = owner[keep], indices[keep]
+        self.skill_features = np.unique(indices)
+        self.skill_lookup = self._lookup(self.skill_features)
+        self.skills = np.zeros((len(self.skill_features), n_jds), np.float32)
+        self.skills[self.skill_lookup[indices], owner] = 1.0
+        self.skill_counts = np.bincount(owner, minlength=n_jds).astype(np.float32)
+
+    @staticmethod
+    def _lookup(features):
+        """特征编号 -> 压缩词表中的列号（不在词表中为-1）"""
+        lookup = np.full(N_FEATURES, -1, np.int32)
+        lookup[features] = np.arange(len(features), dtype=np.int32)
+        return lookup
+
+    def _project(self, lookup, width, owner, indices, values, n_rows):
+        """把稀疏行投影到压缩词表上的稠密矩阵（不在词表中的特征与这些JD无关，直接丢弃）"""
+        dense = np.zeros((n_rows, width), np.float32)
+        slots = lookup[indices]
+        hit = slots >= 0
+        dense[owner[hit], slots[hit]] = values[hit]
+        return dense
+
+    def score(self, resume_index, resume_positions, idf):
+        """
+        为一块简历与全部JD打分
+
+        Returns:
+            tuple: (综合分, 文本相似度, 技能覆盖率)，形状均为 (简历数, JD数)
+        """
+        n_rows = len(resume_positions)
+        owner, indices, weights = tfidf_rows(resume_index, resume_positions, idf)
+        text = self._project(self.text_lookup, len(self.text_features), owner, indices, weights, n_rows) @ self.text
+
+        owner, indices, ones = resume_index.skills.gather(resume_positions)
+        overlap = self._project(self.skill_lookup, len(self.skill_features), owner, indices, ones, n_rows) @ self.skills
+        has_skills = self.skill_counts > 0
+        skill = np.divide(overlap, self.skill_counts, out=np.zeros_like(overlap), where=has_skills)
+        combined = np.where(has_skills, TEXT_WEIGHT * text + SKILL_WEIGHT * skill, text)
+        return combined, text, skill
+
+    def block_rows(self, block_cells):
+        """每块包含的简历数，使块内稠密矩阵不超过block_cells个元素"""
+        width = max(len(self.text_features), len(self.skill_features), self.text.shape[1], 1)
+        return max(1, block_cells // width)
+
+def _top_k(scores, k, axis=None):
+    """返回最大的k个元素的下标（未排序），axis=None时按展平后的下标"""
+    if axis is None:
+        flat = scores.ravel()
+        if flat.size <= k:
+            return np.arange(flat.size)
+        return np.argpartition(-flat, k - 1)[:k]
+    if scores.shape[axis] <= k:
+        return np.broadcast_to(np.arange(scores.shape[axis])[:, None], scores.shape)
+    return np.argpartition(-scores, k - 1, axis=axis)[:k]
+
+# 全局索引：进程内常驻，每次使用前与数据库增量同步
+resume_index = DocumentIndex('resumes', ('skills', 'summary', 'experience_json'), resume_features)
+jd_index = DocumentIndex('job_descriptions', ('title', 'requirements', 'description'), jd_features)
+
+def sync_indexes():
+    conn = get_db_connection()
+    try:
+        resume_index.sync(conn)
+        jd_index.sync(conn)
+    finally:
+        conn.close()
+
+def reset_screening_index(table=None):
+    """表被清空后调用，丢弃对应的索引"""
+    for index in (resume_index, jd_index):
+        if table is None or index.table == table:
+            index.reset()
+
+def shortlist(jd_ids=None, resume_ids=None, k=20, per_jd=False, min_score=0.0, block_cells=BLOCK_CELLS):
+    """
+    用本地向量化打分为简历×JD预筛，返回得分最高的k对，只对入围的组合进行代价高昂的agent撮合
+
+    简历按块与全部JD一次性打分（块内是一次稠密矩阵乘法），每块只保留候选的top-k，
+    合并后再取最终的top-k，内存占用与简历总数无关
+
+    Args:
+        jd_ids (list): 参与的JD，None表示全部
+        resume_ids (list): 参与的简历，None表示全部
+        k (int): 返回的组合数；per_jd为True时为每个JD返回的简历数
+        per_jd (bool): 按JD分别取top-k
+        min_score (float): 低于该分数的组合不返回
+
+    Returns:
+        list: [{'resume_id', 'jd_id', 'score', 'text_score', 'skill_score'}]，按score降序
+    """
+    sync_indexes()
+    resume_positions = resume_index.alive_positions() if resume_ids is None else resume_index.positions_of(resume_ids)
+    jd_positions = jd_index.alive_positions() if jd_ids is None else jd_index.positions_of(jd_ids)
+    if k <= 0 or not len(resume_positions) or not len(jd_positions):
+        return []
+
+    idf = resume_index.idf()
+    skill_vocabulary = resume_index.skill_df > 0
+    matrix = JdScoringMatrix(jd_index, jd_positions, idf, skill_vocabulary)
+    block_rows = matrix.block_rows(block_cells)
+
+    # 候选：(resume行号, JD列, 综合分, 文本分, 技能分)
+    candidates = [[] for _ in range(5)]
+    for start in range(0, len(resume_positions), block_rows):
+        block = resume_positions[start:start + block_rows]
+        combined, text, skill = matrix.score(resume_index, block, idf)
+        if per_jd:
+            rows = _top_k(combined, k, axis=0)
+            cols = np.broadcast_to(np.arange(combined.shape[1]), rows.shape)
+            rows, cols = rows.ravel(), cols.ravel()
+        else:
+            rows, cols = np.unravel_index(_top_k(combined, k), combined.shape)
+        for bucket, values in zip(candidates, (block[rows], cols, combined[rows, cols], text[rows, cols], skill[rows, cols])):
+            bucket.append(values)
+
+    resume_rows, jd_cols, scores, text_scores, skill_scores = (np.concatenate(bucket) for bucket in candidates)
+    keep = scores >= min_score
+    resume_rows, jd_cols, scores, text_scores, skill_scores = (a[keep] for a in (resume_rows, jd_cols, scores, text_scores, skill_scores))
+
+    if per_jd:
+        selected = []
+        for col in np.unique(jd_cols):
+            members = np.flatnonzero(jd_cols == col)
+            selected.append(members[_top_k(scores[members], k)])
+        selected = np.concatenate(selected) if selected else np.empty(0, np.int64)
+    else:
+        selected = _top_k(scores, k)
+    # 分数相同时按简历ID、JD ID排序，保证结果稳定
+    resume_ids_out = resume_index.ids[resume_rows[selected]]
+    jd_ids_out = jd_index.ids[jd_positions[jd_cols[selected]]]
+    order = np.lexsort((jd_ids_out, resume_ids_out, -scores[selected]))
+    selected = selected[order]
+    return [
+        {
+            'resume_id': int(resume_id),
+            'jd_id': int(jd_id),
+            'score': round(float(score), 4),
+            'text_score': round(float(text_score), 4),
+            'skill_score': round(float(skill_score), 4)
+        }
+        for resume_id, jd_id, score, text_score, skill_score in zip(
+            resume_ids_out[order], jd_ids_out[order], scores[selected], text_scores[selected], skill_scores[selected])
+    ]
+
+def query_vector(query, idf):
+    """把检索词转换为与简历同一空间的L2归一化TF-IDF稠密向量（长度N_FEATURES）"""
+    indices, counts = hash_counts(tokenize(query))
+    vector = np.zeros(N_FEATURES, np.float32)
+    weights = (1 + np.log(counts)) * idf[indices]
+    norm = np.sqrt(np.dot(weights, weights))
+    if norm > 0:
+        vector[indices] = weights / norm
+    return vector
+
+def skill_features(text):
+    """技能文本的特征编号集合（升序数组）"""
+    return hash_counts(tokenize(text))[0]
+
+def rank_resumes(query, k=10, resume_ids=None, exclude_ids=None, skills=None, min_score=0.0, block_rows=SEARCH_BLOCK_ROWS):
+    """
+    用检索词在简历索引上做向量检索，打分方式与预筛相同：
+    文本相似度（TF-IDF余弦）× TEXT_WEIGHT + 检索词中技能词的覆盖率 × SKILL_WEIGHT
+
+    Args:
+        query (str): 检索词（自然语言或关键词均可）
+        k (int): 返回的简历数
+        resume_ids (list): 只在这些简历中检索，None表示全部
+        exclude_ids (list): 排除的简历
+        skills (list): 必须具备的技能，每项都要出现在简历的skills中
+        min_score (float): 低于该分数的简历不返回
+
+    Returns:
+        list: [{'resume_id', 'score', 'text_score', 'skill_score'}]，按score降序
+    """
+    sync_indexes()
+    positions = resume_index.alive_positions() if resume_ids is None else resume_index.positions_of(resume_ids)
+    if exclude_ids:
+        positions = np.setdiff1d(positions, resume_index.positions_of(exclude_ids))
+    if k <= 0 or not len(positions):
+        return []
+
+    idf = resume_index.idf()
+    query_text = query_vector(query, idf)
+    query_skills = np.zeros(N_FEATURES, bool)
+    query_skills[skill_features(query)] = True
+    query_skills &= resume_index.skill_df > 0
+    n_query_skills = int(query_skills.sum())
+    required = [features for features in (skill_features(skill) for skill in skills or []) if len(features)]
+
+    scores, text_scores, skill_scores = (np.zeros(len(positions), np.float32) for _ in range(3))
+    for start in range(0, len(positions), block_rows):
+        block = positions[start:start + block_rows]
+        n_rows = len(block)
+        owner, indices, weights = tfidf_rows(resume_index, block, idf)
+        text = np.bincount(owner, weights=weights * query_text[indices], minlength=n_rows)
+        owner, indices, _ = resume_index.skills.gather(block)
+        overlap = np.bincount(owner, weights=query_skills[indices], minlength=n_rows)
+        skill = overlap / n_query_skills if n_query_skills else np.zeros(n_rows)
+        combined = TEXT_WEIGHT * text + SKILL_WEIGHT * skill if n_query_skills else text
+        for features in required:
+            # 技能的全部特征都出现在简历技能中才算具备（中文技能按bigram切分）
+            hits = np.bincount(owner, weights=np.isin(indices, features), minlength=n_rows)
+            combined = np.where(hits >= len(features), combined, -np.inf)
+        scores[start:start + n_rows] = combined
+        text_scores[start:start + n_rows] = text
+        skill_scores[start:start + n_rows] = skill
+
+    keep = np.flatnonzero((scores >= min_score) & np.isfinite(scores))
+    selected = keep[_top_k(scores[keep], k)]
+    ids = resume_index.ids[positions[selected]]
+    order = np.lexsort((ids, -scores[selected]))
+    return [
+        {
+            'resume_id': int(ids[i]),
+            'score': round(float(scores[selected[i]]), 4),
+            'text_score': round(float(text_scores[selected[i]]), 4),
+            'skill_score': round(float(skill_scores[selected[i]]), 4)
+        }
+        for i in order
+    ]
+
+def resume_snippet(row, query):
+    """在简历的技能、个人总结和工作经历中截取与检索词最相关的一小段"""
+    text = ' | '.join(part for part in (row['skills'], row['summary'], flatten_json_text(row['experience_json'] or '')) if part)
+    lowered = text.lower()
+    # 优先用原始检索词（较长的词更有信息量），都不出现时退回到分词后的词
+    terms = sorted((query or '').split(), key=len, reverse=True) + tokenize(query)
+    term = next((term for term in terms if term.lower() in lowered), '')
+    return make_snippet(text, term) if term else text[:SNIPPET_CONTEXT_CHARS * 2]
+
+def search_resumes(query: str, k: int = 10, filters: dict = None) -> str:
+    """
+    在本地向量索引中检索与描述最相关的简历，只返回ID、分数、姓名和简短片段（不返回完整简历）
+
+    Args:
+        query (str): 检索描述，例如 "机器学习工程师 推荐系统 Python"
+        k (int): 返回的简历数，最大SEARCH_MAX_K
+        filters (dict): 可选的 resume_ids、exclude_ids、skills、min_score
+
+    Returns:
+        str: 一个JSON字符串，包含检索结果或错误信息。
+    """
+    log_processing_step("RESUME_VECTOR_SEARCH", "START", f"向量检索简历: {query} (k={k}, 过滤: {filters})")
+    filters = filters or {}
+    try:
+        unknown = [key for key in filters if key not in SEARCH_FILTERS]
+        if unknown:
+            raise ValueError(f"不支持的过滤条件: {', '.join(unknown)}，可用: {', '.join(SEARCH_FILTERS)}")
+        skills = filters.get('skills') or []
+        if isinstance(skills, str):
+            skills = [skill for skill in re.split(r'[,，、\s]+', skills) if skill]
+        if not (query or '').strip() and not skills:
+            raise ValueError('检索描述和技能过滤条件不能同时为空。')
+        k = max(1, min(int(k or 10), SEARCH_MAX_K))
+        resume_ids, exclude_ids = ([int(i) for i in filters[key]] if filters.get(key) is not None else None
+                                   for key in ('resume_ids', 'exclude_ids'))
+        # 只给出技能时，用技能本身作为检索描述
+        query = (query or '').strip() or ' '.join(skills)
+        ranked = rank_resumes(query, k=k, resume_ids=resume_ids, exclude_ids=exclude_ids,
+                              skills=skills, min_score=float(filters.get('min_score') or 0.0))
+
+        conn = get_db_connection()
+        try:
+            placeholders = ','.join('?' for _ in ranked)
+            rows = {row['id']: row for row in conn.execute(
+                f'SELECT id, name, skills, summary, experience_json FROM resumes WHERE id IN ({placeholders})',
+                [item['resume_id'] for item in ranked])} if ranked else {}
+        finally:
+            conn.close()
+        results = []
+        for item in ranked:
+            row = rows.get(item['resume_id'])
+            if row is not None:
+                results.append({**item, 'name': row['name'], 'snippet': resume_snippet(row, query)})
+
+        log_processing_step("RESUME_VECTOR_SEARCH", "COMPLETE", f"返回 {len(results)} 份简历。")
+        return json.dumps({"status": "success", "data": {"resumes": results, "total_indexed": resume_index.n_alive}}, ensure_ascii=False)
+    except (TypeError, ValueError) as e:
+        log_processing_step("RESUME_VECTOR_SEARCH", "ERROR", str(e))
+        return json.dumps({"status": "error", "message": str(e)}, ensure_ascii=False)
+    except Exception as e:
+        log_processing_step("RESUME_VECTOR_SEARCH", "ERROR", f"向量检索简历时发生错误: {str(e)}")
+        return json.dumps({"status": "error", "message": f"向量检索失败: {str(e)}"}, ensure_ascii=False)
@@ -173,6 +173,58 @@ async function apiRequest(url, options = {}) {
     }
 }
 
+// 转义HTML特殊字符，用于把接口返回的文本插入到innerHTML中
+function escapeHtml(value) {
+    return String(value ?? '')
+        .replace(/&/g, '&amp;')
+        .replace(/</g, '&lt;')
+        .replace(/>/g, '&gt;')
+        .replace(/"/g, '&quot;')
+        .replace(/'/g, '&#039;');
+}
+
+// 按页加载列表（对应keyset分页的列表API）：首次加载第一页，滚动到底部或点击“加载更多”时加载下一页
+function createPagedList({ url, pageSize, fields, container, totalEl, emptyEl, moreButton, sentinel, renderItem }) {
+    let nextCursor = null;
+    let loading = false;
+    let exhausted = false;
+
+    async function loadMore() {
+        if (loading || exhausted) return;
+        loading = true;
+        moreButton.disabled = true;
+
+        const params = new URLSearchParams({ limit: pageSize });
+        if (fields) params.set('fields', fields);
+        if (nextCursor) params.set('cursor', nextCursor);
+
+        try {
+            const result = await apiRequest(`${url}?${params.toString()}`);
+            const page = result.data;
+            container.insertAdjacentHTML('beforeend', page.items.map(renderItem).join(''));
+            totalEl.textContent = page.total;
+            nextCursor = page.next_cursor;
+            exhausted = !nextCursor;
+            emptyEl.style.display = container.children.length === 0 ? 'block' : 'none';
+            moreButton.style.display = exhausted ? 'none' : 'inline-block';
+        } catch (error) {
+            showToast('列表加载失败：' + error.message, 'danger');
+        } finally {
+            loading = false;
+            moreButton.disabled = false;
+        }
+    }
+
+    if ('IntersectionObserver' in window && sentinel) {
+        new IntersectionObserver(entries => {
+            if (entries[0].isIntersecting && nextCursor) loadMore();
+        }, { rootMargin: '200px' }).observe(sentinel);
+    }
+
+    loadMore();
+    return { loadMore };
+}
+
 // 复制到剪贴板
 function copyToClipboard(text) {
     navigator.clipboard.writeText(text).then(() => {
@@ -2,7 +2,8 @@ import os
 import json
 from flask import Blueprint, request, Response, stream_with_context
 from openai import OpenAI
-from helpers import get_prompt, log_model_request, log_model_response, log_processing_step, find_jd_by_id_or_title, list_all_resume_ids, get_resumes_by_ids
+from helpers import get_prompt, render_prompt, log_model_request, log_model_response, log_processing_step, find_jd_by_id_or_title, list_all_resume_ids, get_resumes_by_ids, full_text_search
+from screening import search_resumes
 import time
 
 # Create a Blueprint
@@ -55,7 +56,24 @@ def execute_tool(tool_name: str, parameters: dict) -> str:
         return list_all_resume_ids()
     elif tool_name == "get_resume_details":
         resume_ids = parameters.get("resume_ids", [])
-        return get_resumes_by_ids(resume_ids=resume_ids)
+        return get_resumes_by_ids(
+            resume_ids=resume_ids,
+            fields=parameters.get("fields"),
+            max_tokens=parameters.get("max_tokens"),
+            cursor=parameters.get("cursor")
+        )
+    elif tool_name == "full_text_search":
+        return full_text_search(
+            query=parameters.get("query", ""),
+            doc_type=parameters.get("doc_type", "all"),
+            limit=parameters.get("limit", 10)
+        )
+    elif tool_name == "search_resumes":
+        return search_resumes(
+            query=parameters.get("query", ""),
+            k=parameters.get("k", 10),
+            filters=parameters.get("filters")
+        )
     elif tool_name == "show_preview":
         # This tool doesn't return data to the agent, it streams an event to the frontend.
         # The content is passed directly. The return value signals success to the agent.
@@ -106,8 +124,7 @@ def talent_sourcing_chat_api():
                 yield stream_event("status_update", {"message": f"Observer is evaluating your feedback..."})
                 
                 # Run Observer
-                observer_prompt_template = get_prompt('sourcing_observer_system.txt')
-                observer_prompt = observer_prompt_template.format(executor_capabilities=executor_capabilities)
+                observer_prompt = render_prompt('sourcing_observer_system.txt', executor_capabilities=executor_capabilities)
                 observer_messages = [
                     {"role": "system", "content": observer_prompt},
                     {"role": "user", "content": f"Full Plan:\n{json.dumps(plan, indent=2)}\n\nCurrent Step:\n{json.dumps(previous_step_info, indent=2)}\n\nExecution Result:\n{execution_result}"}
@@ -136,8 +153,7 @@ def talent_sourcing_chat_api():
                 # 2. Planner Agent - Only runs if there is no existing plan
                 if not plan:
                     yield stream_event("status_update", {"message": "--- Planning Phase ---"})
-                    planner_prompt_template = get_prompt('sourcing_planner_system.txt')
-                    planner_prompt = planner_prompt_template.format(executor_capabilities=executor_capabilities)
+                    planner_prompt = render_prompt('sourcing_planner_system.txt', executor_capabilities=executor_capabilities)
                     
                     # Construct full conversation history for the planner
                     conversation_context = []
@@ -234,8 +250,7 @@ def talent_sourcing_chat_api():
                     time.sleep(1)
 
                     # 5. Observer Agent
-                    observer_prompt_template = get_prompt('sourcing_observer_system.txt')
-                    observer_prompt = observer_prompt_template.format(executor_capabilities=executor_capabilities)
+                    observer_prompt = render_prompt('sourcing_observer_system.txt', executor_capabilities=executor_capabilities)
                     observer_messages = [
                         {"role": "system", "content": observer_prompt},
                         {"role": "user", "content": f"Full Plan:\n{json.dumps(plan, indent=2)}\n\nCurrent Step:\n{json.dumps(step_info, indent=2)}\n\nExecution Result:\n{execution_result}"}
@@ -0,0 +1,42 @@
+"""
+测试用的临时数据库：在临时目录中复制schema.sql并初始化数据库，结束后关闭连接池、恢复工作目录并清理
+"""
+
+import contextlib
+import os
+import shutil
+import tempfile
+
+from db import connection_pool
+from helpers import check_and_migrate_db
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+@contextlib.contextmanager
+def temp_database(migrate=True):
+    """
+    切换到带有schema.sql的临时目录运行测试
+
+    Args:
+        migrate (bool): 是否先执行check_and_migrate_db；测试迁移本身时传False，自行构造升级前的数据库
+
+    Yields:
+        str: 临时目录路径
+    """
+    original_cwd = os.getcwd()
+    temp_dir = tempfile.mkdtemp()
+    try:
+        shutil.copy(os.path.join(PROJECT_ROOT, 'schema.sql'), temp_dir)
+        os.chdir(temp_dir)
+        if migrate:
+            check_and_migrate_db()
+        yield temp_dir
+    finally:
+        connection_pool.close_all()
+        os.chdir(original_cwd)
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+def run_in_temp_db(test_fn):
+    """在临时目录中使用全新的数据库运行测试"""
+    with temp_database():
+        test_fn()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+测试agent静态提示前缀与token用量统计的简单脚本
+"""
+
+import json
+import os
+import sys
+from types import SimpleNamespace
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('OPENAI_API_KEY', 'dummy')
+
+import candidate_agent
+from agent_prompts import TurnStreamParser, extract_usage, summarize_usage
+from app import stream_agent_turn
+from candidate_agent import CandidateAgent
+from recruiter_agent import RecruiterAgent
+
+RESUME = {'name': '张三', 'skills': 'Python', 'experience': [{'company': '某公司', 'role': '工程师'}]}
+JD = {'title': '后端工程师', 'requirements': '3年经验', 'company': '某公司'}
+
+class FakeCompletions:
+    """记录每次请求的messages，返回固定的回复和用量"""
+    def __init__(self):
+        self.requests = []
+
+    def create(self, model, messages, **kwargs):
+        self.requests.append(messages)
+        cached = 0 if len(self.requests) == 1 else 1500
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content='{"type": "chatting", "reasoning": "r", "payload": "你好"}'))],
+            usage=SimpleNamespace(prompt_tokens=1600 + len(self.requests) * 50, completion_tokens=40,
+                                  prompt_tokens_details=SimpleNamespace(cached_tokens=cached))
+        )
+
+def test_static_prefix_is_stable():
+    """测试每轮请求的前缀逐字节相同，且背景资料在有历史时仍然保留"""
+    print("🧪 开始测试静态提示前缀...")
+    fake = FakeCompletions()
+    original_client = candidate_agent.openai_client
+    candidate_agent.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=fake))
+    try:
+        agent = CandidateAgent(RESUME, JD, {'期望': '远程'})
+        agent.respond(history=None)
+        agent.respond(history=[{'role': 'assistant', 'content': '...'}, {'role': 'user', 'content': '您好'}])
+    finally:
+        candidate_agent.openai_client = original_client
+
+    first, second = fake.requests
+    assert first[:2] == second[:2]
+    assert first[0] is second[0] and first[1] is second[1]
+    assert '远程' in first[0]['content'] and '{CANDIDATE_PROFILE_PLACEHOLDER}' not in first[0]['content']
+    assert '张三' in second[1]['content'][0]['text'] and '后端工程师' in second[1]['content'][0]['text']
+    assert second[2:] == [{'role': 'assistant', 'content': '...'}, {'role': 'user', 'content': '您好'}]
+    print("✅ 前缀固定在请求开头且每轮相同，有历史时背景资料不再丢失")
+
+    assert agent.last_usage == {'input_tokens': 1700, 'cached_input_tokens': 1500, 'uncached_input_tokens': 200,
+                                'cache_creation_input_tokens': 0, 'output_tokens': 40}
+    totals = agent.get_usage_summary()
+    assert totals['turns'] == 2 and totals['input_tokens'] == 3350 and totals['cached_input_tokens'] == 1500
+    print("✅ 每轮记录缓存命中与未命中的输入token")
+
+    recruiter = RecruiterAgent(RESUME, JD, None)
+    prefix = recruiter.get_static_prefix()
+    assert recruiter.get_static_prefix() is prefix and '暂无画像信息' in prefix[0]['content']
+    print("✅ 招聘方agent前缀只构建一次")
+
+class FakeStreamingCompletions:
+    """把固定回复切成小段按流式chunk返回，最后一个chunk携带用量"""
+    def __init__(self, reply):
+        self.reply = reply
+
+    def create(self, model, messages, stream=False, **kwargs):
+        assert stream
+        chunks = [SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=self.reply[i:i + 3]))], usage=None)
+                  for i in range(0, len(self.reply), 3)]
+        chunks.append(SimpleNamespace(choices=[], usage=SimpleNamespace(prompt_tokens=900, completion_tokens=30,
+                                                                         prompt_tokens_details=SimpleNamespace(cached_tokens=800))))
+        return iter(chunks)
+
+def test_token_streaming():
+    """测试流式模式下payload增量推送，且完整回复仍被解析返回"""
+    print("🧪 开始测试逐token流式回复...")
+    reply = json.dumps({"type": "chatting", "reasoning": "包含\"payload\"字样的思考", "payload": "您好，\n请介绍一下团队😀"})
+    original_client = candidate_agent.openai_client
+    candidate_agent.openai_client = SimpleNamespace(chat=SimpleNamespace(completions=FakeStreamingCompletions(reply)))
+    try:
+        agent = CandidateAgent(RESUME, JD, None)
+        turn = stream_agent_turn(agent, 'candidate', [{'role': 'user', 'content': '您好'}])
+        events = []
+        try:
+            while True:
+                events.append(next(turn))
+        except StopIteration as stop:
+            response = stop.value
+    finally:
+        candidate_agent.openai_client = original_client
+
+    deltas = [json.loads(event[len('data: '):])['data'] for event in events]
+    assert all(event.startswith('data: {"type": "payload_delta"') for event in events)
+    assert ''.join(delta['delta'] for delta in deltas) == "您好，\n请介绍一下团队😀"
+    assert {delta['message_type'] for delta in deltas} == {'chatting'} and {delta['attempt'] for delta in deltas} == {1}
+    assert response == json.loads(reply)
+    assert agent.last_usage['cached_input_tokens'] == 800
+    print("✅ payload按token增量推送，完整回复解析后返回，用量取自最后一个chunk")
+
+def test_usage_helpers():
+    """测试缺少用量字段时的容错"""
+    assert extract_usage(SimpleNamespace(usage=None))['input_tokens'] == 0
+    assert summarize_usage([])['cached_ratio'] == 0.0
+    print("✅ 用量统计容错正常")
+
+    parser = TurnStreamParser()
+    text = '{"payload": {"nested": "x"}, "type": "planning"}'
+    assert all(parser.feed(ch) == {} for ch in text)
+    assert parser.values == {'type': 'planning'} and parser.text == text
+    print("✅ payload不是字符串时不推送增量")
+    print("🎉 静态提示前缀测试完成！")
+
+if __name__ == "__main__":
+    test_static_prefix_is_stable()
+    test_token_streaming()
+    test_usage_helpers()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+测试N×M批量撮合任务的简单脚本
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'dummy')
+
+import app as app_module
+import screening
+from helpers import get_db_connection
+from match_jobs import BatchMatchJob
+from temp_db import temp_database
+from test_screening import JDS, make_resume
+
+def wait_until_finished(job, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not job.finished and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert job.finished
+
+def test_batch_progress_and_cancel():
+    """测试批量任务的并发上限、进度统计与取消"""
+    print("🧪 开始测试批量撮合任务...")
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def fake_match(resume_id, jd_id, cancel_event):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        if resume_id == 3:
+            return {'status': 'failed', 'error': '找不到对应的简历或职位'}
+        return {'status': 'completed', 'final_result': 'MATCH' if jd_id == 1 else 'NO_MATCH', 'facilitation_id': resume_id * 10 + jd_id}
+
+    pairs = [(resume_id, jd_id) for jd_id in (1, 2) for resume_id in (1, 2, 3)]
+    job = BatchMatchJob('batch-a', pairs, concurrency=2)
+    job.run(fake_match)
+    progress = job.progress()
+    assert job.status == 'completed' and peak[0] <= 2
+    assert progress['done'] == 6 and progress['counts'] == {'completed': 4, 'failed': 2}
+    assert progress['outcomes'] == {'MATCH': 2, 'NO_MATCH': 2} and progress['pairs_per_minute'] > 0
+    results = job.summary(include_results=True)['results']
+    assert {(r['resume_id'], r['jd_id']) for r in results} == set(pairs)
+    print("✅ 并发不超过上限，进度、结论分布和吞吐统计正确")
+
+    release = threading.Event()
+
+    def blocking_match(resume_id, jd_id, cancel_event):
+        release.wait(5)
+        return {'status': 'cancelled'} if cancel_event.is_set() else {'status': 'completed', 'final_result': 'MATCH'}
+
+    job = BatchMatchJob('batch-b', [(i, 1) for i in range(1, 21)], concurrency=2)
+    thread = threading.Thread(target=job.run, args=(blocking_match,))
+    thread.start()
+    while job.progress()['running'] < 2:
+        time.sleep(0.01)
+    assert job.cancel()
+    release.set()
+    thread.join(5)
+    assert job.status == 'cancelled' and job.progress()['counts'] == {'cancelled': 20}
+    assert not job.cancel()
+    print("✅ 取消后未开始的撮合不再执行，进行中的撮合停止")
+
+def test_batch_matching_api():
+    """测试批量撮合接口：参数校验、缺失ID、结果写入facilitation_results"""
+    print("🧪 开始测试批量撮合接口...")
+    original_session = app_module.run_matching_session
+    with temp_database():
+        try:
+            conn = get_db_connection()
+            resume_ids = [conn.execute("INSERT INTO resumes (name) VALUES (?)", (f'候选人{i}',)).lastrowid for i in range(3)]
+            jd_ids = [conn.execute("INSERT INTO job_descriptions (title) VALUES (?)", (f'职位{i}',)).lastrowid for i in range(2)]
+            conn.commit()
+            conn.close()
+
+            def fake_session(resume_id, jd_id, job_id, stream_tokens=True, **kwargs):
+                """模拟撮合：写入一条facilitation_results并产生结束事件"""
+                assert not stream_tokens
+                yield f"data: {json.dumps({'type': 'chatting', 'data': {'content': '您好'}})}\n\n"
+                conn = get_db_connection()
+                facilitation_id = conn.execute(
+                    "INSERT INTO facilitation_results (resume_id, jd_id, final_result) VALUES (?, ?, ?)",
+                    (resume_id, jd_id, 'MATCH')).lastrowid
+                conn.commit()
+                conn.close()
+                yield f"data: {json.dumps({'type': 'complete', 'data': {'status': 'MATCH'}, 'facilitation_id': facilitation_id})}\n\n"
+
+            app_module.run_matching_session = fake_session
+            client = app_module.app.test_client()
+
+            assert client.post('/api/batch_matching', json={'resume_ids': [], 'jd_ids': [1]}).status_code == 400
+            assert client.post('/api/batch_matching', json={'resume_ids': ['x'], 'jd_ids': [1]}).status_code == 400
+            print("✅ 非法参数返回400")
+
+            response = client.post('/api/batch_matching', json={'resume_ids': resume_ids + [999], 'jd_ids': jd_ids, 'concurrency': 3})
+            assert response.status_code == 202
+            data = response.get_json()['data']
+            assert data['missing'] == {'resume_ids': [999], 'jd_ids': []} and data['progress']['total'] == 6
+            job = app_module.batch_match_registry.get(data['job_id'])
+            wait_until_finished(job)
+
+            status = client.get(f"/api/batch_matching/{data['job_id']}?include_results=1").get_json()['data']
+            assert status['status'] == 'completed' and status['progress']['outcomes'] == {'MATCH': 6}
+            assert all(result['facilitation_id'] for result in status['results'])
+            conn = get_db_connection()
+            assert conn.execute("SELECT COUNT(*) FROM facilitation_results").fetchone()[0] == 6
+            conn.close()
+            print("✅ 每一对撮合结果写入facilitation_results，缺失的ID单独返回")
+
+            for bad in (True, False, 0, '4'):
+                assert client.post('/api/batch_matching', json={'resume_ids': resume_ids, 'jd_ids': jd_ids, 'concurrency': bad}).status_code == 400
+            print("✅ concurrency不是正整数（包括true/false）时返回400")
+
+            def unsaved_session(resume_id, jd_id, job_id, stream_tokens=True, **kwargs):
+                """模拟撮合结束但结果写入失败"""
+                yield f"data: {json.dumps({'type': 'complete', 'data': {'status': 'MATCH'}, 'facilitation_id': None})}\n\n"
+
+            app_module.run_matching_session = unsaved_session
+            response = client.post('/api/batch_matching', json={'resume_ids': resume_ids[:1], 'jd_ids': jd_ids})
+            job = app_module.batch_match_registry.get(response.get_json()['data']['job_id'])
+            wait_until_finished(job)
+            progress = job.progress()
+            assert progress['counts'] == {'failed': 2} and progress['outcomes'] == {}
+            assert all('保存' in result['error'] for result in job.summary(include_results=True)['results'])
+            print("✅ 结果未写入facilitation_results的撮合按失败统计")
+
+            release = threading.Event()
+
+            def blocking_session(resume_id, jd_id, job_id, stream_tokens=True, **kwargs):
+                release.wait(5)
+                yield f"data: {json.dumps({'type': 'error', 'message': 'stopped'})}\n\n"
+
+            app_module.run_matching_session = blocking_session
+            original_max_running = app_module.batch_match_registry.max_running
+            app_module.batch_match_registry.max_running = 1
+            try:
+                running = client.post('/api/batch_matching', json={'resume_ids': resume_ids[:1], 'jd_ids': jd_ids[:1]})
+                assert running.status_code == 202
+                rejected = client.post('/api/batch_matching', json={'resume_ids': resume_ids[:1], 'jd_ids': jd_ids[:1]})
+                assert rejected.status_code == 429 and rejected.headers['Retry-After']
+            finally:
+                release.set()
+                app_module.batch_match_registry.max_running = original_max_running
+            wait_until_finished(app_module.batch_match_registry.get(running.get_json()['data']['job_id']))
+            print("✅ 运行中的批量任务数达到上限时返回429")
+
+            assert client.post('/api/batch_matching/missing/cancel').status_code == 404
+            assert data['job_id'] in [item['job_id'] for item in client.get('/api/batch_matching').get_json()['data']]
+            print("🎉 批量撮合测试完成！")
+        finally:
+            app_module.run_matching_session = original_session
+
+def test_batch_matching_prescreen():
+    """测试带prescreen_k的批量撮合：上限按入围后的对数计算，只撮合每个JD的top-k且按排名先后"""
+    print("🧪 开始测试预筛后的批量撮合...")
+    original_session = app_module.run_matching_session
+    original_limits = app_module.app.config['BATCH_MATCH_MAX_PAIRS'], app_module.app.config['BATCH_MATCH_MAX_PRESCREEN_PAIRS']
+    with temp_database():
+        try:
+            screening.reset_screening_index()
+            conn = get_db_connection()
+            conn.executemany("INSERT INTO resumes (name, skills, summary, experience_json) VALUES (?, ?, ?, ?)",
+                             [make_resume(i) for i in range(30)])
+            conn.executemany("INSERT INTO job_descriptions (title, requirements, description) VALUES (?, ?, ?)", JDS[:2])
+            conn.commit()
+            conn.close()
+
+            started = []
+
+            def fake_session(resume_id, jd_id, job_id, stream_tokens=True, **kwargs):
+                started.append((resume_id, jd_id))
+                yield f"data: {json.dumps({'type': 'complete', 'data': {'status': 'MATCH'}, 'facilitation_id': len(started)})}\n\n"
+
+            app_module.run_matching_session = fake_session
+            app_module.app.config['BATCH_MATCH_MAX_PAIRS'] = 10
+            client = app_module.app.test_client()
+            resume_ids, jd_ids = list(range(1, 31)), [2, 1]
+
+            assert client.post('/api/batch_matching', json={'resume_ids': resume_ids, 'jd_ids': jd_ids}).status_code == 400
+            for bad in (0, -1, True, 'abc'):
+                assert client.post('/api/batch_matching', json={'resume_ids': resume_ids, 'jd_ids': jd_ids, 'prescreen_k': bad}).status_code == 400
+            assert client.post('/api/batch_matching', json={'resume_ids': resume_ids, 'jd_ids': jd_ids, 'prescreen_k': 6}).status_code == 400
+            print("✅ 不预筛时60对超过上限；预筛后仍超过上限或prescreen_k非法时返回400")
+
+            response = client.post('/api/batch_matching', json={'resume_ids': resume_ids, 'jd_ids': jd_ids, 'prescreen_k': 4, 'concurrency': 1})
+            assert response.status_code == 202
+            job = app_module.batch_match_registry.get(response.get_json()['data']['job_id'])
+            wait_until_finished(job)
+            expected = [(pair['resume_id'], pair['jd_id']) for jd_id in jd_ids
+                        for pair in screening.shortlist(jd_ids=[jd_id], k=4)]
+            assert job.pairs == expected and started == expected
+            assert job.progress()['counts'] == {'completed': 8}
+            print("✅ 只撮合每个JD得分最高的k份简历，按JD分组、组内按排名顺序执行")
+
+            app_module.app.config['BATCH_MATCH_MAX_PRESCREEN_PAIRS'] = 50
+            assert client.post('/api/batch_matching', json={'resume_ids': resume_ids, 'jd_ids': jd_ids, 'prescreen_k': 4}).status_code == 400
+            print("✅ 预筛的输入规模单独限制")
+            print("🎉 预筛后的批量撮合测试完成！")
+        finally:
+            app_module.run_matching_session = original_session
+            app_module.app.config['BATCH_MATCH_MAX_PAIRS'], app_module.app.config['BATCH_MATCH_MAX_PRESCREEN_PAIRS'] = original_limits
+            screening.reset_screening_index()
+
+if __name__ == "__main__":
+    test_batch_progress_and_cancel()
+    test_batch_matching_api()
+    test_batch_matching_prescreen()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""
+测试批量导入的单次调用抽取+脱敏模式（combined）及回退到两次调用的简单脚本
+"""
+
+import io
+import json
+import os
+import sys
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'dummy')
+
+import app as app_module
+from helpers import get_db_connection, get_prompt
+from temp_db import temp_database
+
+JD_FULL = {'title': '机器学习工程师', 'company': '字节跳动', 'requirements': '熟悉Python'}
+JD_DESENSITIZED = {'title': '机器学习工程师', 'company': '某互联网公司', 'requirements': '熟悉Python'}
+RESUME_FULL = {'name': '张三', 'email': 'zhangsan@example.com', 'skills': 'Python'}
+RESUME_DESENSITIZED = {'name': '张**', 'email': '', 'skills': 'Python'}
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+class FakeModelFactory:
+    """
+    替代genai.GenerativeModel：按调用中使用的提示词判断调用类型并返回预设的回复，记录每次调用的类型
+    combined为单次抽取+脱敏调用，其余为两次调用方式中的抽取与脱敏
+    """
+    def __init__(self, combined_reply):
+        self.combined_reply = combined_reply
+        self.calls = []
+        self.prompts = {name: get_prompt(f'{name}.txt') for name in (
+            'extract_desensitize_jd', 'extract_desensitize_resume', 'extract_jd_info', 'extract_resume_info',
+            'desensitize_jd', 'desensitize_resume')}
+
+    def __call__(self, model_name, generation_config=None):
+        factory = self
+
+        class FakeModel:
+            def generate_content(self, parts):
+                kind = next(name for name, prompt in factory.prompts.items() if prompt in parts)
+                factory.calls.append(kind)
+                if kind.startswith('extract_desensitize'):
+                    assert generation_config == {"response_mime_type": "application/json"}
+                    return FakeResponse(factory.combined_reply(kind))
+                return FakeResponse(json.dumps({
+                    'extract_jd_info': JD_FULL, 'desensitize_jd': JD_DESENSITIZED,
+                    'extract_resume_info': RESUME_FULL, 'desensitize_resume': RESUME_DESENSITIZED}[kind], ensure_ascii=False))
+
+        return FakeModel()
+
+def valid_reply(kind):
+    if kind == 'extract_desensitize_jd':
+        return json.dumps({'full': JD_FULL, 'desensitized': JD_DESENSITIZED}, ensure_ascii=False)
+    return json.dumps({'full': RESUME_FULL, 'desensitized': RESUME_DESENSITIZED}, ensure_ascii=False)
+
+def read_events(response):
+    return [json.loads(chunk[len('data: '):]) for chunk in response.get_data(as_text=True).split('\n\n') if chunk.startswith('data: ')]
+
+def upload_jds(client, mode):
+    payload = json.dumps([{'职位': '机器学习工程师', '公司': '字节跳动'}], ensure_ascii=False).encode('utf-8')
+    return client.post('/api/jd/batch_upload', data={'jd_file': (io.BytesIO(payload), 'jds.json'), 'mode': mode},
+                       content_type='multipart/form-data')
+
+def upload_resume(client, mode):
+    return client.post('/api/resume/batch_upload', data={'files': (io.BytesIO(b'%PDF-1.4 fake'), 'zhangsan.pdf'), 'mode': mode},
+                       content_type='multipart/form-data')
+
+def test_combined_extraction_modes():
+    """测试combined模式一次调用完成抽取与脱敏、回复不合法时回退到两次调用、非法mode返回400"""
+    print("🧪 开始测试单次调用抽取+脱敏...")
+    original_model = app_module.genai.GenerativeModel
+    original_key = os.environ.get('GOOGLE_API_KEY')
+    with temp_database():
+        try:
+            os.environ['GOOGLE_API_KEY'] = 'test-key'
+            client = app_module.app.test_client()
+
+            fake = FakeModelFactory(valid_reply)
+            app_module.genai.GenerativeModel = fake
+            full, desensitized = app_module.extract_and_desensitize_combined('职位文本', 'JD', 'Row 2')
+            assert full == JD_FULL and desensitized == JD_DESENSITIZED and fake.calls == ['extract_desensitize_jd']
+
+            events = read_events(upload_jds(client, 'combined'))
+            assert events[-1]['type'] == 'complete' and events[-1]['success_count'] == 1
+            events = read_events(upload_resume(client, 'combined'))
+            assert events[-1]['type'] == 'complete' and events[-1]['results'][0]['status'] == 'success'
+            assert fake.calls == ['extract_desensitize_jd'] * 2 + ['extract_desensitize_resume']
+            conn = get_db_connection()
+            jd = conn.execute("SELECT company, desensitized_json FROM job_descriptions").fetchone()
+            resume = conn.execute("SELECT email, desensitized_json FROM resumes").fetchone()
+            assert jd['company'] == '字节跳动' and json.loads(jd['desensitized_json'])['company'] == '某互联网公司'
+            assert resume['email'] == 'zhangsan@example.com' and json.loads(resume['desensitized_json'])['name'] == '张**'
+            conn.execute("DELETE FROM job_descriptions")
+            conn.execute("DELETE FROM resumes")
+            conn.commit()
+            conn.close()
+            print("✅ 合法的 {full, desensitized} 回复一次调用完成抽取与脱敏，完整版和脱敏版分别入库")
+
+            malformed_replies = [
+                lambda kind: 'not json at all',
+                lambda kind: json.dumps({'full': JD_FULL if kind.endswith('jd') else RESUME_FULL}),
+                lambda kind: json.dumps({'full': {'company': '字节跳动'}, 'desensitized': JD_DESENSITIZED}),
+            ]
+            for reply in malformed_replies:
+                fake = FakeModelFactory(reply)
+                app_module.genai.GenerativeModel = fake
+                assert app_module.extract_and_desensitize_combined('职位文本', 'JD', 'Row 2') is None
+
+            fake = FakeModelFactory(malformed_replies[1])
+            app_module.genai.GenerativeModel = fake
+            events = read_events(upload_jds(client, 'combined'))
+            assert events[-1]['success_count'] == 1
+            events = read_events(upload_resume(client, 'combined'))
+            assert events[-1]['results'][0]['status'] == 'success'
+            assert fake.calls == ['extract_desensitize_jd', 'extract_jd_info', 'desensitize_jd',
+                                  'extract_desensitize_resume', 'extract_resume_info', 'desensitize_resume']
+            conn = get_db_connection()
+            jd = conn.execute("SELECT company, desensitized_json FROM job_descriptions").fetchone()
+            assert jd['company'] == '字节跳动' and json.loads(jd['desensitized_json'])['company'] == '某互联网公司'
+            assert conn.execute("SELECT COUNT(*) FROM resumes").fetchone()[0] == 1
+            conn.close()
+            print("✅ 回复不是JSON、缺少字段或缺少必填项时回退到抽取+脱敏两次调用")
+
+            fake = FakeModelFactory(valid_reply)
+            app_module.genai.GenerativeModel = fake
+            for response in (upload_jds(client, 'fast'), upload_resume(client, 'both')):
+                assert response.status_code == 400 and 'Unsupported mode' in response.get_json()['message']
+            assert fake.calls == []
+            print("✅ 非法的mode返回400，不调用模型")
+            print("🎉 单次调用抽取+脱敏测试完成！")
+        finally:
+            app_module.genai.GenerativeModel = original_model
+            if original_key is None:
+                os.environ.pop('GOOGLE_API_KEY', None)
+            else:
+                os.environ['GOOGLE_API_KEY'] = original_key
+
+if __name__ == "__main__":
+    test_combined_extraction_modes()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+测试增量维护的简历×JD匹配度矩阵的简单脚本
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'dummy')
+
+import app as app_module
+import compatibility
+import screening
+from app import app
+from helpers import get_db_connection
+from temp_db import temp_database
+from test_screening import JDS, make_resume
+
+def expected_scores(jd_id, resume_ids):
+    """用预筛打分（当前IDF）直接计算某JD与若干简历的分数"""
+    pairs = screening.shortlist(jd_ids=[jd_id], resume_ids=resume_ids, k=len(resume_ids))
+    return {pair['resume_id']: pair['score'] for pair in pairs}
+
+def snapshot_scores(matrix, jd_id, resume_ids):
+    """用矩阵冻结的IDF和技能词表快照计算某JD与若干简历的分数"""
+    positions = screening.resume_index.positions_of(resume_ids)
+    scoring = screening.JdScoringMatrix(screening.jd_index, screening.jd_index.positions_of([jd_id]), matrix.idf, matrix.skill_vocabulary)
+    combined, _, _ = scoring.score(screening.resume_index, positions, matrix.idf)
+    return dict(zip(screening.resume_index.ids[positions].tolist(), combined[:, 0].tolist()))
+
+def test_incremental_matrix():
+    """测试矩阵的增量更新、扩容、删除与持久化"""
+    print("🧪 开始测试匹配度矩阵...")
+    original_capacity = compatibility.INITIAL_RESUME_CAPACITY, compatibility.INITIAL_JD_CAPACITY
+    with temp_database() as temp_dir:
+        try:
+            screening.reset_screening_index()
+            compatibility.INITIAL_RESUME_CAPACITY, compatibility.INITIAL_JD_CAPACITY = 8, 2
+            conn = get_db_connection()
+            conn.executemany("INSERT INTO resumes (name, skills, summary, experience_json) VALUES (?, ?, ?, ?)",
+                             [make_resume(i) for i in range(30)])
+            conn.executemany("INSERT INTO job_descriptions (title, requirements, description) VALUES (?, ?, ?)", JDS[:3])
+            conn.commit()
+
+            matrix = compatibility.CompatibilityMatrix(os.path.join(temp_dir, 'matrix'))
+            assert matrix.sync() == {'resumes_removed': 0, 'jds_removed': 0, 'resumes_added': 30, 'jds_added': 3}
+            assert matrix.stats()['resume_capacity'] == 32 and matrix.stats()['jd_capacity'] == 4
+            top = matrix.top_resumes(1, k=5)
+            expected = expected_scores(1, list(range(1, 31)))
+            best = sorted(expected.values(), reverse=True)[:5]
+            assert [item['score'] for item in top] == [round(score, 4) for score in best]
+            assert all(abs(item['score'] - expected[item['id']]) < 1e-3 for item in top)
+            assert matrix.stats()['snapshot']['idf_drift'] == 0 and matrix.stats()['snapshot']['resumes_at_snapshot'] == 30
+            print("✅ 首次同步计算全部分数，top-k与预筛打分一致")
+
+            before = np.array(matrix.scores[:3, :30])
+            conn.executemany("INSERT INTO resumes (name, skills, summary, experience_json) VALUES (?, ?, ?, ?)",
+                             [make_resume(i) for i in range(30, 40)])
+            conn.execute("INSERT INTO job_descriptions (title, requirements, description) VALUES (?, ?, ?)", JDS[3])
+            conn.commit()
+            assert matrix.sync() == {'resumes_removed': 0, 'jds_removed': 0, 'resumes_added': 10, 'jds_added': 1}
+            assert matrix.stats()['resume_capacity'] == 64 and matrix.stats()['jd_capacity'] == 4
+            assert np.array_equal(np.array(matrix.scores[:3, :30]), before)
+            print("✅ 新增简历/JD只计算新的列/行，扩容后已有分数原样保留")
+
+            # 先后写入的分数都用同一份IDF快照计算：整行与按快照重新计算的结果一致，可以直接比较排序
+            for jd_id in (2, 4):
+                expected = snapshot_scores(matrix, jd_id, list(range(1, 41)))
+                row = matrix.scores[matrix.jd_slots[jd_id]]
+                assert all(abs(row[matrix.resume_slots[resume_id]] - score) < 1e-5 for resume_id, score in expected.items())
+            drift = matrix.stats()['snapshot']
+            assert drift['resumes_at_snapshot'] == 30 and drift['resumes_now'] == 40 and drift['idf_drift'] > 0
+            jobs = matrix.top_jds(35, k=10)
+            assert len(jobs) == 4 and jobs == sorted(jobs, key=lambda item: -item['score'])
+            print("✅ 新增行列按同一份IDF快照打分，stats报告语料相对快照的漂移")
+
+            original_threshold = compatibility.COMPAT_MAX_IDF_DRIFT
+            compatibility.COMPAT_MAX_IDF_DRIFT = drift['idf_drift'] / 2
+            try:
+                assert matrix.stats()['snapshot']['rebuild_recommended']
+            finally:
+                compatibility.COMPAT_MAX_IDF_DRIFT = original_threshold
+            print("✅ 漂移超过阈值时提示重建")
+
+            conn.execute("DELETE FROM resumes WHERE id = ?", (top[0]['id'],))
+            conn.execute("DELETE FROM job_descriptions WHERE id = 3")
+            conn.commit()
+            assert matrix.sync()['resumes_removed'] == 1
+            assert top[0]['id'] not in [item['id'] for item in matrix.top_resumes(1, k=40)]
+            assert matrix.top_resumes(3) is None and len(matrix.top_jds(35, k=10)) == 3
+            print("✅ 删除的简历/JD不再出现在结果中")
+
+            snapshot = matrix.top_resumes(1, k=10)
+            matrix.close()
+            reopened = compatibility.CompatibilityMatrix(os.path.join(temp_dir, 'matrix'))
+            assert reopened.top_resumes(1, k=10) == snapshot
+            assert reopened.sync()['resumes_added'] == 0
+            print("✅ 矩阵持久化到磁盘，重新打开后结果不变")
+            reopened.close()
+
+            client = app.test_client()
+            response = client.get('/api/compatibility/top?jd_id=1&k=3').get_json()
+            assert response['status'] == 'success' and len(response['data']['items']) == 3
+            assert client.get('/api/compatibility/top?jd_id=1&resume_id=2').status_code == 400
+            assert client.get('/api/compatibility/top?jd_id=999').status_code == 404
+            rebuilt = client.post('/api/compatibility/rebuild').get_json()['data']
+            assert rebuilt['resumes'] == 39 and rebuilt['jds'] == 3
+            snapshot = client.get('/api/compatibility/stats').get_json()['data']['snapshot']
+            assert snapshot['resumes_at_snapshot'] == 39 and snapshot['idf_drift'] == 0 and not snapshot['rebuild_recommended']
+            top = client.get('/api/compatibility/top?jd_id=1&k=5').get_json()['data']['items']
+            expected = expected_scores(1, list(screening.resume_index.alive_ids().tolist()))
+            assert all(abs(item['score'] - expected[item['resume_id']]) < 1e-3 for item in top)
+            print("✅ 查询与重建接口正常，重建后快照更新为当前语料")
+
+            original_desensitize = app_module.get_desensitized_version
+            app_module.get_desensitized_version = lambda data: {}
+            try:
+                added = client.post('/api/resume', json={'name': '新候选人', 'skills': 'Python、机器学习'}).get_json()
+            finally:
+                app_module.get_desensitized_version = original_desensitize
+            new_id = conn.execute("SELECT MAX(id) FROM resumes").fetchone()[0]
+            assert added['status'] == 'success' and added['resume']['id'] == new_id and added['resume']['name'] == '新候选人'
+            assert new_id in compatibility.compatibility_matrix.resume_slots
+            print("✅ 新增简历接口返回正确的ID，并已增量写入矩阵")
+            conn.close()
+            print("🎉 匹配度矩阵测试完成！")
+        finally:
+            compatibility.INITIAL_RESUME_CAPACITY, compatibility.INITIAL_JD_CAPACITY = original_capacity
+            compatibility.compatibility_matrix.close()
+            screening.reset_screening_index()
+
+if __name__ == "__main__":
+    test_incremental_matrix()
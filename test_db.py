@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+测试SQLite连接池的简单脚本
+"""
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from db import ConnectionPool
+
+def test_connection_pool():
+    """测试连接复用、WAL模式、未提交事务的回滚与统计信息"""
+    print("🧪 开始测试数据库连接池...")
+    temp_dir = tempfile.mkdtemp()
+    database = os.path.join(temp_dir, 'pool_test.db')
+    pool = ConnectionPool(max_idle=2)
+    try:
+        conn = pool.acquire(database)
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        conn.execute('CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT)')
+        conn.commit()
+        conn.close()
+        print("✅ 连接以WAL模式打开")
+
+        # 归还后再次获取复用同一个连接
+        conn = pool.acquire(database)
+        conn.execute("INSERT INTO items (name) VALUES ('未提交')")
+        conn.close()
+        stats = pool.stats()
+        assert stats['created'] == 1 and stats['reused'] == 1
+        assert stats['rolled_back'] == 1 and stats['in_use'] == 0
+        print("✅ 连接被复用，未提交的事务在归还时回滚")
+
+        conn = pool.acquire(database)
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 0
+        try:
+            conn.close()
+            conn.execute('SELECT 1')
+            assert False, "已归还的连接不应再可用"
+        except Exception as e:
+            assert 'closed' in str(e)
+        print("✅ 已归还的连接代理不可再使用")
+
+        # 多线程同时持有连接时各自使用独立的连接，空闲连接数不超过上限
+        barrier = threading.Barrier(4)
+
+        def worker():
+            worker_conn = pool.acquire(database)
+            barrier.wait()
+            worker_conn.execute("INSERT INTO items (name) VALUES ('worker')")
+            worker_conn.commit()
+            worker_conn.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        stats = pool.stats()
+        assert stats['peak_in_use'] == 4
+        assert stats['idle'] == 2 and stats['discarded'] == 2
+        conn = pool.acquire(database)
+        assert conn.execute('SELECT COUNT(*) FROM items').fetchone()[0] == 4
+        conn.close()
+        print(f"✅ 并发使用正常，统计信息: {pool.stats()}")
+    finally:
+        pool.close_all()
+        shutil.rmtree(temp_dir, ignore_errors=True)
+    print("🎉 数据库连接池测试完成！")
+
+if __name__ == "__main__":
+    test_connection_pool()
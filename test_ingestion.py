@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试批量导入单写者入库阶段的简单脚本
+"""
+
+import os
+import sys
+import sqlite3
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion import BatchWriter, RESUME_SPEC, JD_SPEC, build_resume_row, build_jd_row
+
+def create_test_connection():
+    """创建只包含resumes和job_descriptions表的内存数据库"""
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    conn.executescript("""
+        CREATE TABLE resumes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL, email TEXT UNIQUE, phone TEXT UNIQUE,
+            skills TEXT, summary TEXT, experience_json TEXT, education_json TEXT,
+            publications_json TEXT, projects_json TEXT, desensitized_json TEXT
+        );
+        CREATE TABLE job_descriptions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL, company TEXT, location TEXT, salary TEXT,
+            requirements TEXT, description TEXT, benefits TEXT, desensitized_json TEXT
+        );
+    """)
+    return conn
+
+def test_resume_batch_writer():
+    """测试简历批量写入：集合式查重、批内去重与连续ID分配"""
+    print("🧪 开始测试简历批量写入...")
+    conn = create_test_connection()
+    conn.execute("INSERT INTO resumes (name, email) VALUES ('已存在', 'old@example.com')")
+    conn.commit()
+
+    writer = BatchWriter(conn, RESUME_SPEC, batch_size=3)
+    outcomes = []
+    outcomes += writer.add(0, build_resume_row({'name': '张三', 'email': 'a@example.com'}, {}))
+    outcomes += writer.add(1, build_resume_row({'name': '李四', 'email': 'old@example.com'}, {}))
+    assert outcomes == [], "未满批次时不应写入"
+    outcomes += writer.add(2, build_resume_row({'name': '王五', 'email': '', 'phone': ''}, {}))
+    outcomes += writer.add(3, build_resume_row({'name': '张三'}, {}))
+    outcomes += writer.add(4, build_resume_row({'name': '赵六', 'email': '', 'phone': ''}, {}))
+    outcomes += writer.flush()
+
+    statuses = {o['index']: o['status'] for o in outcomes}
+    assert statuses == {0: 'success', 1: 'duplicate', 2: 'success', 3: 'duplicate', 4: 'success'}
+    print("✅ 与数据库已有记录、同批记录及前一批记录的重复均被识别")
+
+    for outcome in outcomes:
+        if outcome['status'] == 'success':
+            name = conn.execute('SELECT name FROM resumes WHERE id = ?', (outcome['id'],)).fetchone()[0]
+            assert name == {0: '张三', 2: '王五', 4: '赵六'}[outcome['index']]
+    print("✅ 返回的ID与写入的行一一对应")
+    print("✅ 缺少联系方式的简历不会触发UNIQUE约束")
+    assert writer.stats['batches'] == 2
+    conn.close()
+    print("🎉 简历批量写入测试完成！")
+
+def test_row_error_isolation():
+    """测试某一行写入失败时只影响该行"""
+    print("\n🧪 开始测试逐行错误隔离...")
+    conn = create_test_connection()
+    writer = BatchWriter(conn, JD_SPEC, batch_size=10)
+    writer.add(0, build_jd_row({'title': '后端工程师', 'company': 'A'}, {}))
+    writer.add(1, build_jd_row({'title': None, 'company': 'B'}, {}))  # 违反NOT NULL约束
+    writer.add(2, build_jd_row({'title': '前端工程师', 'company': 'A'}, {}))
+    writer.add(3, build_jd_row({'title': '后端工程师', 'company': 'C'}, {}))
+    outcomes = writer.flush()
+
+    assert [o['status'] for o in outcomes] == ['success', 'error', 'success', 'success']
+    assert writer.stats['row_fallbacks'] == 1
+    count = conn.execute('SELECT COUNT(*) FROM job_descriptions').fetchone()[0]
+    assert count == 3
+    print("✅ 出错的行被单独回滚，其余行正常写入")
+    assert not conn.in_transaction
+    conn.close()
+    print("🎉 逐行错误隔离测试完成！")
+
+if __name__ == "__main__":
+    test_resume_batch_writer()
+    test_row_error_isolation()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+测试列表分页API的简单脚本
+"""
+
+import os
+import sys
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+
+from helpers import get_db_connection
+from listing import list_page, parse_fields, get_record, invalidate_total_count
+from temp_db import temp_database
+
+def test_keyset_pagination():
+    """测试keyset分页的完整性、字段投影与总数缓存"""
+    print("🧪 开始测试列表分页...")
+    with temp_database():
+        try:
+            invalidate_total_count()
+
+            conn = get_db_connection()
+            # 一部分记录created_at相同，验证按id打破平局
+            for i in range(45):
+                created_at = '2024-01-01 00:00:00' if i < 30 else f'2024-01-02 00:00:{i:02d}'
+                conn.execute(
+                    "INSERT INTO resumes (name, experience_json, desensitized_json, created_at) VALUES (?, ?, ?, ?)",
+                    (f'候选人{i}', '[{"role": "工程师", "company": "某公司"}]', '{"name": "匿名"}', created_at)
+                )
+            conn.commit()
+            conn.close()
+
+            fields = parse_fields('resumes', 'id,name,experience')
+            seen = []
+            cursor = None
+            page_sizes = []
+            while True:
+                page = list_page('resumes', fields=fields, cursor=cursor, limit=20)
+                page_sizes.append(len(page['items']))
+                seen.extend(item['id'] for item in page['items'])
+                cursor = page['next_cursor']
+                if not cursor:
+                    break
+            assert page_sizes == [20, 20, 5]
+            assert seen == sorted(seen, reverse=True) == list(range(45, 0, -1))
+            assert page['total'] == 45
+            print("✅ 翻页结果完整、无重复，顺序为最新优先")
+
+            item = page['items'][0]
+            assert set(item) == {'id', 'name', 'experience'}
+            assert item['experience'][0]['role'] == '工程师'
+            print("✅ 只返回请求的字段，JSON列已解码")
+
+            try:
+                parse_fields('resumes', 'id,password')
+                assert False, "不支持的字段应报错"
+            except ValueError:
+                pass
+            try:
+                list_page('resumes', cursor='not-a-cursor')
+                assert False, "非法游标应报错"
+            except ValueError:
+                pass
+            print("✅ 非法字段和游标被拒绝")
+
+            # 总数被缓存，失效后重新统计
+            conn = get_db_connection()
+            conn.execute("DELETE FROM resumes WHERE id = 1")
+            conn.commit()
+            conn.close()
+            assert list_page('resumes', limit=1)['total'] == 45
+            invalidate_total_count('resumes')
+            assert list_page('resumes', limit=1)['total'] == 44
+            print("✅ 总数缓存在失效后刷新")
+
+            record = get_record('resumes', 2)
+            assert record['desensitized'] == {'name': '匿名'} and record['publications'] == []
+            assert get_record('resumes', 1) is None
+            print("✅ 单条记录详情读取正常")
+        finally:
+            invalidate_total_count()
+    print("🎉 列表分页测试完成！")
+
+if __name__ == "__main__":
+    test_keyset_pagination()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+测试后台撮合任务与SSE断线回放的简单脚本
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault('OPENAI_API_KEY', 'dummy')
+
+from match_jobs import MatchJobRegistry, parse_last_event_id
+import app as app_module
+from app import app, match_job_registry
+
+def fake_matching(release, calls):
+    """模拟撮合生成器：产生两条事件后等待release，再产生结束事件"""
+    def factory(job_id):
+        calls.append(job_id)
+        yield f"data: {json.dumps({'type': 'start', 'job_id': job_id})}\n\n"
+        yield f"data: {json.dumps({'type': 'chatting', 'data': {'payload': '您好'}})}\n\n"
+        release.wait(5)
+        yield f"data: {json.dumps({'type': 'complete', 'data': {'status': 'ok'}})}\n\n"
+    return factory
+
+def read_events(stream):
+    """把SSE文本解析为 [(id, data)]"""
+    events = []
+    for chunk in stream:
+        if chunk.startswith('id: '):
+            id_line, data_line = chunk.strip('\n').split('\n')
+            events.append((id_line[len('id: '):], json.loads(data_line[len('data: '):])))
+    return events
+
+def test_job_replay_and_dedupe():
+    """测试任务在后台完成、多个观看者各自回放，且同一对简历/JD不会重复启动"""
+    print("🧪 开始测试后台撮合任务...")
+    registry = MatchJobRegistry(ttl_seconds=60, max_jobs=2)
+    release, calls = threading.Event(), []
+    job, created = registry.start(fake_matching(release, calls), key=(1, 2))
+    again, created_again = registry.start(fake_matching(release, calls), key=(1, 2))
+    assert created and not created_again and again is job
+    print("✅ 运行中的同一对简历/JD复用同一任务")
+
+    live = job.stream()
+    assert next(live).startswith('retry: ')
+    first = next(live)
+    assert first.startswith(f"id: {job.job_id}:1\n")
+    release.set()
+    while not job.finished:
+        time.sleep(0.01)
+    rest = read_events(live)
+    assert [event_id for event_id, _ in rest] == [f"{job.job_id}:2", f"{job.job_id}:3"]
+    assert job.status == 'completed' and calls == [job.job_id]
+    print("✅ 观看者实时收到全部事件，模型调用只发生一次")
+
+    replay = read_events(job.stream(last_event_id=1))
+    assert [data['type'] for _, data in replay] == ['chatting', 'complete']
+    print("✅ 按Last-Event-ID回放断线后错过的事件")
+
+    finished_release = threading.Event()
+    finished_release.set()
+    new_job, created = registry.start(fake_matching(finished_release, calls), key=(1, 2))
+    assert created and new_job is not job
+    for _ in new_job.stream():
+        pass
+    registry.start(fake_matching(finished_release, calls), key=(3, 4))
+    assert registry.get(job.job_id) is None and len(registry) == 2
+    print("✅ 已结束的任务可重新发起，超过上限时淘汰最早结束的任务")
+
+    limited = MatchJobRegistry(ttl_seconds=60, max_jobs=4, max_running=1)
+    blocked = threading.Event()
+    running, created = limited.start(fake_matching(blocked, calls), key=(5, 6))
+    assert created and limited.start(fake_matching(blocked, calls), key=(5, 6)) == (running, False)
+    assert limited.start(fake_matching(blocked, calls), key=(7, 8)) == (None, False)
+    assert limited.running_count() == 1
+    blocked.set()
+    for _ in running.stream():
+        pass
+    assert limited.start(fake_matching(blocked, calls), key=(7, 8))[1]
+    print("✅ 运行中的任务数达到上限时不再启动新任务，已运行的同一对仍可附加")
+
+def test_stream_endpoint():
+    """测试接口按job_id和Last-Event-ID附加到任务"""
+    print("🧪 开始测试撮合流接口...")
+    assert parse_last_event_id('abc:12') == ('abc', 12)
+    assert parse_last_event_id('garbage') == (None, 0) and parse_last_event_id(None) == (None, 0)
+
+    release, calls = threading.Event(), []
+    release.set()
+    job, _ = match_job_registry.start(fake_matching(release, calls))
+    for _ in job.stream():
+        pass
+
+    client = app.test_client()
+    response = client.get('/api/ai_matching_stream', headers={'Last-Event-ID': f'{job.job_id}:1'})
+    events = read_events(response.get_data(as_text=True).split('\n\n'))
+    assert [data['type'] for _, data in events] == ['chatting', 'complete']
+    print("✅ EventSource自动重连时只补发错过的事件")
+
+    response = client.get(f'/api/ai_matching_stream?job_id={job.job_id}&last_event_id={job.job_id}:3')
+    assert response.status_code == 204
+    assert client.get('/api/ai_matching_stream?job_id=missing').status_code == 404
+    status = client.get(f'/api/match_jobs/{job.job_id}').get_json()
+    assert status['data']['status'] == 'completed' and status['data']['event_count'] == 3
+    print("✅ 已读完的结束任务返回204，不存在的任务返回404")
+    print("🎉 后台撮合任务测试完成！")
+
+def test_payload_deltas_pruned_after_turn():
+    """测试payload增量只在轮次进行中保留：消息事件写入后从日志中删除，回放只看到完整消息"""
+    print("🧪 开始测试payload增量清理...")
+    release, mid_turn = threading.Event(), threading.Event()
+
+    def factory(job_id):
+        yield f"data: {json.dumps({'type': 'start', 'job_id': job_id})}\n\n"
+        for text in ('您', '好'):
+            yield f"data: {json.dumps({'type': 'payload_delta', 'data': {'sender': 'candidate', 'delta': text}})}\n\n"
+        mid_turn.set()
+        release.wait(5)
+        yield f"data: {json.dumps({'type': 'usage', 'data': {}})}\n\n"
+        yield f"data: {json.dumps({'type': 'chatting', 'data': {'content': '您好'}})}\n\n"
+        yield f"data: {json.dumps({'type': 'payload_delta', 'data': {'sender': 'recruiter', 'delta': '你'}})}\n\n"
+        yield f"data: {json.dumps({'type': 'complete', 'data': {'status': 'ok'}})}\n\n"
+
+    job, _ = MatchJobRegistry(ttl_seconds=60).start(factory)
+    mid_turn.wait(5)
+    live = job.stream(last_event_id=1)
+    next(live)
+    assert [json.loads(next(live).split('data: ')[1])['type'] for _ in range(2)] == ['payload_delta', 'payload_delta']
+    print("✅ 轮次进行中重连仍能收到该轮已生成的增量")
+
+    release.set()
+    while not job.finished:
+        time.sleep(0.01)
+    rest = read_events(live)
+    assert [(event_id, data['type']) for event_id, data in rest] == [
+        (f"{job.job_id}:4", 'usage'), (f"{job.job_id}:5", 'chatting'), (f"{job.job_id}:7", 'complete')]
+    replay = read_events(job.stream())
+    assert [data['type'] for _, data in replay] == ['start', 'usage', 'chatting', 'complete']
+    assert job.event_count() == 4 and job.last_seq() == 7
+    assert read_events(job.stream(last_event_id=2)) == rest
+    print("✅ 消息事件写入或任务结束后删除增量，序号保持不变，回放只含完整消息")
+
+def test_stream_input_conflict():
+    """测试同一对简历/JD运行中时，输入相同则附加，输入不同则返回409"""
+    print("🧪 开始测试撮合输入冲突...")
+    release, calls = threading.Event(), []
+    original_session = app_module.run_matching_session
+
+    def fake_session(resume_id, jd_id, job_id, *args, **kwargs):
+        return fake_matching(release, calls)(job_id)
+
+    app_module.run_matching_session = fake_session
+    try:
+        client = app.test_client()
+        first = client.get('/api/ai_matching_stream?resume_id=7&jd_id=8&stream_tokens=0')
+        assert first.status_code == 200
+        job = next(job for job in match_job_registry._jobs.values() if job.key == (7, 8) and not job.finished)
+        attached = client.get('/api/ai_matching_stream?resume_id=7&jd_id=8&stream_tokens=0&pace=2')
+        assert attached.status_code == 200 and len(calls) == 1
+        print("✅ 输入相同（仅展示节奏不同）时附加到运行中的任务")
+
+        for query in ('force_regenerate=1&stream_tokens=0', 'profiles={}&stream_tokens=0', 'stream_tokens=1'):
+            response = client.get(f'/api/ai_matching_stream?resume_id=7&jd_id=8&{query}')
+            assert response.status_code == 409 and response.get_json()['job_id'] == job.job_id
+        assert len(calls) == 1
+        print("✅ 强制重新生成、不同画像或不同推送方式时返回409和运行中的job_id")
+
+        original_max_running = match_job_registry.max_running
+        match_job_registry.max_running = match_job_registry.running_count()
+        try:
+            response = client.get('/api/ai_matching_stream?resume_id=9&jd_id=10&stream_tokens=0')
+            assert response.status_code == 429 and response.headers['Retry-After']
+            reattached = client.get('/api/ai_matching_stream?resume_id=7&jd_id=8&stream_tokens=0')
+            assert reattached.status_code == 200
+            reattached.close()
+        finally:
+            match_job_registry.max_running = original_max_running
+        assert len(calls) == 1
+        print("✅ 运行中的撮合数达到上限时新的撮合返回429，运行中的同一对仍可附加")
+        first.close()
+        attached.close()
+    finally:
+        release.set()
+        app_module.run_matching_session = original_session
+
+if __name__ == "__main__":
+    test_job_replay_and_dedupe()
+    test_stream_endpoint()
+    test_payload_deltas_pruned_after_turn()
+    test_stream_input_conflict()
@@ -12,7 +12,8 @@ import json
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # 导入消息队列类
-from app import MessageQueue, create_message_from_agent_response
+from app import MessageQueue, MessageQueueRegistry, create_message_from_agent_response, get_history_for_agent, HISTORY_SUMMARY_HEADER
+from agent_prompts import estimate_messages_tokens
 
 def test_message_queue():
     """测试消息队列基本功能"""
@@ -100,7 +101,7 @@ def test_message_queue():
         'payload': '您提到的AI产品经验很有趣，能具体说说您负责的项目吗？'
     }
     
-    converted_msg = create_message_from_agent_response(agent_response, 'recruiter')
+    converted_msg = create_message_from_agent_response(queue, agent_response, 'recruiter')
     if converted_msg:
         print(f"✅ 成功转换Agent响应为消息: #{converted_msg['id']}")
     
@@ -138,6 +139,95 @@ def test_concurrent_sessions():
     
     print("🎉 多会话测试完成！")
 
+def test_session_registry():
+    """测试会话注册表：会话隔离、容量上限与TTL淘汰"""
+    print("\n🗂️ 测试会话注册表...")
+
+    registry = MessageQueueRegistry(ttl_seconds=3600, max_sessions=2)
+    session_a = registry.create("session_a")
+    session_b = registry.create("session_b")
+
+    # 两个会话各自写入，互不影响
+    create_message_from_agent_response(session_a, {'type': 'chatting', 'reasoning': 'a', 'payload': '来自会话A'}, 'candidate')
+    create_message_from_agent_response(session_b, {'type': 'chatting', 'reasoning': 'b', 'payload': '来自会话B'}, 'recruiter')
+    assert session_a.get_message_count() == 1
+    assert session_b.get_message_count() == 1
+    assert registry.get("session_a") is session_a
+
+    history_a = get_history_for_agent(session_a, 'recruiter')
+    assert history_a[0]['content'] == '来自会话A'
+    print("✅ 会话之间的消息相互隔离")
+
+    # 超出容量时淘汰最久未访问的会话（session_b）
+    registry.create("session_c")
+    assert len(registry) == 2
+    assert registry.get("session_b") is None
+    assert registry.get("session_a") is session_a
+    print("✅ 超出容量时淘汰最久未访问的会话")
+
+    # TTL为0时所有会话立即过期
+    registry.ttl_seconds = 0
+    assert registry.get("session_a") is None
+    assert len(registry.list_sessions()) == 0
+    print("✅ 过期会话被清理")
+
+    # 移除会话
+    registry.ttl_seconds = 3600
+    registry.create("session_d")
+    assert registry.remove("session_d") is not None
+    assert registry.get("session_d") is None
+    print("🎉 会话注册表测试完成！")
+
+def test_history_compaction():
+    """测试超出token预算时压缩较早的planning消息"""
+    print("\n🗜️ 测试历史压缩...")
+    session = MessageQueue()
+    session.init_session("compaction_session")
+    for i in range(12):
+        source = 'candidate' if (i // 2) % 2 == 0 else 'recruiter'
+        msg_type = 'planning' if i % 2 == 0 else 'chatting'
+        session.add_message(source, msg_type, "思考过程" * 50, f"第{i + 1}条消息的内容" + "细节" * 40)
+
+    full = get_history_for_agent(session, 'candidate', token_budget=0)
+    assert full == session.get_agent_view('candidate')
+    assert session.history_stats['candidate']['compacted_messages'] == 0
+    print("✅ 预算为0时不压缩，历史与增量视图一致")
+
+    compacted = get_history_for_agent(session, 'candidate', token_budget=1500, keep_recent=3)
+    stats = session.history_stats['candidate']
+    assert compacted[-3:] == full[-3:]
+    assert compacted[0]['content'].startswith(HISTORY_SUMMARY_HEADER)
+    assert '第1条消息' in compacted[0]['content'] and '第5条消息' in compacted[0]['content']
+    assert stats['compacted_messages'] == 2 and stats['folded_messages'] == 0
+    assert stats['history_tokens'] < stats['uncompacted_history_tokens'] and stats['within_budget']
+    assert all('思考过程' not in json.loads(entry['content']).get('reasoning', '')
+               for entry in compacted[1:-3] if entry['role'] == 'assistant')
+    print("✅ 最近的消息原样保留，较早的planning合并为摘要，较早的自己的消息去掉reasoning")
+
+    assert get_history_for_agent(session, 'candidate', token_budget=1500, keep_recent=3)[0] is compacted[0]
+    session.add_message('recruiter', 'chatting', "思考", "新的回复")
+    again = get_history_for_agent(session, 'candidate', token_budget=1500, keep_recent=3)
+    assert again[-1]['content'] == "新的回复" and '第9条消息' in again[0]['content']
+    assert session.history_stats['candidate']['compacted_messages'] == 3
+    print("✅ 摘要随对话推进增量追加，没有新的planning被压缩时复用同一条摘要")
+
+    tight = get_history_for_agent(session, 'candidate', token_budget=1000, keep_recent=3)
+    stats = session.history_stats['candidate']
+    assert stats['within_budget'] and stats['history_tokens'] <= 1000
+    assert estimate_messages_tokens(tight) <= stats['history_tokens']
+    assert stats['folded_messages'] > 0 and stats['omitted_summary_lines'] > 0
+    assert tight[-3:] == session.get_agent_view('candidate')[-3:] and '已省略' in tight[0]['content']
+    print("✅ 仍超出预算时把较早的双方消息折叠进摘要并省略最早的摘要条目，直到满足预算")
+
+    floor = get_history_for_agent(session, 'candidate', token_budget=300, keep_recent=3)
+    stats = session.history_stats['candidate']
+    assert floor[-3:] == session.get_agent_view('candidate')[-3:]
+    assert not stats['within_budget'] and stats['history_tokens'] > 300
+    print("✅ 最近的消息本身超出预算时原样保留，并在统计中标记未满足预算")
+    print("🎉 历史压缩测试完成！")
+
 if __name__ == "__main__":
     test_message_queue()
-    test_concurrent_sessions() 
\ No newline at end of file
+    test_concurrent_sessions()
+    test_session_registry()
+    test_history_compaction()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+测试数据库表结构迁移的简单脚本
+"""
+
+import os
+import sqlite3
+import sys
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+
+from helpers import check_and_migrate_db, get_db_connection
+from migrations import LATEST_VERSION, apply_migrations, get_schema_version
+from temp_db import temp_database
+
+def test_migrations_preserve_data():
+    """测试已有（版本0）数据库升级时数据保留、索引创建且可重复执行"""
+    print("🧪 开始测试表结构迁移...")
+    with temp_database(migrate=False):
+
+        # 模拟升级前的数据库：只有基础表和业务数据，没有索引
+        legacy = sqlite3.connect('talent_match.db')
+        with open('schema.sql') as f:
+            legacy.executescript(f.read())
+        legacy.execute("INSERT INTO resumes (name, email) VALUES ('张三', 'zhangsan@example.com')")
+        legacy.execute("INSERT INTO job_descriptions (title, company) VALUES ('后端工程师', '某公司')")
+        legacy.commit()
+        legacy.close()
+
+        check_and_migrate_db()
+        check_and_migrate_db()  # 重复执行不应报错，也不应清空数据
+
+        conn = get_db_connection()
+        assert get_schema_version(conn) == LATEST_VERSION
+        assert conn.execute('SELECT COUNT(*) FROM resumes').fetchone()[0] == 1
+        assert conn.execute('SELECT COUNT(*) FROM job_descriptions').fetchone()[0] == 1
+        print("✅ 升级后已有数据保留")
+
+        indexes = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert {'idx_resumes_name', 'idx_job_descriptions_title_company',
+                'idx_facilitation_results_resume_jd_created'} <= indexes
+
+        plan = ' '.join(row['detail'] for row in conn.execute(
+            'EXPLAIN QUERY PLAN SELECT id FROM job_descriptions WHERE title = ? AND company = ?', ('a', 'b')))
+        assert 'idx_job_descriptions_title_company' in plan
+        print("✅ 查重查询使用新建的索引")
+
+        # 失败的迁移整体回滚，user_version保持不变
+        broken = [(LATEST_VERSION + 1, 'broken', ['CREATE INDEX idx_ok ON resumes (phone)', 'CREATE INDEX idx_bad ON missing_table (x)'])]
+        try:
+            apply_migrations(conn, broken)
+            assert False, "迁移应当失败"
+        except sqlite3.OperationalError:
+            pass
+        assert get_schema_version(conn) == LATEST_VERSION
+        assert conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name = 'idx_ok'").fetchone()[0] == 0
+        print("✅ 失败的迁移整体回滚")
+        conn.close()
+    print("🎉 表结构迁移测试完成！")
+
+if __name__ == "__main__":
+    test_migrations_preserve_data()
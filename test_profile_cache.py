@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+测试企业画像缓存的简单脚本
+"""
+
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+
+from helpers import get_db_connection
+import profile_cache
+from temp_db import run_in_temp_db
+
+SAMPLE_JD = {
+    'id': 1,
+    'title': 'AI产品经理',
+    'company': '某科技公司',
+    'location': '北京',
+    'salary': '30-50k',
+    'requirements': '3年以上AI产品经验',
+    'description': '负责大模型产品规划',
+    'benefits': '五险一金'
+}
+
+def test_company_profile_cache():
+    """测试企业画像缓存的命中、失效与删除"""
+    print("🧪 开始测试企业画像缓存...")
+
+    def body():
+        calls = []
+
+        def fake_generate(jd_info):
+            calls.append(jd_info['title'])
+            return {'valued_traits': [jd_info['title']]}
+
+        stats_before = profile_cache.company_profile_stats.snapshot()
+
+        # 首次调用未命中，生成并写入缓存
+        first = profile_cache.get_cached_company_profile(SAMPLE_JD, fake_generate)
+        # 再次调用命中缓存，不再调用生成函数
+        second = profile_cache.get_cached_company_profile(SAMPLE_JD, fake_generate)
+        assert first == second
+        assert len(calls) == 1
+        print("✅ 相同JD第二次读取命中缓存")
+
+        # JD内容变化后缓存失效，重新生成
+        changed_jd = dict(SAMPLE_JD, requirements='5年以上AI产品经验')
+        profile_cache.get_cached_company_profile(changed_jd, fake_generate)
+        assert len(calls) == 2
+        print("✅ JD内容变化后重新生成画像")
+
+        stats_after = profile_cache.company_profile_stats.snapshot()
+        assert stats_after['hits'] - stats_before['hits'] == 1
+        assert stats_after['misses'] - stats_before['misses'] == 2
+        assert stats_after['stale'] - stats_before['stale'] == 1
+
+        # 并发未命中时只生成一次，其余请求复用结果
+        concurrent_jd = dict(SAMPLE_JD, benefits='弹性工作')
+
+        def slow_generate(jd_info):
+            time.sleep(0.2)
+            return fake_generate(jd_info)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            profile_cache.get_cached_company_profile(concurrent_jd, slow_generate))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(calls) == 3 and len(results) == 4 and all(result == results[0] for result in results)
+        print("✅ 同一JD并发请求只生成一次画像")
+
+        locks = {id(profile_cache.company_profile_lock(jd_id)) for jd_id in range(10000)}
+        assert profile_cache.company_profile_lock(42) is profile_cache.company_profile_lock(42)
+        assert len(locks) == len(profile_cache._company_profile_locks) == profile_cache.COMPANY_PROFILE_LOCK_STRIPES
+        print("✅ 画像生成锁数量固定，不随JD数量增长")
+
+        # 删除JD时清除缓存
+        conn = get_db_connection()
+        profile_cache.invalidate_company_profile(conn, SAMPLE_JD['id'])
+        conn.commit()
+        conn.close()
+        assert profile_cache.get_cache_stats()['company_profile']['entries'] == 0
+        print("✅ 删除JD后缓存被清除")
+
+    run_in_temp_db(body)
+    print("🎉 企业画像缓存测试完成！")
+
+def test_candidate_profile_cache():
+    """测试候选人画像缓存：LRU命中、持久化命中与强制重新生成"""
+    print("\n🧪 开始测试候选人画像缓存...")
+
+    def body():
+        calls = []
+
+        def fake_generate(resume_info, jd_info):
+            calls.append(resume_info['id'])
+            return {'job_preferences': [f"第{len(calls)}次生成"]}
+
+        resume_info = {'id': 7, 'name': '张伟', 'desensitized_data': {'name': '候选人', 'skills': 'Python'}}
+        jd_info = dict(SAMPLE_JD, desensitized_data={'title': 'AI产品经理', 'company': '某公司'})
+
+        first = profile_cache.get_cached_candidate_profile(resume_info, jd_info, fake_generate)
+        second = profile_cache.get_cached_candidate_profile(resume_info, jd_info, fake_generate)
+        assert first == second and len(calls) == 1
+        print("✅ 进程内LRU命中")
+
+        # 清空LRU后从SQLite持久化存储命中
+        profile_cache.candidate_profile_lru.clear()
+        third = profile_cache.get_cached_candidate_profile(resume_info, jd_info, fake_generate)
+        assert third == first and len(calls) == 1
+        print("✅ 持久化存储命中")
+
+        # 强制重新生成会跳过缓存并覆盖旧画像
+        forced = profile_cache.get_cached_candidate_profile(resume_info, jd_info, fake_generate, force_regenerate=True)
+        assert len(calls) == 2 and forced != first
+        assert profile_cache.get_cached_candidate_profile(resume_info, jd_info, fake_generate) == forced
+        print("✅ 强制重新生成并覆盖缓存")
+
+        # 脱敏简历内容变化时使用新的缓存键
+        changed_resume = dict(resume_info, desensitized_data={'name': '候选人', 'skills': 'Go'})
+        profile_cache.get_cached_candidate_profile(changed_resume, jd_info, fake_generate)
+        assert len(calls) == 3
+        print("✅ 简历内容变化后重新生成画像")
+
+    run_in_temp_db(body)
+    print("🎉 候选人画像缓存测试完成！")
+
+if __name__ == "__main__":
+    test_company_profile_cache()
+    test_candidate_profile_cache()
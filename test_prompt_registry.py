@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+测试提示词注册表的简单脚本
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from prompt_registry import PromptRegistry, PromptTemplate, prompt_registry
+
+def test_template_compilation():
+    """测试两种占位符风格的预编译"""
+    print("🧪 开始测试模板预编译...")
+    format_style = PromptTemplate('a.txt', '能力:\n{caps}\n示例: {{"step": 1}}')
+    assert format_style.placeholders == ('caps',)
+    assert format_style.render(caps='X') == '能力:\nX\n示例: {"step": 1}'
+    print("✅ str.format风格模板渲染结果与format一致")
+
+    json_style = PromptTemplate('b.txt', '回复格式:\n{\n  "type": "chatting"\n}\n画像:\n{PROFILE_PLACEHOLDER}')
+    assert json_style.placeholders == ('PROFILE_PLACEHOLDER',)
+    assert json_style.render(PROFILE_PLACEHOLDER='P').endswith('画像:\nP')
+    assert '"type": "chatting"' in json_style.render(PROFILE_PLACEHOLDER='P')
+    print("✅ 含JSON示例的模板只替换 {标识符} 占位符")
+
+    try:
+        json_style.render()
+        assert False, "缺少占位符时应抛出KeyError"
+    except KeyError:
+        pass
+    print("✅ 缺少占位符时抛出KeyError")
+
+def test_registry_reload():
+    """测试缓存、按修改时间重新加载以及版本哈希"""
+    print("🧪 开始测试注册表重新加载...")
+    temp_dir = tempfile.mkdtemp()
+    try:
+        path = os.path.join(temp_dir, 'greeting.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('你好，{name}')
+        registry = PromptRegistry(temp_dir, check_interval=0)
+
+        first = registry.get('greeting.txt')
+        assert registry.get('greeting.txt') is first
+        assert registry.render('greeting.txt', name='张三') == '你好，张三'
+        assert registry.stats()['loads'] == 1
+        print("✅ 模板只加载一次")
+
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('您好，{name}！')
+        second = registry.get('greeting.txt')
+        assert second is not first and second.version != first.version
+        assert registry.render('greeting.txt', name='张三') == '您好，张三！'
+        assert registry.stats()['reloads'] == 1
+        assert registry.versions() == {'greeting.txt': second.version}
+        print("✅ 文件修改后自动重新加载，版本哈希随之变化")
+
+        cached = PromptRegistry(temp_dir, check_interval=60)
+        template = cached.get('greeting.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('{name}')
+        assert cached.get('greeting.txt') is template
+        print("✅ 检查间隔内不访问文件系统")
+
+        os.remove(path)
+        assert registry.get('greeting.txt') is None and registry.version('greeting.txt') is None
+        assert registry.get('missing.txt') is None
+        print("✅ 文件不存在时返回None")
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    assert 'candidate_agent_system.txt' in prompt_registry.versions()
+    planner = prompt_registry.render('sourcing_planner_system.txt', executor_capabilities='CAPABILITIES')
+    assert 'CAPABILITIES' in planner and '{executor_capabilities}' not in planner
+    print("✅ 项目提示词已预加载")
+    print("🎉 提示词注册表测试完成！")
+
+if __name__ == "__main__":
+    test_template_compilation()
+    test_registry_reload()
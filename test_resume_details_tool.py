@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+测试get_resume_details工具（字段选择、token预算、分块查询与续取游标）的简单脚本
+"""
+
+import json
+import os
+import sys
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+
+import helpers
+from agent_prompts import estimate_tokens
+from helpers import get_db_connection, get_resumes_by_ids
+from temp_db import temp_database
+
+def fetch(resume_ids, **kwargs):
+    return json.loads(get_resumes_by_ids(resume_ids, **kwargs))
+
+def test_resume_details_budget_and_cursor():
+    """测试只读取请求字段、按预算分页、超过SQLite参数上限的ID列表以及超长简历截断"""
+    print("🧪 开始测试简历详情工具...")
+    with temp_database():
+        conn = get_db_connection()
+        conn.executemany(
+            "INSERT INTO resumes (name, skills, summary, experience_json, desensitized_json) VALUES (?, ?, ?, ?, ?)",
+            [(f'候选人{i}', 'Python、机器学习', f'{i}年开发经验，' + '负责推荐系统的模型训练与上线。' * 5,
+              json.dumps([{'company': f'公司{i}', 'description': '负责数据平台建设'}], ensure_ascii=False), '{"name": "***"}')
+             for i in range(1500)])
+        conn.commit()
+
+        result = fetch([3, 1, 2], fields=['name', 'skills'])
+        assert result['status'] == 'success' and result['next_cursor'] is None
+        assert [item['id'] for item in result['data']] == [3, 1, 2]
+        assert all(set(item) == {'id', 'name', 'skills'} for item in result['data'])
+        full = fetch([1])['data'][0]
+        assert 'experience' in full and 'desensitized_data' not in full and full['experience'][0]['company'] == '公司0'
+        print("✅ 只返回请求的字段，默认不含脱敏数据，顺序与请求一致")
+
+        # 超过SQLite绑定参数上限的ID列表（含不存在的ID），按预算分批取完
+        resume_ids = list(range(1, 1501)) + [99999]
+        seen, cursor, calls = [], None, 0
+        while True:
+            page = fetch(resume_ids, fields='name,summary', max_tokens=20000, cursor=cursor)
+            assert page['status'] == 'success'
+            assert estimate_tokens(json.dumps(page, ensure_ascii=False)) <= helpers.RESUME_TOOL_MAX_TOKENS
+            seen.extend(item['id'] for item in page['data'])
+            calls += 1
+            if page['next_cursor'] is None:
+                assert page['missing_ids'] == [99999] and page['remaining'] == 0
+                break
+            assert page['remaining'] == len(resume_ids) - page['next_cursor']
+            cursor = page['next_cursor']
+        assert seen == list(range(1, 1501)) and calls > 1
+        print(f"✅ {len(resume_ids)} 个ID分 {calls} 次取完，每次都在预算之内")
+
+        conn.execute("UPDATE resumes SET summary = ? WHERE id = 5", ('很长的个人总结。' * 2000,))
+        conn.commit()
+        page = fetch([5, 6], max_tokens=500)
+        assert [item['id'] for item in page['data']] == [5] and page['next_cursor'] == 1
+        assert page['data'][0]['truncated'] and len(page['data'][0]['summary']) < 1000
+        assert estimate_tokens(json.dumps(page, ensure_ascii=False)) <= 500
+        assert fetch([5, 6], max_tokens=500, cursor=1)['data'][0]['id'] == 6
+        print("✅ 超出预算的单份简历被截断，其余简历通过游标续取")
+
+        assert fetch([])['status'] == 'error'
+        assert fetch([1], fields=['desensitized'])['status'] == 'error'
+        assert fetch([1, 2], cursor=5)['status'] == 'error'
+        print("✅ 参数错误时返回错误信息")
+        conn.close()
+        print("🎉 简历详情工具测试完成！")
+
+if __name__ == "__main__":
+    test_resume_details_budget_and_cursor()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+测试惰性JSON行包装的简单脚本
+"""
+
+import json
+import os
+import sqlite3
+import sys
+
+# 添加项目根目录到路径
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from rows import ResumeRow, JdRow
+
+def make_row(sql, params=()):
+    conn = sqlite3.connect(':memory:')
+    conn.row_factory = sqlite3.Row
+    return conn.execute(sql, params).fetchone()
+
+def test_lazy_json_row():
+    """测试JSON列按需解码、缓存、别名以及dict兼容性"""
+    print("🧪 开始测试惰性行包装...")
+    row = make_row(
+        "SELECT 1 AS id, '张三' AS name, ? AS experience_json, '' AS education_json, "
+        "NULL AS publications_json, '{bad' AS projects_json, ? AS desensitized_json",
+        (json.dumps([{"role": "工程师"}]), json.dumps({"name": "候选人"}))
+    )
+    resume = ResumeRow(row)
+    assert resume._decoded is None
+    assert resume['name'] == '张三' and resume.get('missing', 'x') == 'x'
+    assert resume._decoded is None
+    print("✅ 读取普通列不会解码JSON列")
+
+    assert resume['experience'] == [{"role": "工程师"}]
+    assert resume['experience'] is resume['experience']
+    assert list(resume._decoded) == ['experience']
+    print("✅ JSON列在第一次访问时解码并缓存")
+
+    assert resume['education'] == [] and resume['publications'] == []
+    assert resume['projects'] == '{bad'
+    assert resume['desensitized'] is resume['desensitized_data'] == {"name": "候选人"}
+    print("✅ 空值默认值、解码失败保留原文、别名访问正常")
+
+    assert list(resume) == ['id', 'name', 'experience', 'education', 'publications', 'projects', 'desensitized_data']
+    assert 'desensitized' in resume and 'missing' not in resume
+    assert resume.to_dict(['id', 'desensitized']) == {'id': 1, 'desensitized': {"name": "候选人"}}
+    assert 'desensitized_data' not in resume.to_dict(exclude=('desensitized_data',))
+    assert json.loads(json.dumps(resume.to_dict(), ensure_ascii=False))['name'] == '张三'
+    assert not hasattr(resume, '__dict__')
+    print("✅ 遍历、to_dict与__slots__正常")
+
+    jd = JdRow(make_row("SELECT 2 AS id, '工程师' AS title, NULL AS desensitized_json"))
+    assert jd.get('desensitized_data') is None and dict(jd) == {'id': 2, 'title': '工程师', 'desensitized_data': None}
+    print("✅ JD行包装正常")
+    print("🎉 惰性行包装测试完成！")
+
+if __name__ == "__main__":
+    test_lazy_json_row()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+测试本地向量化预筛（TF-IDF + 技能覆盖率）的简单脚本
+"""
+
+import json
+import math
+import os
+import sys
+from collections import Counter
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+os.environ.setdefault('OPENAI_API_KEY', 'dummy')
+
+import screening
+from app import app
+from helpers import get_db_connection
+from temp_db import temp_database
+
+SKILLS = ['Python', 'Java', 'Go', 'C++', '机器学习', '深度学习', 'React', 'SQL', 'Kubernetes', '数据分析']
+
+def make_resume(i):
+    skills = [SKILLS[i % len(SKILLS)], SKILLS[(i * 3 + 1) % len(SKILLS)], SKILLS[(i * 7 + 2) % len(SKILLS)]]
+    return (f'候选人{i}', '、'.join(skills), f'{i % 9 + 1}年{skills[0]}开发经验，熟悉{skills[1]}',
+            f'[{{"company": "公司{i % 5}", "role": "{skills[0]}工程师", "description": "负责{skills[2]}相关系统"}}]')
+
+JDS = [
+    ('机器学习工程师', '熟悉Python、机器学习、深度学习', '负责推荐系统的模型训练'),
+    ('后端工程师', '精通Java或Go，熟悉SQL和Kubernetes', '负责高并发服务开发'),
+    ('前端工程师', '熟悉React', '负责前端页面开发'),
+    ('行政专员', '', '负责办公室日常事务'),
+]
+
+def naive_scores(resumes, jds):
+    """逐对用纯Python计算综合分，作为向量化结果的对照"""
+    def vector(tokens):
+        counts = Counter(screening.feature_index(token) for token in tokens)
+        return {feature: 1 + math.log(count) for feature, count in counts.items()}
+
+    resume_text = [vector(screening.tokenize(screening.resume_features(row)[0])) for row in resumes]
+    resume_skills = [{screening.feature_index(t) for t in screening.tokenize(row['skills'])} for row in resumes]
+    df = Counter(feature for vec in resume_text for feature in vec)
+    idf = lambda feature: math.log((1 + len(resumes)) / (1 + df.get(feature, 0))) + 1
+    vocabulary = set().union(*resume_skills)
+
+    def normalized(vec):
+        weighted = {feature: value * idf(feature) for feature, value in vec.items()}
+        norm = math.sqrt(sum(value * value for value in weighted.values())) or 1.0
+        return {feature: value / norm for feature, value in weighted.items()}
+
+    scores = {}
+    for jd in jds:
+        jd_vec = normalized(vector(screening.tokenize(screening.jd_features(jd)[0])))
+        jd_skills = {screening.feature_index(t) for t in screening.tokenize(screening.jd_features(jd)[1])} & vocabulary
+        for resume, text_vec, skills in zip(resumes, resume_text, resume_skills):
+            resume_vec = normalized(text_vec)
+            text = sum(value * jd_vec.get(feature, 0.0) for feature, value in resume_vec.items())
+            if jd_skills:
+                score = screening.TEXT_WEIGHT * text + screening.SKILL_WEIGHT * len(skills & jd_skills) / len(jd_skills)
+            else:
+                score = text
+            scores[(resume['id'], jd['id'])] = score
+    return scores
+
+def test_tokenize():
+    """测试中英文混排分词"""
+    assert screening.tokenize('精通C++和Node.js，熟悉机器学习。') == ['精通', 'c++', '和', 'node.js', '熟悉', '悉机', '机器', '器学', '学习']
+    assert screening.tokenize(None) == []
+    print("✅ 英文按单词、中文按bigram切分")
+
+def test_shortlist_matches_brute_force():
+    """测试分块向量化打分与逐对计算一致，增删记录后索引增量同步"""
+    print("🧪 开始测试向量化预筛...")
+    with temp_database():
+        try:
+            screening.reset_screening_index()
+            conn = get_db_connection()
+            conn.executemany("INSERT INTO resumes (name, skills, summary, experience_json) VALUES (?, ?, ?, ?)",
+                             [make_resume(i) for i in range(60)])
+            conn.executemany("INSERT INTO job_descriptions (title, requirements, description) VALUES (?, ?, ?)", JDS)
+            conn.commit()
+
+            def brute_force():
+                resumes = [dict(row) for row in conn.execute("SELECT id, name, skills, summary, experience_json FROM resumes")]
+                jds = [dict(row) for row in conn.execute("SELECT id, title, requirements, description FROM job_descriptions")]
+                return naive_scores(resumes, jds)
+
+            expected = brute_force()
+            # 块很小时结果也必须一致（验证跨块合并top-k）
+            for block_cells in (screening.BLOCK_CELLS, 50):
+                pairs = screening.shortlist(k=15, block_cells=block_cells)
+                assert len(pairs) == 15
+                best = sorted(expected.values(), reverse=True)[:15]
+                assert all(abs(pair['score'] - score) < 1e-3 for pair, score in zip(pairs, best))
+                for pair in pairs:
+                    assert abs(pair['score'] - expected[(pair['resume_id'], pair['jd_id'])]) < 1e-3
+            print("✅ 全局top-k与逐对计算结果一致（含小块合并）")
+
+            pairs = screening.shortlist(k=3, per_jd=True, block_cells=50)
+            by_jd = Counter(pair['jd_id'] for pair in pairs)
+            assert sorted(by_jd.values()) == [3, 3, 3, 3]
+            for jd_id in by_jd:
+                best = sorted((score for (r, j), score in expected.items() if j == jd_id), reverse=True)[:3]
+                got = [pair['score'] for pair in pairs if pair['jd_id'] == jd_id]
+                assert all(abs(a - b) < 1e-3 for a, b in zip(sorted(got, reverse=True), best))
+            ml_top = [pair for pair in pairs if pair['jd_id'] == 1]
+            assert all(pair['skill_score'] > 0 for pair in ml_top)
+            print("✅ 按JD取top-k，技能匹配的简历排在前面")
+
+            restricted = screening.shortlist(jd_ids=[2], resume_ids=[1, 2, 3], k=10)
+            assert {pair['resume_id'] for pair in restricted} == {1, 2, 3} and {pair['jd_id'] for pair in restricted} == {2}
+            assert screening.shortlist(jd_ids=[999]) == []
+            print("✅ 可限定参与预筛的简历和JD")
+
+            client = app.test_client()
+            data = client.get('/api/screening/shortlist?jd_ids=1,3&k=2&per_jd=1').get_json()['data']
+            assert len(data['pairs']) == 4 and all(pair['resume_name'].startswith('候选人') for pair in data['pairs'])
+            assert client.get('/api/screening/shortlist?jd_ids=abc').status_code == 400
+            print("✅ 预筛接口返回带姓名和职位名称的组合")
+
+            conn.execute("DELETE FROM resumes WHERE id IN (1, 2)")
+            conn.execute("INSERT INTO resumes (name, skills, summary) VALUES ('新人', 'Python、机器学习、深度学习', '机器学习工程师')")
+            conn.commit()
+            version = screening.resume_index.version
+            pairs = screening.shortlist(k=500)
+            assert screening.resume_index.version == version + 3 and screening.resume_index.n_alive == 59
+            expected = brute_force()
+            assert len(pairs) == len(expected)
+            assert all(abs(pair['score'] - expected[(pair['resume_id'], pair['jd_id'])]) < 1e-3 for pair in pairs)
+            assert screening.shortlist(jd_ids=[1], k=1)[0]['resume_id'] == 61
+            print("✅ 增删记录后只增量更新索引，结果与重新计算一致")
+            conn.close()
+            print("🎉 向量化预筛测试完成！")
+        finally:
+            screening.reset_screening_index()
+
+def test_search_resumes_tool():
+    """测试sourcing agent的向量检索工具：打分与预筛一致，只返回ID、分数和片段，过滤条件生效"""
+    print("🧪 开始测试简历向量检索工具...")
+    with temp_database():
+        try:
+            screening.reset_screening_index()
+            conn = get_db_connection()
+            conn.executemany("INSERT INTO resumes (name, skills, summary, experience_json) VALUES (?, ?, ?, ?)",
+                             [make_resume(i) for i in range(40)])
+            conn.execute("INSERT INTO job_descriptions (title, requirements, description) VALUES (?, ?, ?)", JDS[0])
+            conn.commit()
+
+            # 以JD文本为检索描述时，排序与该JD的预筛结果一致
+            query = screening.jd_features({'title': JDS[0][0], 'requirements': JDS[0][1], 'description': JDS[0][2]})[0]
+            ranked = screening.rank_resumes(query, k=10)
+            expected = screening.shortlist(jd_ids=[1], k=10)
+            assert all(abs(item['score'] - pair['score']) < 1e-3 for item, pair in zip(ranked, expected))
+            assert [item['resume_id'] for item in ranked] == [pair['resume_id'] for pair in expected]
+            print("✅ 检索打分与预筛一致")
+
+            from talent_sourcing_agent import execute_tool
+            result = json.loads(execute_tool('search_resumes', {'query': '机器学习 Python', 'k': 5}))
+            resumes = result['data']['resumes']
+            assert result['status'] == 'success' and len(resumes) == 5 and result['data']['total_indexed'] == 40
+            assert set(resumes[0]) == {'resume_id', 'score', 'text_score', 'skill_score', 'name', 'snippet'}
+            assert resumes == sorted(resumes, key=lambda item: -item['score'])
+            assert all(len(item['snippet']) <= 2 * 30 + 12 for item in resumes)
+            assert '【' in resumes[0]['snippet']
+            print("✅ 工具只返回ID、分数、姓名和简短片段")
+
+            filtered = json.loads(execute_tool('search_resumes', {
+                'query': '开发经验', 'k': 50,
+                'filters': {'skills': ['深度学习', 'SQL'], 'exclude_ids': [resumes[0]['resume_id']]}}))['data']['resumes']
+            rows = {row['id']: row['skills'] for row in conn.execute("SELECT id, skills FROM resumes")}
+            qualified = {i for i, skills in rows.items() if '深度学习' in skills and 'SQL' in skills} - {resumes[0]['resume_id']}
+            assert {item['resume_id'] for item in filtered} == qualified
+            only = json.loads(execute_tool('search_resumes', {'query': 'Java', 'filters': {'resume_ids': [3, 4], 'min_score': 0.0}}))
+            assert {item['resume_id'] for item in only['data']['resumes']} <= {3, 4}
+            skills_only = json.loads(execute_tool('search_resumes', {'query': '', 'filters': {'skills': 'React'}}))['data']['resumes']
+            assert skills_only and all('React' in rows[item['resume_id']] for item in skills_only)
+            print("✅ 技能、ID范围、排除和最低分过滤生效")
+
+            assert json.loads(execute_tool('search_resumes', {'query': ''}))['status'] == 'error'
+            assert json.loads(execute_tool('search_resumes', {'query': 'Go', 'filters': {'city': '北京'}}))['status'] == 'error'
+            print("✅ 参数错误时返回错误信息")
+            conn.close()
+            print("🎉 简历向量检索工具测试完成！")
+        finally:
+            screening.reset_screening_index()
+
+if __name__ == "__main__":
+    test_tokenize()
+    test_shortlist_matches_brute_force()
+    test_search_resumes_tool()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+测试全文检索的简单脚本
+"""
+
+import json
+import os
+import sys
+
+# 添加项目根目录到路径
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_ROOT)
+
+from helpers import get_db_connection, search_documents, find_jd_by_id_or_title, full_text_search
+from ingestion import BatchWriter, RESUME_SPEC, build_resume_row
+from temp_db import temp_database
+
+def test_full_text_search():
+    """测试全文索引随数据增删改同步、bm25排序、短词检索与标题查询"""
+    print("🧪 开始测试全文检索...")
+    with temp_database():
+
+        conn = get_db_connection()
+        writer = BatchWriter(conn, RESUME_SPEC, batch_size=10)
+        writer.add(0, build_resume_row({
+            'name': '张三', 'skills': 'Python, 推荐系统, Spark', 'summary': '五年算法经验',
+            'experience': [{'role': '算法工程师', 'description': '负责电商推荐系统的召回与排序'}]
+        }, {}))
+        writer.add(1, build_resume_row({
+            'name': '李四', 'skills': 'Java, Go', 'summary': '后端开发',
+            'experience': [{'role': '后端工程师', 'description': '参与推荐系统接口开发'}]
+        }, {}))
+        outcomes = writer.flush()
+        # FTS触发器中的INSERT不影响批量写入推算的ID
+        ids = {o['index']: o['id'] for o in outcomes}
+        names = {row['id']: row['name'] for row in conn.execute('SELECT id, name FROM resumes')}
+        assert names == {ids[0]: '张三', ids[1]: '李四'}
+        conn.execute("INSERT INTO job_descriptions (title, company, requirements) VALUES ('高级推荐算法工程师', '某公司', '熟悉Python')")
+        conn.commit()
+
+        results = search_documents('推荐系统', doc_type='resume')
+        assert [hit['name'] for hit in results['resume']] == ['张三', '李四']
+        assert '【推荐系统】' in results['resume'][0]['snippet']
+        print("✅ 工作经历中的中文可被检索，技能命中排序更靠前")
+
+        results = search_documents('推荐系统 Go', doc_type='all')
+        assert [hit['name'] for hit in results['resume']] == ['李四']
+        assert results['jd'] == []
+        print("✅ 多个检索词（含短词）同时生效")
+
+        conn.execute("UPDATE resumes SET skills = 'Rust' WHERE name = '张三'")
+        conn.execute("DELETE FROM resumes WHERE name = '李四'")
+        conn.commit()
+        conn.close()
+        assert search_documents('Spark', doc_type='resume')['resume'] == []
+        assert [hit['name'] for hit in search_documents('推荐系统', doc_type='resume')['resume']] == ['张三']
+        print("✅ 更新和删除后索引同步")
+
+        jd = json.loads(find_jd_by_id_or_title(title='推荐算法'))
+        assert jd['status'] == 'success' and jd['data']['title'] == '高级推荐算法工程师'
+        tool_result = json.loads(full_text_search('Python', doc_type='jd'))
+        assert tool_result['data']['jd'][0]['company'] == '某公司'
+        assert json.loads(full_text_search('', doc_type='jd'))['status'] == 'error'
+        print("✅ find_jd标题查询和full_text_search工具正常")
+    print("🎉 全文检索测试完成！")
+
+if __name__ == "__main__":
+    test_full_text_search()